@@ -0,0 +1,126 @@
+from __future__ import absolute_import
+import logging
+import threading
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+#: HTTP status code returned by Elasticsearch when it is throttling requests.
+THROTTLED_STATUS_CODE = 429
+
+#: Number of steps in which the batch size is increased from the minimum to
+#: the maximum.
+_BATCH_SIZE_INCREASE_STEPS = 10
+
+#: Fraction of the target latency which the latency must be under for the
+#: number of in-flight requests to be increased.
+_IN_FLIGHT_INCREASE_LATENCY_FRACTION = 0.5
+
+
+class AdaptiveBatchController(object): # pylint: disable=too-many-instance-attributes
+    """
+    Tunes the number of documents in each '_bulk' request and the number of
+    '_bulk' requests which may be in flight at once from the latency of, and
+    the throttling of, completed requests.
+
+    Limits are adjusted with additive increase and multiplicative decrease
+    (AIMD). While requests complete within the target latency, the batch size
+    is increased by a fixed step and, once the batch size has reached its
+    maximum and requests complete well within the target latency, the number
+    of in-flight requests is increased by one. A request which exceeds the
+    target latency halves the batch size, and a request which Elasticsearch
+    throttles halves both the batch size and the number of in-flight
+    requests.
+    """
+
+    def __init__(self, event_group_name, min_batch_docs, max_batch_docs,
+                 max_in_flight, target_latency_ms):
+        """
+        Constructor parameters:
+
+        :param str event_group_name: The event group name.
+        :param int min_batch_docs: Minimum number of documents per batch.
+        :param int max_batch_docs: Maximum number of documents per batch.
+        :param int max_in_flight: Maximum number of '_bulk' requests which
+            may be in flight at once.
+        :param int target_latency_ms: Latency, in milliseconds, which
+            '_bulk' requests should complete within.
+        """
+        self._event_group_name = event_group_name
+        self._min_batch_docs = min_batch_docs
+        self._max_batch_docs = max_batch_docs
+        self._max_in_flight = max_in_flight
+        self._target_latency = target_latency_ms / 1000.0
+        self._batch_size_step = max(
+            1, (max_batch_docs - min_batch_docs) // _BATCH_SIZE_INCREASE_STEPS)
+
+        self._condition = threading.Condition()
+        self._batch_docs = min_batch_docs
+        self._in_flight_limit = 1
+        self._in_flight = 0
+
+    @property
+    def batch_docs(self):
+        """
+        The current target number of documents per batch.
+
+        :rtype: int
+        """
+        return self._batch_docs
+
+    @property
+    def in_flight_limit(self):
+        """
+        The current maximum number of '_bulk' requests which may be in flight
+        at once.
+
+        :rtype: int
+        """
+        return self._in_flight_limit
+
+    def acquire(self):
+        """
+        Wait until another '_bulk' request may be sent. Each call must be
+        followed by a call to :meth:`release` once the request completes.
+        """
+        with self._condition:
+            while self._in_flight >= self._in_flight_limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency, throttled):
+        """
+        Record the outcome of a completed '_bulk' request and adjust the
+        limits.
+
+        :param float latency: Time, in seconds, that the request took.
+        :param bool throttled: Whether or not Elasticsearch throttled the
+            request or any of the documents in it.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            previous_limits = (self._batch_docs, self._in_flight_limit)
+            if throttled:
+                self._batch_docs = max(self._min_batch_docs,
+                                       self._batch_docs // 2)
+                self._in_flight_limit = max(1, self._in_flight_limit // 2)
+            elif latency > self._target_latency:
+                self._batch_docs = max(self._min_batch_docs,
+                                       self._batch_docs // 2)
+            elif self._batch_docs < self._max_batch_docs:
+                self._batch_docs = min(self._max_batch_docs,
+                                       self._batch_docs +
+                                       self._batch_size_step)
+            elif latency < self._target_latency * \
+                    _IN_FLIGHT_INCREASE_LATENCY_FRACTION and \
+                    self._in_flight_limit < self._max_in_flight:
+                self._in_flight_limit += 1
+            limits = (self._batch_docs, self._in_flight_limit)
+            self._condition.notify_all()
+
+        if limits != previous_limits:
+            logger.debug(
+                "Adjusted bulk limits for event group %s, batch size: %d, "
+                "in-flight requests: %d, latency: %.3fs, throttled: %s",
+                self._event_group_name, limits[0], limits[1], latency,
+                throttled)
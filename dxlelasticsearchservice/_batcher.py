@@ -0,0 +1,139 @@
+from __future__ import absolute_import
+import logging
+import threading
+import time
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher(object): # pylint: disable=too-many-instance-attributes
+    """
+    Collects items added from any thread and passes them, in batches, to a
+    handler invoked on a dedicated worker thread. A batch is handed off when
+    the maximum number of items has been collected or the oldest item has
+    waited for the maximum wait time. With more than one worker thread, the
+    handler may be invoked for several batches at once.
+    """
+
+    def __init__(self, name, handler, max_items, max_wait_ms, max_pending=0, # pylint: disable=too-many-arguments
+                 workers=1):
+        """
+        Constructor parameters:
+
+        :param str name: Name of the batcher (used for the worker thread name
+            and log messages).
+        :param handler: Function invoked with a list of items for each batch.
+        :param int max_items: Maximum number of items to pass to the handler
+            in a single batch.
+        :param int max_wait_ms: Maximum amount of time, in milliseconds, that
+            an item waits before it is passed to the handler.
+        :param int max_pending: Maximum number of items which may be waiting
+            to be passed to the handler. Items added beyond this limit are
+            rejected. If 0, the number of waiting items is not limited.
+        :param int workers: Number of worker threads which invoke the
+            handler.
+        """
+        self._name = name
+        self._handler = handler
+        self._max_items = max_items
+        self._max_wait = max_wait_ms / 1000.0
+        self._max_pending = max_pending
+
+        self._condition = threading.Condition()
+        self._items = []
+        self._item_times = []
+        self._closed = False
+
+        self._threads = []
+        for worker_number in range(workers):
+            thread = threading.Thread(
+                target=self._run,
+                name="MicroBatcher-{}".format(name) if workers == 1
+                else "MicroBatcher-{}-{}".format(name, worker_number))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def add(self, item, block=False):
+        """
+        Add an item to the next batch.
+
+        :param item: The item.
+        :param bool block: Whether or not to wait for pending items to be
+            passed to the handler if the maximum number of pending items has
+            been reached, rather than rejecting the item.
+        :return: True if the item was added, False if it was rejected because
+            the maximum number of pending items has been reached or the
+            batcher has been closed.
+        :rtype: bool
+        """
+        with self._condition:
+            while block and not self._closed and self._is_full():
+                self._condition.wait()
+            if self._closed or self._is_full():
+                return False
+            self._items.append(item)
+            self._item_times.append(time.time())
+            if len(self._items) == 1 or len(self._items) >= self._max_items:
+                self._condition.notify_all()
+        return True
+
+    def close(self):
+        """
+        Pass any pending items to the handler and stop the worker threads.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _is_full(self):
+        """
+        Determine whether or not the maximum number of pending items has been
+        reached. The caller must hold the condition lock.
+
+        :rtype: bool
+        """
+        return bool(self._max_pending) and \
+            len(self._items) >= self._max_pending
+
+    def _take_batch(self):
+        """
+        Remove the next batch of items. The caller must hold the condition
+        lock.
+
+        :return: The batch of items.
+        :rtype: list
+        """
+        batch = self._items[:self._max_items]
+        del self._items[:self._max_items]
+        del self._item_times[:self._max_items]
+        # Wake any callers waiting for room to add items
+        self._condition.notify_all()
+        return batch
+
+    def _run(self):
+        """
+        Pass batches of items to the handler until the batcher is closed and
+        no items remain.
+        """
+        while True:
+            with self._condition:
+                while not self._closed and not self._items:
+                    self._condition.wait()
+                if not self._items:
+                    return
+                remaining = self._item_times[0] + self._max_wait - \
+                    time.time()
+                if not self._closed and remaining > 0 and \
+                        len(self._items) < self._max_items:
+                    self._condition.wait(remaining)
+                    continue
+                batch = self._take_batch()
+            try:
+                self._handler(batch)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Error processing batch of %d item(s) for %s",
+                                 len(batch), self._name)
@@ -0,0 +1,676 @@
+from __future__ import absolute_import
+import collections
+import logging
+import threading
+import time
+
+from dxlelasticsearchservice._adaptive import THROTTLED_STATUS_CODE
+from dxlelasticsearchservice._retry import RETRYABLE_STATUS_CODES, \
+    RequestRejectedError, is_retryable_error
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+#: Mapping of the names of 'index' operation parameters to the names of the
+#: corresponding metadata fields in a '_bulk' API action line.
+_ACTION_METADATA_PARAMS = {
+    "index": "_index",
+    "doc_type": "_type",
+    "id": "_id",
+    "routing": "_routing",
+    "parent": "_parent",
+    "version": "_version",
+    "version_type": "_version_type",
+    "pipeline": "pipeline"
+}
+
+#: Operation type which indexes (creates or replaces) a document.
+OPERATION_TYPE_INDEX = "index"
+#: Operation type which creates a document, failing if it already exists.
+OPERATION_TYPE_CREATE = "create"
+#: Operation type which partially updates a document with the fields in the
+#: operation body, creating the document if it does not exist.
+OPERATION_TYPE_UPDATE = "update"
+#: Operation type which deletes a document.
+OPERATION_TYPE_DELETE = "delete"
+#: The supported operation types.
+OPERATION_TYPES = (OPERATION_TYPE_INDEX, OPERATION_TYPE_CREATE,
+                   OPERATION_TYPE_UPDATE, OPERATION_TYPE_DELETE)
+
+#: Coalescing mode in which the last buffered operation for a document
+#: replaces any earlier buffered operations for the document.
+COALESCE_MODE_LAST = "last"
+#: Coalescing mode in which the buffered operations for a document are
+#: merged into a single partial update of the document.
+COALESCE_MODE_MERGE = "merge"
+
+
+def supports_operation(index_operation):
+    """
+    Determine whether or not the supplied 'index' operation can be expressed
+    as an action in a '_bulk' API request.
+
+    :param dict index_operation: Parameters for the 'index' operation.
+    :return: True if the operation can be expressed as a '_bulk' action, False
+        if the operation uses parameters which only apply to a single 'index'
+        request or has an unknown operation type.
+    :rtype: bool
+    """
+    return all(name in ("body", "op_type") or name in _ACTION_METADATA_PARAMS
+               for name in index_operation) and \
+        get_operation_type(index_operation) in OPERATION_TYPES
+
+
+def get_operation_type(index_operation):
+    """
+    Get the type of an operation.
+
+    :param dict index_operation: Parameters for the operation. The type is
+        taken from the "op_type" parameter.
+    :return: The operation type, "index" if no type is set.
+    :rtype: str
+    """
+    return index_operation.get("op_type") or OPERATION_TYPE_INDEX
+
+
+def get_document(serializer, body):
+    """
+    Get the document for an operation body.
+
+    :param serializer: The Elasticsearch client serializer.
+    :param body: The body, as a dict or as a serialized str or bytes.
+    :return: The document.
+    :rtype: dict
+    :raises ValueError: If a serialized body cannot be deserialized.
+    """
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode("utf-8")
+    if isinstance(body, (type(u""), str)):
+        return serializer.loads(body)
+    return body
+
+
+def get_bulk_action(serializer, index_operation):
+    """
+    Get the '_bulk' API action and source lines for an operation.
+
+    :param serializer: The Elasticsearch client serializer.
+    :param dict index_operation: Parameters for the operation.
+    :return: Tuple containing the serialized action line and the serialized
+        document source line. The source line is empty for a 'delete'
+        operation.
+    :rtype: tuple(str, str)
+    :raises ValueError: If the operation type is not known.
+    """
+    operation_type = get_operation_type(index_operation)
+    if operation_type not in OPERATION_TYPES:
+        raise ValueError("Unknown operation type: {}".format(operation_type))
+    if operation_type == OPERATION_TYPE_UPDATE:
+        return get_bulk_update_action(
+            serializer, index_operation,
+            get_document(serializer, index_operation.get("body")))
+
+    metadata = _get_bulk_action_metadata(index_operation)
+    if operation_type == OPERATION_TYPE_DELETE:
+        return (serializer.dumps({operation_type: metadata}) + "\n", "")
+
+    return (serializer.dumps({operation_type: metadata}) + "\n",
+            _get_bulk_source(serializer, index_operation.get("body")))
+
+
+def get_bulk_update_action(serializer, index_operation, document):
+    """
+    Get the '_bulk' API action and source lines for an 'update' of the
+    document for an 'index' operation, which creates the document if it does
+    not exist.
+
+    :param serializer: The Elasticsearch client serializer.
+    :param dict index_operation: Parameters for the 'index' operation.
+    :param dict document: The partial document to update the document with.
+    :return: Tuple containing the serialized action line and the serialized
+        source line.
+    :rtype: tuple(str, str)
+    """
+    return (serializer.dumps(
+        {"update": _get_bulk_action_metadata(index_operation)}) + "\n",
+            serializer.dumps({"doc": document, "doc_as_upsert": True}) + "\n")
+
+
+def get_bulk_update_body_action(serializer, index_operation):
+    """
+    Get the '_bulk' API action and source lines for an 'update' operation
+    whose body is a complete 'update' API request body, for example, with a
+    partial document in "doc" or with a "script".
+
+    :param serializer: The Elasticsearch client serializer.
+    :param dict index_operation: Parameters for the 'update' operation.
+    :return: Tuple containing the serialized action line and the serialized
+        source line.
+    :rtype: tuple(str, str)
+    """
+    return (serializer.dumps(
+        {OPERATION_TYPE_UPDATE: _get_bulk_action_metadata(index_operation)}) +
+            "\n",
+            _get_bulk_source(serializer, index_operation.get("body")))
+
+
+def get_bulk_item_result(item):
+    """
+    Get the result for an action from an item in a '_bulk' API response.
+
+    :param dict item: The item, keyed by the type of the action.
+    :return: The result.
+    :rtype: dict
+    """
+    return next(iter(item.values()), {}) if item else {}
+
+
+def _get_bulk_action_metadata(index_operation):
+    """
+    Get the metadata for the action line of an operation.
+
+    :param dict index_operation: Parameters for the operation.
+    :return: The metadata.
+    :rtype: dict
+    """
+    metadata = {}
+    for name, value in index_operation.items():
+        if name not in ("body", "op_type") and value is not None:
+            metadata[_ACTION_METADATA_PARAMS[name]] = value
+    return metadata
+
+
+def _get_bulk_source(serializer, body):
+    """
+    Get the source line of a '_bulk' API action for an operation body.
+
+    :param serializer: The Elasticsearch client serializer.
+    :param body: The body, as a dict or as a serialized str or bytes.
+    :return: The serialized source line.
+    :rtype: str
+    """
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode("utf-8")
+    source = serializer.dumps(body)
+    if "\n" in source:
+        # The _bulk API is newline-delimited, so re-serialize a document which
+        # was supplied as a (pretty printed) string.
+        source = serializer.dumps(serializer.loads(source))
+    return source + "\n"
+
+
+def _merge_documents(document, update):
+    """
+    Merge a partial update into a document in the way that Elasticsearch
+    does, recursively merging objects and replacing other values.
+
+    :param dict document: The document. The document is not modified.
+    :param dict update: The partial update.
+    :return: The merged document.
+    :rtype: dict
+    """
+    merged = dict(document)
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge_documents(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class BulkIndexer(object): # pylint: disable=too-many-instance-attributes
+    """
+    Buffers Elasticsearch 'index' operations for an event group and submits
+    them through the Elasticsearch '_bulk' API when a document count, byte
+    size, or time limit is reached.
+
+    Operations are grouped by index, with a separate '_bulk' API request
+    submitted for each index, so that an index which is rejecting or
+    throttling requests does not cause documents for other indexes to be
+    retried.
+
+    If coalescing is enabled, operations for a document ID which is already
+    in the buffer replace (or are merged with) the buffered operation, so
+    that only one operation per document is submitted for each flush.
+
+    If a batch controller is supplied, the number of documents buffered
+    before a flush and the number of concurrent '_bulk' requests are limited
+    by the controller's current targets rather than by the fixed document
+    limit.
+    """
+
+    def __init__(self, es_client, event_group_name, max_docs, max_bytes, # pylint: disable=too-many-arguments
+                 flush_interval_ms, retry_policy, counters, spool=None,
+                 dead_letter_queue=None, coalesce_mode=None,
+                 batch_controller=None, response_cache=None):
+        """
+        Constructor parameters:
+
+        :param Elasticsearch es_client: The Elasticsearch client.
+        :param str event_group_name: The event group name.
+        :param int max_docs: Maximum number of documents to buffer before
+            flushing them to Elasticsearch.
+        :param int max_bytes: Maximum number of bytes (for the serialized
+            '_bulk' request body) to buffer before flushing documents to
+            Elasticsearch.
+        :param int flush_interval_ms: Maximum amount of time, in milliseconds,
+            that a document may be buffered before it is flushed to
+            Elasticsearch.
+        :param dxlelasticsearchservice._retry.RetryPolicy retry_policy: Policy
+            for resubmitting documents which fail with a retryable error.
+        :param dxlelasticsearchservice._stats.Counters counters: Counters to
+            record retries, give-ups, and failures for the event group in.
+        :param dxlelasticsearchservice._spool.Spool spool: Spool to write
+            documents to when the retries for a document are exhausted. If
+            None, documents which cannot be submitted are dropped.
+        :param dxlelasticsearchservice._deadletter.DeadLetterQueue
+            dead_letter_queue: Destination for documents which Elasticsearch
+            permanently rejects. If None, an error is logged for each rejected
+            document.
+        :param str coalesce_mode: How to coalesce operations for the same
+            document ID within a flush: "last" to keep the last operation or
+            "merge" to merge the documents into a partial update. If None,
+            operations are not coalesced.
+        :param dxlelasticsearchservice._adaptive.AdaptiveBatchController
+            batch_controller: Controller which tunes the batch size and the
+            number of in-flight '_bulk' requests. If None, batches are limited
+            to max_docs documents and requests are not limited.
+        :param dxlelasticsearchservice._cache.ResponseCache response_cache:
+            Cache of responses for DXL requests, in which the responses for
+            the indexes written to are invalidated. If None, no responses are
+            cached.
+        """
+        self._es_client = es_client
+        self._serializer = es_client.transport.serializer
+        self._event_group_name = event_group_name
+        self._max_docs = max_docs
+        self._max_bytes = max_bytes
+        self._flush_interval = flush_interval_ms / 1000.0
+        self._retry_policy = retry_policy
+        self._counters = counters
+        self._spool = spool
+        self._dead_letter_queue = dead_letter_queue
+        self._coalesce_mode = coalesce_mode
+        self._batch_controller = batch_controller
+        self._response_cache = response_cache
+
+        self._condition = threading.Condition()
+        self._actions = collections.OrderedDict()
+        self._coalesce_slots = {}
+        self._action_count = 0
+        self._buffered_bytes = 0
+        self._oldest_action_time = None
+        self._closed = False
+
+        self._flush_thread = threading.Thread(
+            target=self._run_flush_timer,
+            name="BulkIndexer-{}".format(event_group_name))
+        self._flush_thread.daemon = True
+        self._flush_thread.start()
+
+    def add(self, index_operation, topic=None, payload=None): # pylint: disable=too-many-locals
+        """
+        Add an 'index' operation to the buffer. If adding the operation causes
+        the document count or byte size limit to be reached, the buffered
+        operations are flushed to Elasticsearch on the calling thread.
+
+        :param dict index_operation: Parameters for the 'index' operation.
+        :param str topic: DXL topic of the event the operation was created
+            from, or None if not known.
+        :param payload: Payload of the event the operation was created from,
+            written to the dead-letter destination if the operation is
+            rejected. If None, the operation body is written instead.
+        """
+        coalesce_key, coalescable, document = \
+            self._get_coalesce_key(index_operation)
+        operation_type = get_operation_type(index_operation)
+        # The origin of the operation is kept alongside the action lines for
+        # dead-letter records, but is not sent to Elasticsearch or spooled
+        origin = (topic, index_operation.get("body")
+                  if payload is None else payload)
+        action = get_bulk_action(self._serializer, index_operation) + \
+            (origin,)
+
+        batches = None
+        with self._condition:
+            if self._closed:
+                raise ValueError(
+                    "Bulk indexer for event group {} has been closed".format(
+                        self._event_group_name))
+            slot = None
+            if coalesce_key and not coalescable:
+                # Later operations for the document must not be coalesced
+                # into an operation buffered ahead of this one
+                self._coalesce_slots.pop(coalesce_key, None)
+                coalesce_key = None
+            elif coalesce_key:
+                self._counters.increment("coalesce_operations")
+                slot = self._coalesce_slots.get(coalesce_key)
+            if slot:
+                actions, position, buffered_type, buffered_document = slot
+                if document is not None and \
+                        operation_type == OPERATION_TYPE_UPDATE:
+                    # Apply the partial update to the buffered document,
+                    # keeping the buffered operation's type so that a
+                    # buffered 'index' still replaces the whole document
+                    document = _merge_documents(buffered_document, document)
+                    operation_type = buffered_type
+                    action = get_bulk_action(
+                        self._serializer,
+                        dict(index_operation, op_type=operation_type,
+                             body=document)) + (origin,)
+                self._buffered_bytes += len(action[0]) + len(action[1]) - \
+                    len(actions[position][0]) - len(actions[position][1])
+                actions[position] = action
+                self._coalesce_slots[coalesce_key] = (
+                    actions, position, operation_type, document)
+                self._counters.increment("coalesced")
+            else:
+                if not self._actions:
+                    self._oldest_action_time = time.time()
+                    self._condition.notify()
+                actions = self._actions.setdefault(
+                    index_operation.get("index"), [])
+                actions.append(action)
+                if coalesce_key:
+                    self._coalesce_slots[coalesce_key] = (
+                        actions, len(actions) - 1, operation_type, document)
+                self._action_count += 1
+                self._buffered_bytes += len(action[0]) + len(action[1])
+            max_docs = self._batch_controller.batch_docs \
+                if self._batch_controller else self._max_docs
+            if self._action_count >= max_docs or \
+                    self._buffered_bytes >= self._max_bytes:
+                batches = self._take_batches()
+
+        if batches:
+            self._send_batches(batches)
+
+    def flush(self):
+        """
+        Submit any buffered operations to Elasticsearch.
+        """
+        with self._condition:
+            batches = self._take_batches()
+        self._send_batches(batches)
+
+    def close(self):
+        """
+        Stop the flush timer and submit any buffered operations to
+        Elasticsearch.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._flush_thread.join()
+        self.flush()
+
+    def _take_batches(self):
+        """
+        Remove all of the buffered operations from the buffer. The caller must
+        hold the buffer condition lock.
+
+        :return: The buffered actions, as a list of actions for each index.
+        :rtype: list(list(tuple))
+        """
+        batches = list(self._actions.values())
+        self._actions = collections.OrderedDict()
+        self._coalesce_slots = {}
+        self._action_count = 0
+        self._buffered_bytes = 0
+        self._oldest_action_time = None
+        return batches
+
+    def _get_coalesce_key(self, index_operation):
+        """
+        Get the key by which an operation is coalesced with other operations
+        for the same document.
+
+        :param dict index_operation: Parameters for the operation.
+        :return: Tuple containing the key, or None if the operation has no
+            document ID, whether or not the operation can be coalesced, and,
+            if operations are merged, the document for the operation (or None
+            otherwise).
+        :rtype: tuple
+        """
+        if not self._coalesce_mode or index_operation.get("id") is None:
+            return None, False, None
+
+        key = (index_operation.get("index"), index_operation.get("doc_type"),
+               index_operation.get("id"), index_operation.get("routing"),
+               index_operation.get("parent"))
+        operation_type = get_operation_type(index_operation)
+        if self._coalesce_mode != COALESCE_MODE_MERGE:
+            # A partial update cannot replace an earlier operation, and a
+            # 'create', which fails if the document exists, cannot replace
+            # (or be replaced by) an operation which overwrites it
+            return key, operation_type in (OPERATION_TYPE_INDEX,
+                                           OPERATION_TYPE_DELETE), None
+
+        # Only operations which write document fields can be merged, and
+        # updates do not support versions or ingest pipelines
+        if operation_type not in (OPERATION_TYPE_INDEX,
+                                  OPERATION_TYPE_UPDATE) or \
+                any(index_operation.get(name) is not None
+                    for name in ("version", "version_type", "pipeline")):
+            return key, False, None
+        try:
+            document = get_document(self._serializer,
+                                    index_operation.get("body"))
+        except Exception:  # pylint: disable=broad-except
+            return key, False, None
+        if not isinstance(document, dict):
+            return key, False, None
+        return key, True, document
+
+    def _run_flush_timer(self):
+        """
+        Flush buffered operations once the oldest operation in the buffer has
+        been held for the flush interval.
+        """
+        while True:
+            with self._condition:
+                while not self._closed and not self._actions:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                remaining = self._oldest_action_time + self._flush_interval - \
+                    time.time()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                batches = self._take_batches()
+            self._send_batches(batches)
+
+    def _send_batches(self, batches):
+        """
+        Submit batches of actions to the Elasticsearch '_bulk' API.
+
+        :param list(list(tuple)) batches: The actions to submit, as a list of
+            actions for each index.
+        """
+        for batch in batches:
+            self._send_batch(batch)
+
+    def _send_batch(self, batch):
+        """
+        Submit a batch of actions to the Elasticsearch '_bulk' API. Actions
+        which fail with a retryable error are resubmitted (without the actions
+        which succeeded or failed permanently) according to the retry policy.
+
+        :param list(tuple) batch: The actions to submit.
+        """
+        logger.debug("Flushing %d buffered document(s) for event group %s",
+                     len(batch), self._event_group_name)
+        attempt = 0
+        while True:
+            batch = self._submit_batch(batch)
+            if not batch:
+                return
+            if attempt >= self._retry_policy.max_retries:
+                self._counters.increment("give_ups", len(batch))
+                if self._spool:
+                    self._spool_actions(batch)
+                else:
+                    logger.error(
+                        "Dropped %d document(s) for event group %s after %d "
+                        "retries", len(batch), self._event_group_name, attempt)
+                return
+            self._counters.increment("retries", len(batch))
+            time.sleep(self._retry_policy.get_backoff(attempt))
+            attempt += 1
+
+    def _submit_batch(self, batch):
+        """
+        Submit a batch of actions in a single '_bulk' API request, waiting
+        first, if a batch controller is used, until the number of in-flight
+        requests is within the controller's limit.
+
+        :param list(tuple) batch: The actions to submit.
+        :return: The actions which failed with a retryable error.
+        :rtype: list(tuple)
+        """
+        if not self._batch_controller:
+            return self._submit_batch_request(batch)[0]
+
+        self._batch_controller.acquire()
+        start_time = time.time()
+        retry_actions, throttled = batch, False
+        try:
+            retry_actions, throttled = self._submit_batch_request(batch)
+        finally:
+            self._batch_controller.release(time.time() - start_time,
+                                           throttled)
+        return retry_actions
+
+    def _submit_batch_request(self, batch):
+        """
+        Submit a batch of actions in a single '_bulk' API request.
+
+        :param list(tuple) batch: The actions to submit.
+        :return: Tuple containing the actions which failed with a retryable
+            error and whether or not Elasticsearch throttled the request or
+            any of the actions.
+        :rtype: tuple(list(tuple), bool)
+        """
+        try:
+            response = self._es_client.bulk(
+                body="".join(action[0] + action[1] for action in batch))
+        except Exception as ex:  # pylint: disable=broad-except
+            if isinstance(ex, RequestRejectedError):
+                # Retrying the request would be rejected as well, so divert
+                # the actions rather than holding up the caller
+                self._divert_actions(batch, ex)
+                return [], True
+            throttled = getattr(ex, "status_code", None) == \
+                THROTTLED_STATUS_CODE
+            if is_retryable_error(ex):
+                logger.warning(
+                    "Error bulk indexing %d document(s) for event group %s: "
+                    "%s", len(batch), self._event_group_name, ex)
+                return batch, throttled
+            self._counters.increment("failures", len(batch))
+            if self._dead_letter_queue:
+                logger.debug(
+                    "Error bulk indexing %d document(s) for event group %s: "
+                    "%s", len(batch), self._event_group_name, ex)
+                for action in batch:
+                    self._dead_letter_queue.add(
+                        action[2][0],
+                        self._get_action_metadata(action),
+                        action[2][1],
+                        str(ex))
+            else:
+                logger.exception(
+                    "Error bulk indexing %d document(s) for event group %s",
+                    len(batch), self._event_group_name)
+            return [], throttled
+
+        if self._response_cache:
+            self._response_cache.invalidate_bulk_response(response)
+
+        retry_actions = []
+        throttled = False
+        if response.get("errors"):
+            for item, action in zip(response.get("items", ()), batch):
+                result = get_bulk_item_result(item)
+                if result.get("status") in RETRYABLE_STATUS_CODES:
+                    retry_actions.append(action)
+                    throttled = throttled or \
+                        result.get("status") == THROTTLED_STATUS_CODE
+                elif "error" in result:
+                    self._counters.increment("failures")
+                    if self._dead_letter_queue:
+                        self._dead_letter_queue.add(
+                            action[2][0],
+                            {"index": result.get("_index"),
+                             "doc_type": result.get("_type"),
+                             "id": result.get("_id")},
+                            action[2][1],
+                            result.get("error"))
+                        continue
+                    logger.error(
+                        "%s. Event: %s, Index: %s, Type: %s, ID: %s, "
+                        "Status: %s, Error: %s.",
+                        "Error bulk indexing event to elasticsearch",
+                        self._event_group_name,
+                        result.get("_index"),
+                        result.get("_type"),
+                        result.get("_id"),
+                        result.get("status"),
+                        result.get("error"))
+        return retry_actions, throttled
+
+    def _get_action_metadata(self, action):
+        """
+        Get the 'index' operation parameters from the action line of an
+        action.
+
+        :param tuple action: The action.
+        :return: Dictionary containing the 'index', 'doc_type', and 'id' for
+            the action.
+        :rtype: dict
+        """
+        metadata = get_bulk_item_result(self._serializer.loads(action[0]))
+        return {"index": metadata.get("_index"),
+                "doc_type": metadata.get("_type"),
+                "id": metadata.get("_id")}
+
+    def _divert_actions(self, actions, error):
+        """
+        Write actions for a request which was rejected without being sent to
+        Elasticsearch to the spool or, if there is no spool, to the
+        dead-letter destination.
+
+        :param list(tuple) actions: The actions to divert.
+        :param Exception error: The error for the rejected request.
+        """
+        self._counters.increment("diverted", len(actions))
+        if self._spool:
+            self._spool_actions(actions)
+        elif self._dead_letter_queue:
+            for action in actions:
+                self._dead_letter_queue.add(
+                    action[2][0],
+                    self._get_action_metadata(action),
+                    action[2][1],
+                    str(error))
+        else:
+            logger.error("Dropped %d document(s) for event group %s: %s",
+                         len(actions), self._event_group_name, error)
+
+    def _spool_actions(self, actions):
+        """
+        Write actions which could not be submitted to Elasticsearch to the
+        spool.
+
+        :param list(tuple) actions: The actions to spool.
+        """
+        if self._spool.append([action[:2] for action in actions],
+                              self._event_group_name):
+            logger.info("Spooled %d document(s) for event group %s",
+                        len(actions), self._event_group_name)
+        else:
+            logger.error(
+                "Spool is full, dropped %d document(s) for event group %s",
+                len(actions), self._event_group_name)
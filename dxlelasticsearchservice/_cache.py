@@ -0,0 +1,335 @@
+from __future__ import absolute_import
+import collections
+import fnmatch
+import json
+import threading
+import time
+
+from dxlelasticsearchservice._bulk import get_bulk_item_result
+
+#: Index expression which refers to all indexes.
+_ALL_INDEXES = "_all"
+
+#: Characters which make an index expression a wildcard pattern.
+_WILDCARD_CHARACTERS = "*?["
+
+#: Maximum number of index names and patterns for which the cache generation
+#: of the last write is recorded. Once this limit is exceeded, the records
+#: are cleared and all cached responses are invalidated.
+_MAX_WRITE_RECORDS = 10000
+
+
+def get_request_key(api_name, request_dict):
+    """
+    Get a key which identifies a request, with the keys in any dictionaries
+    in the request parameters sorted so that equivalent requests have the
+    same key.
+
+    :param str api_name: Name of the API method.
+    :param dict request_dict: The request parameters.
+    :return: The key.
+    :rtype: tuple
+    """
+    return api_name, json.dumps(request_dict, sort_keys=True,
+                                separators=(",", ":"), default=str)
+
+
+def get_index_patterns(index):
+    """
+    Get the index names or wildcard patterns which an 'index' parameter for an
+    Elasticsearch API refers to.
+
+    :param index: The 'index' parameter: a name, a comma-delimited list of
+        names, a list of names, or None.
+    :return: The index names and patterns, or None if the parameter refers to
+        all indexes.
+    :rtype: tuple(str)
+    """
+    if index is None:
+        return None
+    if isinstance(index, (list, tuple)):
+        patterns = tuple(name.strip() for item in index
+                         for name in str(item).split(","))
+    else:
+        patterns = tuple(name.strip() for name in str(index).split(","))
+    patterns = tuple(pattern for pattern in patterns if pattern)
+    if not patterns or _ALL_INDEXES in patterns:
+        return None
+    return patterns
+
+
+def patterns_overlap(patterns, other_patterns):
+    """
+    Determine whether or not two sets of index names and patterns may refer
+    to a common index.
+
+    :param tuple(str) patterns: The first set of names and patterns, or None
+        for all indexes.
+    :param tuple(str) other_patterns: The second set of names and patterns, or
+        None for all indexes.
+    :return: True if the sets may refer to a common index, False otherwise.
+    :rtype: bool
+    """
+    if patterns is None or other_patterns is None:
+        return True
+    return any(fnmatch.fnmatchcase(pattern, other_pattern) or
+               fnmatch.fnmatchcase(other_pattern, pattern)
+               for pattern in patterns for other_pattern in other_patterns)
+
+
+def _is_wildcard(pattern):
+    """
+    Determine whether or not an index expression is a wildcard pattern.
+
+    :param str pattern: The index name or pattern.
+    :return: True if the expression is a wildcard pattern, False if it is an
+        index name.
+    :rtype: bool
+    """
+    return any(character in pattern for character in _WILDCARD_CHARACTERS)
+
+
+class _CacheEntry(object): # pylint: disable=too-few-public-methods
+    """
+    Cached response for a request.
+    """
+    __slots__ = ("expiry_time", "index_patterns", "generation", "payload",
+                 "size")
+
+    def __init__(self, expiry_time, index_patterns, generation, payload, # pylint: disable=too-many-arguments
+                 size):
+        self.expiry_time = expiry_time
+        self.index_patterns = index_patterns
+        self.generation = generation
+        self.payload = payload
+        self.size = size
+
+
+class ResponseCache(object): # pylint: disable=too-many-instance-attributes
+    """
+    Read-through cache of encoded response payloads for requests to
+    Elasticsearch APIs which only read data.
+
+    Responses are keyed on the API name and the request parameters, with
+    dictionary keys sorted so that equivalent requests share an entry. Each
+    API has its own time-to-live, and the least recently used responses are
+    evicted once the total size of the cached payloads exceeds a limit.
+
+    Writes to an index invalidate the responses for requests against that
+    index (including requests with a wildcard pattern which matches it and
+    requests against all indexes). Because index aliases are not resolved,
+    responses for requests against an alias are only refreshed once they
+    expire.
+
+    A write only records the cache generation at which each of its indexes
+    was last written to. A cached response read at an earlier generation is
+    discarded when it is next looked up, so the cost of a write does not
+    depend on the number of cached responses.
+    """
+
+    def __init__(self, ttls_ms, max_bytes):
+        """
+        Constructor parameters:
+
+        :param dict ttls_ms: Dictionary of the names of the API methods whose
+            responses may be cached to the time, in milliseconds, that their
+            responses are cached for.
+        :param int max_bytes: Maximum total size, in bytes, of the cached
+            response payloads.
+        """
+        self._ttls = {api_name: ttl_ms / 1000.0
+                      for api_name, ttl_ms in ttls_ms.items()}
+        self._max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        # Cache generation of the last write to all indexes, to each index
+        # name, to an index matching each wildcard pattern in a cached
+        # request, and to each wildcard pattern written to
+        self._all_indexes_generation = 0
+        self._index_generations = {}
+        self._read_pattern_generations = {}
+        self._write_pattern_generations = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def stats(self):
+        """
+        Statistics for the cache: the number of hits, misses, evictions, and
+        invalidated entries, the hit ratio, and the current number and total
+        size of the cached entries.
+
+        :rtype: dict
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {"hits": self._hits,
+                    "misses": self._misses,
+                    "hit_ratio": float(self._hits) / lookups if lookups else 0,
+                    "evictions": self._evictions,
+                    "invalidations": self._invalidations,
+                    "entries": len(self._entries),
+                    "bytes": self._bytes}
+
+    def is_cacheable(self, api_name):
+        """
+        Determine whether or not responses for an API method are cached.
+
+        :param str api_name: Name of the API method, for example, "search".
+        :return: True if responses are cached, False otherwise.
+        :rtype: bool
+        """
+        return api_name in self._ttls
+
+    def get(self, key):
+        """
+        Get a cached response.
+
+        :param tuple key: The key for the response, from
+            :func:`get_request_key`.
+        :return: Tuple containing the encoded response payload, or None if
+            the response is not cached, and the cache generation, which must
+            be passed to :meth:`put` when caching the response for a miss.
+        :rtype: tuple(bytes, int)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                if entry.expiry_time <= time.time():
+                    self._remove(key)
+                elif not self._is_current(entry.index_patterns,
+                                          entry.generation):
+                    self._remove(key)
+                    self._invalidations += 1
+                else:
+                    # Re-insert the entry to mark it as the most recently used
+                    self._entries[key] = self._entries.pop(key)
+                    self._hits += 1
+                    return entry.payload, self._generation
+            self._misses += 1
+            return None, self._generation
+
+    def put(self, key, index, payload, generation):
+        """
+        Cache a response.
+
+        :param tuple key: The key for the response, from
+            :func:`get_request_key`.
+        :param index: The 'index' parameter for the request.
+        :param bytes payload: The encoded response payload.
+        :param int generation: The cache generation returned by :meth:`get`
+            before the request was sent. If the indexes for the request have
+            been invalidated since, the response is not cached, since it may
+            have been read before the write which caused the invalidation.
+        """
+        size = len(key[1]) + len(payload)
+        if size > self._max_bytes:
+            return
+        index_patterns = get_index_patterns(index)
+        entry = _CacheEntry(time.time() + self._ttls[key[0]], index_patterns,
+                            generation, payload, size)
+        with self._lock:
+            for pattern in index_patterns or ():
+                if _is_wildcard(pattern) and \
+                        pattern not in self._read_pattern_generations:
+                    self._read_pattern_generations[pattern] = max(
+                        [index_generation for name, index_generation
+                         in self._index_generations.items()
+                         if fnmatch.fnmatchcase(name, pattern)] or [0])
+            if not self._is_current(index_patterns, generation):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, index):
+        """
+        Invalidate the cached responses for requests which may read from the
+        indexes referred to by an 'index' parameter.
+
+        :param index: The 'index' parameter for a write. If None, all cached
+            responses are invalidated.
+        """
+        patterns = get_index_patterns(index)
+        with self._lock:
+            self._generation += 1
+            if patterns is None:
+                self._all_indexes_generation = self._generation
+                return
+            for pattern in patterns:
+                if _is_wildcard(pattern):
+                    self._write_pattern_generations[pattern] = \
+                        self._generation
+                    continue
+                self._index_generations[pattern] = self._generation
+                for read_pattern in [
+                        read_pattern for read_pattern
+                        in self._read_pattern_generations
+                        if fnmatch.fnmatchcase(pattern, read_pattern)]:
+                    self._read_pattern_generations[read_pattern] = \
+                        self._generation
+            if len(self._index_generations) + \
+                    len(self._read_pattern_generations) + \
+                    len(self._write_pattern_generations) > _MAX_WRITE_RECORDS:
+                self._all_indexes_generation = self._generation
+                self._index_generations.clear()
+                self._read_pattern_generations.clear()
+                self._write_pattern_generations.clear()
+
+    def invalidate_bulk_response(self, response):
+        """
+        Invalidate the cached responses for requests which may read from the
+        indexes written to by a '_bulk' API request.
+
+        :param dict response: The response for the request.
+        """
+        indexes = set(get_bulk_item_result(item).get("_index")
+                      for item in response.get("items", ()))
+        indexes.discard(None)
+        if indexes:
+            self.invalidate(sorted(indexes))
+
+    def _is_current(self, index_patterns, generation):
+        """
+        Determine whether or not a response read at a cache generation is
+        still current, that is, none of the indexes which it may have read
+        from have been written to since. The caller must hold the cache lock.
+
+        :param tuple(str) index_patterns: The index names and patterns for the
+            request, or None for all indexes.
+        :param int generation: The cache generation at which the response was
+            read.
+        :return: True if the response is current, False otherwise.
+        :rtype: bool
+        """
+        if index_patterns is None:
+            return self._generation <= generation
+        if self._all_indexes_generation > generation:
+            return False
+        for pattern in index_patterns:
+            generations = self._read_pattern_generations \
+                if _is_wildcard(pattern) else self._index_generations
+            if generations.get(pattern, 0) > generation:
+                return False
+        return not any(
+            write_generation > generation and
+            patterns_overlap(index_patterns, (write_pattern,))
+            for write_pattern, write_generation
+            in self._write_pattern_generations.items())
+
+    def _remove(self, key):
+        """
+        Remove an entry. The caller must hold the cache lock.
+
+        :param tuple key: The key for the entry.
+        """
+        self._bytes -= self._entries.pop(key).size
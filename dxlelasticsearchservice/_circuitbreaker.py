@@ -0,0 +1,204 @@
+from __future__ import absolute_import
+import logging
+import threading
+import time
+
+from elasticsearch.transport import Transport
+
+from dxlelasticsearchservice._retry import RequestRejectedError, \
+    is_retryable_error
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+#: State in which requests are passed through to Elasticsearch.
+STATE_CLOSED = "closed"
+#: State in which requests fail immediately without being sent.
+STATE_OPEN = "open"
+#: State in which a limited number of probe requests are sent to determine
+#: whether or not Elasticsearch has recovered.
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreakerOpenError(RequestRejectedError):
+    """
+    Error raised for a request which is rejected without being sent to
+    Elasticsearch because the circuit breaker is open.
+    """
+
+
+class CircuitBreaker(object): # pylint: disable=too-many-instance-attributes
+    """
+    Circuit breaker for requests to Elasticsearch.
+
+    The breaker opens after a number of consecutive requests fail with a
+    retryable error or exceed a latency threshold. While the breaker is open,
+    requests fail immediately with a :class:`CircuitBreakerOpenError` rather
+    than waiting for the transport timeout. Once the breaker has been open for
+    a period, it becomes half-open and admits probe requests, starting with a
+    single request and doubling the number of concurrent probes after each
+    successful probe, so that traffic is restored gradually. The breaker
+    closes once enough probes have succeeded and opens again if a probe
+    fails.
+    """
+
+    def __init__(self, failure_threshold, latency_threshold_ms, open_ms,
+                 half_open_successes):
+        """
+        Constructor parameters:
+
+        :param int failure_threshold: Number of consecutive failed (or slow)
+            requests after which the breaker opens.
+        :param int latency_threshold_ms: Latency, in milliseconds, above
+            which a request which succeeds is counted as a failure. If 0,
+            latency is not considered.
+        :param int open_ms: Time, in milliseconds, that the breaker stays
+            open before admitting probe requests.
+        :param int half_open_successes: Number of successful probe requests
+            after which the breaker closes.
+        """
+        self._failure_threshold = failure_threshold
+        self._latency_threshold = latency_threshold_ms / 1000.0
+        self._open_duration = open_ms / 1000.0
+        self._half_open_successes = half_open_successes
+
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_time = None
+        self._probe_successes = 0
+        self._probes_in_flight = 0
+        self._rejections = 0
+
+    @property
+    def state(self):
+        """
+        The current state of the breaker: "closed", "open", or "half_open".
+
+        :rtype: str
+        """
+        with self._lock:
+            if self._state == STATE_OPEN and \
+                    time.time() >= self._opened_time + self._open_duration:
+                return STATE_HALF_OPEN
+            return self._state
+
+    @property
+    def rejections(self):
+        """
+        The number of requests which have been rejected while the breaker was
+        open.
+
+        :rtype: int
+        """
+        return self._rejections
+
+    def call(self, function, *args, **kwargs):
+        """
+        Invoke a function which sends a request to Elasticsearch, if the
+        breaker admits the request.
+
+        :param function: The function to invoke.
+        :return: The value returned by the function.
+        :raises CircuitBreakerOpenError: If the breaker rejects the request.
+        :raises Exception: Any exception raised by the function.
+        """
+        probe = self._admit()
+        start_time = time.time()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as ex:
+            self._record(probe, not is_retryable_error(ex))
+            raise
+        self._record(probe,
+                     not self._latency_threshold or
+                     time.time() - start_time <= self._latency_threshold)
+        return result
+
+    def _admit(self):
+        """
+        Determine whether or not a request may be sent.
+
+        :return: True if the request is a half-open probe, False if the
+            breaker is closed.
+        :rtype: bool
+        :raises CircuitBreakerOpenError: If the breaker rejects the request.
+        """
+        with self._lock:
+            if self._state == STATE_CLOSED:
+                return False
+            if self._state == STATE_OPEN:
+                if time.time() < self._opened_time + self._open_duration:
+                    self._rejections += 1
+                    raise CircuitBreakerOpenError(
+                        "N/A", "Elasticsearch circuit breaker is open")
+                logger.info("Elasticsearch circuit breaker is half-open")
+                self._state = STATE_HALF_OPEN
+                self._probe_successes = 0
+                self._probes_in_flight = 0
+            if self._probes_in_flight >= 2 ** self._probe_successes:
+                self._rejections += 1
+                raise CircuitBreakerOpenError(
+                    "N/A", "Elasticsearch circuit breaker is half-open")
+            self._probes_in_flight += 1
+            return True
+
+    def _record(self, probe, success):
+        """
+        Record the outcome of a request and update the state of the breaker.
+
+        :param bool probe: Whether or not the request was a half-open probe.
+        :param bool success: Whether or not the request succeeded within the
+            latency threshold.
+        """
+        with self._lock:
+            if probe:
+                self._probes_in_flight -= 1
+            if self._state == STATE_OPEN:
+                return
+            if success:
+                self._failures = 0
+                if self._state == STATE_HALF_OPEN:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self._half_open_successes:
+                        logger.info("Elasticsearch circuit breaker is closed")
+                        self._state = STATE_CLOSED
+                return
+            self._failures += 1
+            if self._state == STATE_HALF_OPEN or \
+                    self._failures >= self._failure_threshold:
+                logger.warning(
+                    "Elasticsearch circuit breaker is open after %d "
+                    "failed request(s)", self._failures)
+                self._state = STATE_OPEN
+                self._opened_time = time.time()
+                self._failures = 0
+
+
+class CircuitBreakerTransport(Transport):
+    """
+    Elasticsearch transport which sends each request through a
+    :class:`CircuitBreaker`.
+    """
+
+    def __init__(self, hosts, circuit_breaker=None, **kwargs):
+        """
+        Constructor parameters:
+
+        :param hosts: The hosts, as for the
+            :class:`elasticsearch.transport.Transport`.
+        :param CircuitBreaker circuit_breaker: The circuit breaker. If None,
+            requests are sent without a circuit breaker.
+        :param kwargs: Parameters for the
+            :class:`elasticsearch.transport.Transport`.
+        """
+        super(CircuitBreakerTransport, self).__init__(hosts, **kwargs)
+        self._circuit_breaker = circuit_breaker
+
+    def perform_request(self, method, url, params=None, body=None):
+        if not self._circuit_breaker:
+            return super(CircuitBreakerTransport, self).perform_request(
+                method, url, params, body)
+        return self._circuit_breaker.call(
+            super(CircuitBreakerTransport, self).perform_request,
+            method, url, params, body)
@@ -0,0 +1,213 @@
+from __future__ import absolute_import
+import json
+
+from elasticsearch.compat import string_types
+from elasticsearch.exceptions import SerializationError
+from elasticsearch.serializer import JSONSerializer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None # pylint: disable=invalid-name
+
+try:
+    import ujson
+except ImportError:
+    ujson = None # pylint: disable=invalid-name
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None # pylint: disable=invalid-name
+
+
+class JsonCodec(object):
+    """
+    Encodes and decodes JSON documents using the standard library 'json'
+    module. Subclasses use faster third-party libraries, falling back to the
+    standard library for any value which the library cannot handle so that
+    the results are the same regardless of the codec in use.
+    """
+
+    #: Name of the codec, as specified in the application configuration file.
+    name = "json"
+    #: Library module used by the codec, or None if it is not installed.
+    library = json
+
+    def loads(self, data):
+        """
+        Decode a JSON document.
+
+        :param data: The JSON document, as a byte string or string. Trailing
+            null characters are ignored.
+        :return: The decoded value.
+        :raises ValueError: If the document is not valid JSON.
+        """
+        if isinstance(data, (bytes, bytearray)):
+            data = bytes(data).rstrip(b"\0").decode("utf-8")
+        else:
+            data = data.rstrip("\0")
+        return json.loads(data)
+
+    def dumps(self, value, default=None):
+        """
+        Encode a value as a JSON document.
+
+        :param value: The value to encode.
+        :param default: Function invoked to convert a value which cannot
+            otherwise be encoded, or None.
+        :return: The JSON document.
+        :rtype: str
+        :raises TypeError: If the value cannot be encoded.
+        """
+        return json.dumps(value, default=default, ensure_ascii=False)
+
+    def dumps_bytes(self, value, default=None):
+        """
+        Encode a value as a UTF-8 encoded JSON document.
+
+        :param value: The value to encode.
+        :param default: Function invoked to convert a value which cannot
+            otherwise be encoded, or None.
+        :return: The JSON document.
+        :rtype: bytes
+        :raises TypeError: If the value cannot be encoded.
+        """
+        return self.dumps(value, default).encode("utf-8")
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    Encodes and decodes JSON documents using the 'orjson' library.
+    """
+
+    name = "orjson"
+    library = orjson
+
+    def loads(self, data):
+        try:
+            if isinstance(data, bytearray):
+                data = bytes(data)
+            return orjson.loads( # pylint: disable=no-member
+                data.rstrip(b"\0") if isinstance(data, bytes)
+                else data.rstrip("\0"))
+        except ValueError:
+            # For example, a 'NaN' value, which orjson does not accept
+            return super(OrjsonCodec, self).loads(data)
+
+    def dumps(self, value, default=None):
+        return self.dumps_bytes(value, default).decode("utf-8")
+
+    def dumps_bytes(self, value, default=None):
+        try:
+            return orjson.dumps( # pylint: disable=no-member
+                value, default=default)
+        except TypeError:
+            # For example, a dictionary with non-string keys
+            return JsonCodec.dumps(self, value, default).encode("utf-8")
+
+
+class UjsonCodec(JsonCodec):
+    """
+    Encodes and decodes JSON documents using the 'ujson' library.
+    """
+
+    name = "ujson"
+    library = ujson
+
+    def loads(self, data):
+        try:
+            if isinstance(data, (bytes, bytearray)):
+                data = bytes(data).rstrip(b"\0")
+            else:
+                data = data.rstrip("\0")
+            return ujson.loads(data)
+        except ValueError:
+            return super(UjsonCodec, self).loads(data)
+
+    def dumps(self, value, default=None):
+        try:
+            return ujson.dumps(value, ensure_ascii=False,
+                                     escape_forward_slashes=False)
+        except (TypeError, OverflowError):
+            # For example, a value which requires the default function
+            return super(UjsonCodec, self).dumps(value, default)
+
+
+class SimdjsonCodec(JsonCodec):
+    """
+    Decodes JSON documents using the 'simdjson' library. Documents are
+    encoded using the standard library.
+    """
+
+    name = "simdjson"
+    library = simdjson
+
+    def loads(self, data):
+        try:
+            if isinstance(data, (bytes, bytearray)):
+                data = bytes(data).rstrip(b"\0")
+            else:
+                data = data.rstrip("\0")
+            return simdjson.loads(data)
+        except ValueError:
+            return super(SimdjsonCodec, self).loads(data)
+
+
+#: Codecs in order of preference when the codec is selected automatically.
+_CODECS = (OrjsonCodec, UjsonCodec, SimdjsonCodec, JsonCodec)
+
+#: Name used to select the fastest available codec.
+AUTO_CODEC_NAME = "auto"
+
+
+def get_codec(name=AUTO_CODEC_NAME):
+    """
+    Get a JSON codec.
+
+    :param str name: Name of the codec, or "auto" to select the fastest codec
+        whose library is installed.
+    :return: The codec.
+    :rtype: JsonCodec
+    :raises ValueError: If the name is not a known codec or the library for
+        the codec is not installed.
+    """
+    for codec_class in _CODECS:
+        if name in (AUTO_CODEC_NAME, codec_class.name):
+            if codec_class.library:
+                return codec_class()
+            if name != AUTO_CODEC_NAME:
+                raise ValueError(
+                    "Library for JSON codec {} is not installed".format(name))
+    raise ValueError("Unknown JSON codec: {}".format(name))
+
+
+class CodecSerializer(JSONSerializer):
+    """
+    Elasticsearch client serializer which encodes and decodes documents with
+    a JSON codec.
+    """
+
+    def __init__(self, codec):
+        """
+        Constructor parameters:
+
+        :param JsonCodec codec: The codec.
+        """
+        self._codec = codec
+
+    def loads(self, s):
+        try:
+            return self._codec.loads(s)
+        except (ValueError, TypeError) as ex:
+            raise SerializationError(s, ex)
+
+    def dumps(self, data):
+        # Strings are assumed to already be serialized
+        if isinstance(data, string_types):
+            return data
+
+        try:
+            return self._codec.dumps(data, self.default)
+        except (ValueError, TypeError) as ex:
+            raise SerializationError(data, ex)
@@ -0,0 +1,56 @@
+from __future__ import absolute_import
+import gzip
+import io
+
+import urllib3
+from elasticsearch.connection import Urllib3HttpConnection
+
+
+def _gzip_compress(data):
+    """
+    Compress data in the gzip format.
+
+    :param bytes data: The data.
+    :return: The compressed data.
+    :rtype: bytes
+    """
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as gzip_file:
+        gzip_file.write(data)
+    return buffer.getvalue()
+
+
+class HttpConnection(Urllib3HttpConnection):
+    """
+    Connection to an Elasticsearch node which can optionally compress
+    request bodies and apply a separate timeout for establishing connections.
+    """
+
+    def __init__(self, http_compress=False, connect_timeout=None, **kwargs):
+        """
+        Constructor parameters:
+
+        :param bool http_compress: Whether or not to compress request bodies
+            with gzip and to ask for compressed responses.
+        :param float connect_timeout: Timeout, in seconds, for establishing a
+            connection, or None to use the request timeout.
+        :param kwargs: Parameters for the
+            :class:`elasticsearch.connection.Urllib3HttpConnection`.
+        """
+        if connect_timeout is not None:
+            kwargs["timeout"] = urllib3.Timeout(
+                connect=connect_timeout, read=kwargs.get("timeout", 10))
+        super(HttpConnection, self).__init__(**kwargs)
+        self._http_compress = http_compress
+        if http_compress:
+            self.headers.update(urllib3.make_headers(accept_encoding=True))
+            self.headers["content-encoding"] = "gzip"
+
+    def perform_request(self, method, url, params=None, body=None, # pylint: disable=too-many-arguments
+                        timeout=None, ignore=()):
+        if self._http_compress and body:
+            if not isinstance(body, bytes):
+                body = body.encode("utf-8")
+            body = _gzip_compress(body)
+        return super(HttpConnection, self).perform_request(
+            method, url, params, body, timeout, ignore)
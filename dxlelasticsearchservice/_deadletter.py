@@ -0,0 +1,226 @@
+from __future__ import absolute_import
+import datetime
+import logging
+import os
+import threading
+
+from dxlbootstrap.util import MessageUtils
+from dxlclient.message import Event
+from dxlelasticsearchservice._batcher import MicroBatcher
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+
+class DeadLetterQueue(object):
+    """
+    Base class for destinations of documents which Elasticsearch permanently
+    rejected. Records are collected off of the indexing path and written to
+    the destination in batches.
+    """
+
+    #: Maximum number of records to write in a single batch.
+    _BATCH_SIZE = 100
+    #: Maximum time, in milliseconds, that a record waits before it is
+    #: written.
+    _FLUSH_INTERVAL_MS = 1000
+    #: Maximum number of records which may be waiting to be written. Records
+    #: added beyond this limit are dropped.
+    _MAX_PENDING = 10000
+
+    def __init__(self, event_group_name, counters):
+        """
+        Constructor parameters:
+
+        :param str event_group_name: The event group name.
+        :param dxlelasticsearchservice._stats.Counters counters: Counters to
+            record dead-lettered and dropped documents for the event group in.
+        """
+        self._event_group_name = event_group_name
+        self._counters = counters
+        self._batcher = MicroBatcher(
+            "DeadLetter-{}".format(event_group_name),
+            self._write_records,
+            self._BATCH_SIZE,
+            self._FLUSH_INTERVAL_MS,
+            self._MAX_PENDING)
+
+    def add(self, topic, index_parameters, payload, error):
+        """
+        Add a record for a rejected document.
+
+        :param str topic: DXL topic of the event the document was created
+            from, or None if not known.
+        :param dict index_parameters: Dictionary containing the 'index',
+            'doc_type', and 'id' for the document.
+        :param payload: The original document source.
+        :param error: The reason that Elasticsearch rejected the document.
+        """
+        if isinstance(payload, (bytes, bytearray)):
+            payload = payload.decode("utf-8", "replace")
+        elif isinstance(payload, (dict, list)):
+            payload = MessageUtils.dict_to_json(payload)
+        record = {
+            "@timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+            "eventGroup": self._event_group_name,
+            "topic": topic,
+            "index": index_parameters.get("index"),
+            "doc_type": index_parameters.get("doc_type"),
+            "id": index_parameters.get("id"),
+            "payload": payload,
+            "error": error if isinstance(error, (dict, list)) else str(error)
+        }
+        if self._batcher.add(record):
+            self._counters.increment("dead_lettered")
+        else:
+            self._counters.increment("dead_letters_dropped")
+
+    def close(self):
+        """
+        Write any pending records and release resources.
+        """
+        self._batcher.close()
+
+    def _write_records(self, records):
+        """
+        Write a batch of records to the destination.
+
+        :param list(dict) records: The records to write.
+        """
+        raise NotImplementedError()
+
+
+class IndexDeadLetterQueue(DeadLetterQueue):
+    """
+    Dead-letter destination which stores records in a separate Elasticsearch
+    index. The original payload is stored as a string so that a document
+    rejected for a mapping conflict is not rejected again.
+    """
+
+    #: The Elasticsearch document type for dead-letter records.
+    _DOCUMENT_TYPE = "dead-letter"
+
+    def __init__(self, event_group_name, counters, es_client, index):
+        """
+        Constructor parameters:
+
+        :param str event_group_name: The event group name.
+        :param dxlelasticsearchservice._stats.Counters counters: Counters to
+            record dead-lettered and dropped documents for the event group in.
+        :param Elasticsearch es_client: The Elasticsearch client.
+        :param str index: Index in which to store dead-letter records.
+        """
+        self._es_client = es_client
+        self._index = index
+        super(IndexDeadLetterQueue, self).__init__(event_group_name, counters)
+
+    def _write_records(self, records):
+        serializer = self._es_client.transport.serializer
+        action = serializer.dumps(
+            {"index": {"_index": self._index,
+                       "_type": self._DOCUMENT_TYPE}}) + "\n"
+        response = self._es_client.bulk(
+            body="".join(action + serializer.dumps(record) + "\n"
+                         for record in records))
+        if response.get("errors"):
+            logger.error("Error storing dead-letter records for event group "
+                         "%s to index %s", self._event_group_name,
+                         self._index)
+
+
+class FileDeadLetterQueue(DeadLetterQueue):
+    """
+    Dead-letter destination which appends records to a newline-delimited JSON
+    file. The file is rotated when it reaches a maximum size.
+    """
+
+    def __init__(self, event_group_name, counters, path, max_bytes,
+                 backup_count):
+        """
+        Constructor parameters:
+
+        :param str event_group_name: The event group name.
+        :param dxlelasticsearchservice._stats.Counters counters: Counters to
+            record dead-lettered and dropped documents for the event group in.
+        :param str path: Path to the file.
+        :param int max_bytes: Size, in bytes, at which the file is rotated.
+        :param int backup_count: Number of rotated files to keep.
+        """
+        self._path = path
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._file = None
+        self._file_lock = threading.Lock()
+        super(FileDeadLetterQueue, self).__init__(event_group_name, counters)
+
+    def close(self):
+        super(FileDeadLetterQueue, self).close()
+        with self._file_lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _write_records(self, records):
+        data = "".join(MessageUtils.dict_to_json(record) + "\n"
+                       for record in records).encode("utf-8")
+        with self._file_lock:
+            if not self._file:
+                self._file = open(self._path, "ab")
+            if self._file.tell() and \
+                    self._file.tell() + len(data) > self._max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+
+    def _rotate(self):
+        """
+        Rotate the file, keeping up to the configured number of backups. The
+        caller must hold the file lock.
+        """
+        self._file.close()
+        oldest = "{}.{}".format(self._path, self._backup_count)
+        if self._backup_count and os.path.exists(oldest):
+            os.remove(oldest)
+        for index in range(self._backup_count - 1, 0, -1):
+            source = "{}.{}".format(self._path, index)
+            if os.path.exists(source):
+                os.rename(source, "{}.{}".format(self._path, index + 1))
+        if self._backup_count:
+            os.rename(self._path, "{}.1".format(self._path))
+        else:
+            os.remove(self._path)
+        self._file = open(self._path, "ab")
+
+
+class TopicDeadLetterQueue(DeadLetterQueue):
+    """
+    Dead-letter destination which sends records to a DXL topic. Each event
+    sent contains a JSON array with a batch of records.
+    """
+
+    def __init__(self, event_group_name, counters, dxl_client, topic):
+        """
+        Constructor parameters:
+
+        :param str event_group_name: The event group name.
+        :param dxlelasticsearchservice._stats.Counters counters: Counters to
+            record dead-lettered and dropped documents for the event group in.
+        :param dxlclient.client.DxlClient dxl_client: The DXL client.
+        :param str topic: The DXL topic to send dead-letter events to.
+        """
+        self._dxl_client = dxl_client
+        self._topic = topic
+        super(TopicDeadLetterQueue, self).__init__(event_group_name, counters)
+
+    def _write_records(self, records):
+        if not self._dxl_client or not self._dxl_client.connected:
+            logger.error(
+                "Not connected to DXL, dropping %d dead-letter record(s) "
+                "for event group %s which were to be sent to topic '%s'",
+                len(records), self._event_group_name, self._topic)
+            self._counters.increment("dead_letters_dropped", len(records))
+            return
+        event = Event(self._topic)
+        MessageUtils.encode_payload(event,
+                                    MessageUtils.dict_to_json(records))
+        self._dxl_client.send_event(event)
@@ -0,0 +1,90 @@
+from __future__ import absolute_import
+import collections
+import hashlib
+import threading
+import time
+
+
+class Deduplicator(object):
+    """
+    Detects repeated events within a time window.
+
+    The key for an event is a hash of either the event payload or the values
+    of a set of fields in the event document. Keys are held in a bounded,
+    insertion-ordered map with an expiration time, so that both the memory
+    used and the cost of expiring old keys are limited.
+    """
+
+    def __init__(self, window_ms, max_entries, field_path=None):
+        """
+        Constructor parameters:
+
+        :param int window_ms: Time, in milliseconds, after an event is first
+            seen during which a repeat of the event is considered a duplicate.
+        :param int max_entries: Maximum number of keys to hold. The oldest key
+            is discarded once this limit is reached.
+        :param dxlelasticsearchservice._fieldpath.FieldPath field_path:
+            Accessor for the fields from which the key for an event is built.
+            If None, the key is built from the event payload.
+        """
+        self._window = window_ms / 1000.0
+        self._max_entries = max_entries
+        self._field_path = field_path
+        self._lock = threading.Lock()
+        self._expiration_times = collections.OrderedDict()
+
+    def get_key(self, payload, document):
+        """
+        Get the key for an event.
+
+        :param bytes payload: The event payload.
+        :param dict document: The decoded event document, or None if the
+            payload could not be decoded.
+        :return: The key, as a hexadecimal string, or None if the key cannot
+            be built because the document does not contain the fields.
+        :rtype: str
+        """
+        if self._field_path:
+            value = self._field_path.get(document)
+            if value is None:
+                return None
+            payload = value.encode("utf-8") \
+                if isinstance(value, type(u"")) else str(value).encode("utf-8")
+        return hashlib.sha1(payload.rstrip(b"\0")).hexdigest()
+
+    def is_duplicate(self, key):
+        """
+        Determine whether or not an event with the supplied key has already
+        been seen within the time window, recording the key if it has not.
+
+        :param str key: The key for the event.
+        :return: True if the event is a duplicate, False otherwise.
+        :rtype: bool
+        """
+        now = time.time()
+        with self._lock:
+            # Keys are held in order of expiration since the window is fixed
+            while self._expiration_times:
+                oldest_key, expiration_time = \
+                    next(iter(self._expiration_times.items()))
+                if expiration_time > now:
+                    break
+                del self._expiration_times[oldest_key]
+
+            if key in self._expiration_times:
+                return True
+            self._expiration_times[key] = now + self._window
+            if len(self._expiration_times) > self._max_entries:
+                self._expiration_times.popitem(last=False)
+        return False
+
+    def forget(self, key):
+        """
+        Remove a recorded key, so that the next event with the key is not
+        considered a duplicate. Used for an event which was not accepted for
+        indexing, so that a retry of the event is not dropped.
+
+        :param str key: The key for the event.
+        """
+        with self._lock:
+            self._expiration_times.pop(key, None)
@@ -0,0 +1,131 @@
+from __future__ import absolute_import
+import logging
+import threading
+
+try:
+    from queue import Full, Queue
+except ImportError:
+    from Queue import Full, Queue
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+#: Lane for requests which read individual documents.
+LANE_READ = "read"
+#: Lane for requests which search or aggregate over many documents.
+LANE_SEARCH = "search"
+#: Lane for requests which write documents.
+LANE_WRITE = "write"
+
+#: Names of the Elasticsearch API methods which are run in the read lane.
+_READ_API_NAMES = frozenset((
+    "exists", "exists_source", "get", "get_source", "info", "mget", "ping",
+    "termvectors", "mtermvectors"))
+
+#: Names of the Elasticsearch API methods which are run in the search lane.
+_SEARCH_API_NAMES = frozenset((
+    "count", "explain", "field_caps", "field_stats", "msearch",
+    "msearch_template", "render_search_template", "scroll", "search",
+    "search_shards", "search_template", "suggest"))
+
+
+def get_request_lane(api_name):
+    """
+    Get the lane in which requests for an Elasticsearch API method are run.
+
+    :param str api_name: Name of the API method, for example, "search".
+    :return: The lane: "read", "search", or "write". Methods which are not
+        known to be reads or searches are run in the write lane.
+    :rtype: str
+    """
+    if api_name in _READ_API_NAMES:
+        return LANE_READ
+    if api_name in _SEARCH_API_NAMES:
+        return LANE_SEARCH
+    return LANE_WRITE
+
+
+class RequestExecutor(object):
+    """
+    Runs tasks on dedicated worker threads, with a separate bounded queue
+    and set of threads for each lane, so that slow tasks in one lane (for
+    example, a heavy aggregation in the search lane) do not delay tasks in
+    another lane (for example, a document 'get' in the read lane).
+    """
+
+    def __init__(self, lanes):
+        """
+        Constructor parameters:
+
+        :param dict lanes: Dictionary of lane names to a tuple containing the
+            number of worker threads and the maximum number of tasks which may
+            be queued for the lane.
+        """
+        self._lock = threading.Lock()
+        self._closed = False
+        self._queues = {}
+        self._threads = {}
+        for lane, (thread_count, queue_size) in lanes.items():
+            tasks = Queue(queue_size)
+            self._queues[lane] = tasks
+            self._threads[lane] = []
+            for thread_number in range(thread_count):
+                thread = threading.Thread(
+                    target=self._run,
+                    args=(tasks,),
+                    name="RequestExecutor-{}-{}".format(lane, thread_number))
+                thread.daemon = True
+                thread.start()
+                self._threads[lane].append(thread)
+
+    def submit(self, lane, function, *args):
+        """
+        Queue a task to run in a lane.
+
+        :param str lane: The lane.
+        :param function: Function to invoke for the task.
+        :return: True if the task was queued, False if it was rejected
+            because the queue for the lane is full or the executor has been
+            closed.
+        :rtype: bool
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            try:
+                self._queues[lane].put_nowait((function, args))
+            except Full:
+                return False
+        return True
+
+    def close(self):
+        """
+        Stop the worker threads once the tasks which have already been
+        queued have run. Tasks submitted after the executor is closed are
+        rejected.
+        """
+        with self._lock:
+            self._closed = True
+        for lane, threads in self._threads.items():
+            for _ in threads:
+                self._queues[lane].put((None, ()))
+        for threads in self._threads.values():
+            for thread in threads:
+                thread.join()
+        self._threads = {}
+
+    @staticmethod
+    def _run(tasks):
+        """
+        Run tasks from a lane queue until a stop marker is received.
+
+        :param Queue tasks: The lane queue.
+        """
+        while True:
+            function, args = tasks.get()
+            if function is None:
+                return
+            try:
+                function(*args)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Error running request task")
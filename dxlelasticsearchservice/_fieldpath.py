@@ -0,0 +1,127 @@
+from __future__ import absolute_import
+import re
+
+#: Pattern for a key in a field path.
+_KEY_PATTERN = re.compile(r"[^.\[\]]+")
+#: Pattern for an array index in a field path.
+_INDEX_PATTERN = re.compile(r"\[(-?\d+)\]")
+
+
+def _compile_steps(path):
+    """
+    Compile a dotted field path into a list of steps.
+
+    :param str path: The field path, for example, "event.hosts[0].name".
+    :return: A list of keys (str) and array indexes (int).
+    :rtype: list
+    :raises ValueError: If the path is malformed.
+    """
+    steps = []
+    position = 0
+    while not steps or position < len(path):
+        if not steps or path[position] == ".":
+            if steps:
+                position += 1
+            match = _KEY_PATTERN.match(path, position)
+            step = match.group(0) if match else None
+        else:
+            match = _INDEX_PATTERN.match(path, position)
+            step = int(match.group(1)) if match else None
+        if not match:
+            raise ValueError(
+                "Invalid field path '{}' at position {}".format(path,
+                                                                position))
+        steps.append(step)
+        position = match.end()
+    return steps
+
+
+class FieldPath(object):
+    """
+    Accessor for a value in a (nested) JSON document, compiled once from a
+    field path.
+
+    A path consists of keys separated by dots, each optionally followed by
+    one or more array indexes in square brackets, for example,
+    "event.hosts[0].name". Multiple paths can be separated by commas, in
+    which case the value is a composite string built from the value for
+    each path, joined by a separator.
+    """
+
+    def __init__(self, path, separator):
+        """
+        Constructor parameters:
+
+        :param str path: The field path(s).
+        :param str separator: Separator to join the values for multiple
+            paths with.
+        :raises ValueError: If a path is malformed.
+        """
+        self._path = path
+        self._separator = separator
+        self._components = [(component, _compile_steps(component))
+                            for component in
+                            (part.strip() for part in path.split(","))]
+
+    @property
+    def path(self):
+        """
+        The field path(s) the accessor was compiled from.
+
+        :rtype: str
+        """
+        return self._path
+
+    def get(self, document):
+        """
+        Get the value for the field path from a document.
+
+        :param dict document: The document.
+        :return: The value, or None if the value cannot be found. If the
+            accessor was compiled from multiple paths, the value is a string
+            and None is returned if any of the paths cannot be found.
+        """
+        if len(self._components) == 1:
+            return self._get_value(document, *self._components[0])
+
+        values = []
+        for component, steps in self._components:
+            value = self._get_value(document, component, steps)
+            if value is None or isinstance(value, (dict, list)):
+                return None
+            values.append(value if isinstance(value, type(u""))
+                          else str(value))
+        return self._separator.join(values)
+
+    @staticmethod
+    def _get_value(document, component, steps):
+        """
+        Get the value for a single field path from a document.
+
+        :param dict document: The document.
+        :param str component: The field path.
+        :param list steps: The compiled steps for the field path.
+        :return: The value, or None if the value cannot be found.
+        """
+        if not isinstance(document, dict):
+            return None
+
+        # A key which contains a dot is matched at the top-level of the
+        # document first, as was the case before field paths were supported
+        if len(steps) > 1 and component in document:
+            return document[component]
+
+        value = document
+        for step in steps:
+            if isinstance(step, int):
+                if not isinstance(value, list):
+                    return None
+                try:
+                    value = value[step]
+                except IndexError:
+                    return None
+            elif isinstance(value, dict):
+                value = value.get(step)
+            else:
+                return None
+        return value
@@ -0,0 +1,235 @@
+from __future__ import absolute_import
+import calendar
+import logging
+import numbers
+import re
+import time
+
+from dxlelasticsearchservice._fieldpath import FieldPath
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+#: Pattern for a date placeholder in an index name template.
+_PLACEHOLDER_PATTERN = re.compile(r"\{([^{}]*)\}")
+#: Pattern for a run of the same letter in a date format, so that tokens
+#: need not be separated, for example, "yyyyMMdd".
+_DATE_TOKEN_PATTERN = re.compile(r"([A-Za-z])\1*")
+#: Pattern for an ISO 8601 timestamp.
+_ISO_TIMESTAMP_PATTERN = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})"
+    r"(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?)?"
+    r"(Z|([+-])(\d{2}):?(\d{2}))?$")
+
+#: Mapping of supported Joda-Time date format tokens to the corresponding
+#: strftime directive and the length, in seconds, of the period which the
+#: token represents. Periods longer than a day are limited to a day since
+#: months and years vary in length.
+_DATE_TOKENS = {
+    "yyyy": ("%Y", 86400),
+    "YYYY": ("%Y", 86400),
+    "yy": ("%y", 86400),
+    "MM": ("%m", 86400),
+    "dd": ("%d", 86400),
+    "HH": ("%H", 3600),
+    "mm": ("%M", 60),
+    "ss": ("%S", 1)
+}
+
+#: Maximum number of formatted values to cache for a placeholder.
+_MAX_CACHED_BUCKETS = 1024
+
+
+def _convert_date_format(date_format):
+    """
+    Convert a Joda-Time date format into a strftime format.
+
+    :param str date_format: The date format, for example, "yyyy.MM.dd" or
+        "yyyyMMdd".
+    :return: Tuple containing the strftime format and the length, in
+        seconds, of the time bucket for which the formatted value is the same.
+    :rtype: tuple(str, int)
+    :raises ValueError: If the format contains an unsupported token.
+    """
+    strftime_format = []
+    bucket_seconds = 86400
+    position = 0
+    for match in _DATE_TOKEN_PATTERN.finditer(date_format):
+        token = match.group(0)
+        if token not in _DATE_TOKENS:
+            raise ValueError(
+                "Unsupported date format token '{}' in '{}'".format(
+                    token, date_format))
+        directive, token_seconds = _DATE_TOKENS[token]
+        strftime_format.append(
+            date_format[position:match.start()].replace("%", "%%"))
+        strftime_format.append(directive)
+        bucket_seconds = min(bucket_seconds, token_seconds)
+        position = match.end()
+    if not position:
+        raise ValueError("No date tokens in '{}'".format(date_format))
+    strftime_format.append(date_format[position:].replace("%", "%%"))
+    return "".join(strftime_format), bucket_seconds
+
+
+def _parse_timestamp(value):
+    """
+    Convert a timestamp value from a document into seconds since the epoch.
+
+    :param value: Number of milliseconds since the epoch (as a number or a
+        string) or an ISO 8601 formatted string.
+    :return: The number of seconds since the epoch, or None if the value is
+        not a recognized timestamp.
+    :rtype: float
+    """
+    if isinstance(value, numbers.Number) and not isinstance(value, bool):
+        return value / 1000.0
+    if not isinstance(value, (type(u""), str)):
+        return None
+    if value.isdigit():
+        return int(value) / 1000.0
+    match = _ISO_TIMESTAMP_PATTERN.match(value)
+    if not match:
+        return None
+    (year, month, day, hour, minute, second, _, offset_sign, offset_hours,
+     offset_minutes) = match.groups()
+    timestamp = calendar.timegm((int(year), int(month), int(day),
+                                 int(hour or 0), int(minute or 0),
+                                 int(second or 0), 0, 0, 0))
+    if offset_sign:
+        offset = int(offset_hours) * 3600 + int(offset_minutes) * 60
+        timestamp += -offset if offset_sign == "+" else offset
+    return timestamp
+
+
+class _DatePlaceholder(object):
+    """
+    Date placeholder in an index name template.
+    """
+
+    def __init__(self, field_path, date_format):
+        """
+        Constructor parameters:
+
+        :param dxlelasticsearchservice._fieldpath.FieldPath field_path:
+            Accessor for the document field containing the timestamp, or
+            None to use the time the event was received.
+        :param str date_format: The Joda-Time date format.
+        :raises ValueError: If the format contains an unsupported token.
+        """
+        self.field_path = field_path
+        self._strftime_format, self._bucket_seconds = \
+            _convert_date_format(date_format)
+        self._cache = {}
+
+    def format(self, timestamp):
+        """
+        Format a timestamp. The formatted value for each time bucket is
+        cached so that the timestamps for most events only need to be mapped
+        to a bucket.
+
+        :param float timestamp: Number of seconds since the epoch.
+        :return: The formatted value.
+        :rtype: str
+        """
+        bucket = int(timestamp // self._bucket_seconds)
+        value = self._cache.get(bucket)
+        if value is None:
+            value = time.strftime(self._strftime_format,
+                                  time.gmtime(bucket * self._bucket_seconds))
+            if len(self._cache) >= _MAX_CACHED_BUCKETS:
+                self._cache = {}
+            self._cache[bucket] = value
+        return value
+
+
+class IndexNameTemplate(object):
+    """
+    Resolves the name of the Elasticsearch index for a document from a
+    template.
+
+    A template may contain date placeholders in curly braces, each with a
+    Joda-Time date format, for example, "events-{yyyy.MM.dd}". The date is
+    taken from the time the event is received or, if the format is preceded
+    by a field path and a colon, for example, "events-{@timestamp:yyyy.MM}",
+    from the document field. Dates are formatted in UTC.
+    """
+
+    def __init__(self, template):
+        """
+        Constructor parameters:
+
+        :param str template: The index name template.
+        :raises ValueError: If the template is malformed.
+        """
+        self._template = template
+        self._parts = []
+        position = 0
+        for match in _PLACEHOLDER_PATTERN.finditer(template):
+            self._append_literal(template[position:match.start()])
+            field_path, _, date_format = match.group(1).rpartition(":")
+            self._parts.append(_DatePlaceholder(
+                FieldPath(field_path, "") if field_path else None,
+                date_format))
+            position = match.end()
+        self._append_literal(template[position:])
+
+    @property
+    def template(self):
+        """
+        The index name template.
+
+        :rtype: str
+        """
+        return self._template
+
+    def resolve(self, document, receive_time=None):
+        """
+        Resolve the index name for a document.
+
+        :param dict document: The document, or None if the event payload is
+            not a JSON document. If the timestamp for a placeholder cannot be
+            obtained from the document, the time the event was received is
+            used instead.
+        :param float receive_time: Number of seconds since the epoch at which
+            the event was received, or None for the current time.
+        :return: The index name.
+        :rtype: str
+        """
+        if len(self._parts) == 1 and not isinstance(self._parts[0],
+                                                   _DatePlaceholder):
+            return self._parts[0]
+
+        name = []
+        for part in self._parts:
+            if not isinstance(part, _DatePlaceholder):
+                name.append(part)
+                continue
+            timestamp = None
+            if part.field_path:
+                timestamp = _parse_timestamp(part.field_path.get(document))
+                if timestamp is None:
+                    logger.debug(
+                        "Unable to obtain timestamp from %s field for index "
+                        "%s, using receive time",
+                        part.field_path.path, self._template)
+            if timestamp is None:
+                if receive_time is None:
+                    receive_time = time.time()
+                timestamp = receive_time
+            name.append(part.format(timestamp))
+        return "".join(name)
+
+    def _append_literal(self, text):
+        """
+        Append literal text from the template to the name parts.
+
+        :param str text: The text.
+        :raises ValueError: If the text contains an unmatched curly brace.
+        """
+        if "{" in text or "}" in text:
+            raise ValueError(
+                "Unmatched curly brace in index name '{}'".format(
+                    self._template))
+        if text or not self._parts:
+            self._parts.append(text)
@@ -0,0 +1,311 @@
+from __future__ import absolute_import
+import copy
+import re
+import time
+
+#: Pattern for a key in a transform operation field path.
+_PATH_PATTERN = re.compile(r"^[^.\[\]]+(\.[^.\[\]]+)*$")
+
+#: Name of the variable holding the document in the generated function.
+_DOCUMENT = "document"
+
+#: Timestamp format which produces an ISO 8601 string in UTC.
+TIMESTAMP_FORMAT_ISO8601 = "iso8601"
+#: Timestamp format which produces the number of milliseconds since the
+#: epoch.
+TIMESTAMP_FORMAT_EPOCH_MILLIS = "epoch_millis"
+
+#: Sentinel for a value which is missing from a document.
+_MISSING = object()
+
+
+def _format_iso8601(timestamp):
+    """
+    Format a timestamp as an ISO 8601 string in UTC.
+
+    :param float timestamp: Number of seconds since the epoch.
+    :return: The formatted timestamp, for example,
+        "2018-01-02T03:04:05.678Z".
+    :rtype: str
+    """
+    return "{}.{:03d}Z".format(
+        time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(timestamp)),
+        int(timestamp * 1000) % 1000)
+
+
+def _to_bool(value):
+    """
+    Convert a value to a boolean.
+
+    :param value: The value. Strings are converted according to their
+        content, for example, "false" is converted to False.
+    :return: The converted value.
+    :rtype: bool
+    :raises ValueError: If a string value is not a recognized boolean.
+    """
+    if isinstance(value, (type(u""), str)):
+        lowered = value.strip().lower()
+        if lowered in ("true", "yes", "on", "1"):
+            return True
+        if lowered in ("false", "no", "off", "0", ""):
+            return False
+        raise ValueError("Not a boolean value: {}".format(value))
+    return bool(value)
+
+
+def _to_string(value):
+    """
+    Convert a value to a string.
+
+    :param value: The value.
+    :return: The converted value.
+    :rtype: str
+    """
+    if isinstance(value, type(u"")):
+        return value
+    if isinstance(value, bool):
+        return u"true" if value else u"false"
+    return type(u"")(value)
+
+
+#: Converters for the types supported by the 'convert' operation.
+_CONVERTERS = {
+    "int": "int",
+    "float": "float",
+    "string": "_to_string",
+    "bool": "_to_bool"
+}
+
+
+def _compile_path(path, line_number):
+    """
+    Split a transform operation field path into keys.
+
+    :param str path: The field path, for example, "event.host.name".
+    :param int line_number: Line number of the operation, for error messages.
+    :return: The keys.
+    :rtype: list(str)
+    :raises ValueError: If the path is malformed.
+    """
+    if not _PATH_PATTERN.match(path):
+        raise ValueError(
+            "Invalid field path '{}' for transform operation on line "
+            "{}".format(path, line_number))
+    return path.split(".")
+
+
+class _CodeWriter(object):
+    """
+    Accumulates the lines of source code for the generated transform
+    function.
+    """
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, indent, line):
+        """
+        Append a line of source code.
+
+        :param int indent: Indentation level of the line.
+        :param str line: The line.
+        """
+        self.lines.append("    " * indent + line)
+
+    def write_get_parent(self, indent, keys):
+        """
+        Write code which assigns the dictionary containing the last key in a
+        path to the '_parent' variable, or None if there is no such
+        dictionary.
+
+        :param int indent: Indentation level.
+        :param list(str) keys: The keys in the path.
+        """
+        self.write(indent, "_parent = {}".format(_DOCUMENT))
+        for key in keys[:-1]:
+            self.write(indent,
+                       "_parent = _parent.get({!r}) "
+                       "if isinstance(_parent, dict) else None".format(key))
+
+    def write_get(self, indent, keys):
+        """
+        Write code which assigns the value at a path to the '_value'
+        variable, or the _MISSING sentinel if there is no value.
+
+        :param int indent: Indentation level.
+        :param list(str) keys: The keys in the path.
+        """
+        self.write_get_parent(indent, keys)
+        self.write(indent,
+                   "_value = _parent.get({!r}, _MISSING) "
+                   "if isinstance(_parent, dict) else _MISSING".format(
+                       keys[-1]))
+
+    def write_set(self, indent, keys):
+        """
+        Write code which sets the value at a path to the '_value' variable,
+        creating any intermediate dictionaries which do not exist. The value
+        is not set if an intermediate value exists but is not a dictionary.
+
+        :param int indent: Indentation level.
+        :param list(str) keys: The keys in the path.
+        """
+        if len(keys) == 1:
+            self.write(indent, "{}[{!r}] = _value".format(_DOCUMENT, keys[0]))
+            return
+        self.write(indent, "_target = {}.setdefault({!r}, {{}})".format(
+            _DOCUMENT, keys[0]))
+        for key in keys[1:-1]:
+            self.write(indent,
+                       "_target = _target.setdefault({!r}, {{}}) "
+                       "if isinstance(_target, dict) else None".format(key))
+        self.write(indent, "if isinstance(_target, dict):")
+        self.write(indent + 1, "_target[{!r}] = _value".format(keys[-1]))
+
+
+class TransformPipeline(object):
+    """
+    Transforms event documents with a fixed sequence of declarative
+    operations, as an alternative to a transform script for common cases.
+
+    The operations are compiled, when the pipeline is created, into the
+    source code for a single function with the field paths inlined, so that
+    transforming a document involves one function call and modifies the
+    document in place.
+
+    Each operation is specified on a separate line, as the name of the
+    operation followed by its arguments, separated by whitespace:
+
+    * ``rename <path> <target-path>``: Move a value to another path.
+    * ``copy <path> <target-path>``: Copy a value to another path.
+    * ``remove <path>``: Remove a value.
+    * ``convert <path> <type>``: Convert a value to ``int``, ``float``,
+      ``string``, or ``bool``. A value which cannot be converted is left
+      unchanged.
+    * ``timestamp <target-path> [<format>]``: Set a value to the time the
+      event was received, as an ``iso8601`` string (the default) or as
+      ``epoch_millis``.
+
+    Paths consist of keys separated by dots, for example, "event.host.name".
+    Operations for values which are not present in a document are skipped.
+    """
+
+    def __init__(self, operations):
+        """
+        Constructor parameters:
+
+        :param str operations: The operations, one per line. Blank lines and
+            lines starting with "#" are ignored.
+        :raises ValueError: If an operation is malformed.
+        """
+        self._operations = operations
+        writer = _CodeWriter()
+        writer.write(0, "def _transform({}, receive_time):".format(_DOCUMENT))
+        for line_number, line in enumerate(operations.splitlines(), 1):
+            arguments = line.split()
+            if arguments and not arguments[0].startswith("#"):
+                self._compile_operation(writer, line_number, arguments)
+        writer.write(1, "return {}".format(_DOCUMENT))
+
+        namespace = {"_MISSING": _MISSING,
+                     "_deepcopy": copy.deepcopy,
+                     "_format_iso8601": _format_iso8601,
+                     "_to_bool": _to_bool,
+                     "_to_string": _to_string}
+        exec(compile("\n".join(writer.lines), # pylint: disable=exec-used
+                     "<transform operations>", "exec"), namespace)
+        self._function = namespace["_transform"]
+
+    @property
+    def operations(self):
+        """
+        The operations the pipeline was compiled from.
+
+        :rtype: str
+        """
+        return self._operations
+
+    def transform(self, document, receive_time=None):
+        """
+        Transform a document in place.
+
+        :param dict document: The document.
+        :param float receive_time: Number of seconds since the epoch at which
+            the event was received, or None for the current time.
+        :return: The document.
+        :rtype: dict
+        """
+        return self._function(
+            document, time.time() if receive_time is None else receive_time)
+
+    @staticmethod
+    def _compile_operation(writer, line_number, arguments):
+        """
+        Write the code for a single operation.
+
+        :param _CodeWriter writer: Writer for the generated code.
+        :param int line_number: Line number of the operation.
+        :param list(str) arguments: The operation name and its arguments.
+        :raises ValueError: If the operation is malformed.
+        """
+        name = arguments[0]
+        expected_arguments = {"rename": (2,),
+                              "copy": (2,),
+                              "remove": (1,),
+                              "convert": (2,),
+                              "timestamp": (1, 2)}
+        if name not in expected_arguments:
+            raise ValueError(
+                "Unknown transform operation '{}' on line {}".format(
+                    name, line_number))
+        if len(arguments) - 1 not in expected_arguments[name]:
+            raise ValueError(
+                "Unexpected number of arguments for transform operation '{}' "
+                "on line {}".format(name, line_number))
+
+        keys = _compile_path(arguments[1], line_number)
+        writer.write(1, "# {}".format(" ".join(arguments)))
+        if name == "rename":
+            target_keys = _compile_path(arguments[2], line_number)
+            writer.write_get_parent(1, keys)
+            writer.write(1, "_value = _parent.pop({!r}, _MISSING) "
+                            "if isinstance(_parent, dict) "
+                            "else _MISSING".format(keys[-1]))
+            writer.write(1, "if _value is not _MISSING:")
+            writer.write_set(2, target_keys)
+        elif name == "copy":
+            target_keys = _compile_path(arguments[2], line_number)
+            writer.write_get(1, keys)
+            writer.write(1, "if _value is not _MISSING:")
+            writer.write(2, "if isinstance(_value, (dict, list)):")
+            writer.write(3, "_value = _deepcopy(_value)")
+            writer.write_set(2, target_keys)
+        elif name == "remove":
+            writer.write_get_parent(1, keys)
+            writer.write(1, "if isinstance(_parent, dict):")
+            writer.write(2, "_parent.pop({!r}, None)".format(keys[-1]))
+        elif name == "convert":
+            if arguments[2] not in _CONVERTERS:
+                raise ValueError(
+                    "Unknown type '{}' for transform operation on line "
+                    "{}".format(arguments[2], line_number))
+            writer.write_get_parent(1, keys)
+            writer.write(1, "if isinstance(_parent, dict) and "
+                            "{!r} in _parent:".format(keys[-1]))
+            writer.write(2, "try:")
+            writer.write(3, "_parent[{0!r}] = {1}(_parent[{0!r}])".format(
+                keys[-1], _CONVERTERS[arguments[2]]))
+            writer.write(2, "except (TypeError, ValueError):")
+            writer.write(3, "pass")
+        else:
+            timestamp_format = arguments[2] if len(arguments) > 2 \
+                else TIMESTAMP_FORMAT_ISO8601
+            if timestamp_format == TIMESTAMP_FORMAT_ISO8601:
+                writer.write(1, "_value = _format_iso8601(receive_time)")
+            elif timestamp_format == TIMESTAMP_FORMAT_EPOCH_MILLIS:
+                writer.write(1, "_value = int(receive_time * 1000)")
+            else:
+                raise ValueError(
+                    "Unknown timestamp format '{}' for transform operation "
+                    "on line {}".format(timestamp_format, line_number))
+            writer.write_set(1, keys)
@@ -0,0 +1,132 @@
+from __future__ import absolute_import
+import random
+import threading
+import time
+import zlib
+
+#: Sampling method which selects events at random.
+SAMPLE_METHOD_RANDOM = "random"
+#: Sampling method which selects events by a hash of the event payload, so
+#: that the same payload is always either selected or not.
+SAMPLE_METHOD_HASH = "hash"
+
+#: Action which drops events over the rate limit.
+OVER_LIMIT_ACTION_DROP = "drop"
+#: Action which writes events over the rate limit to the spool, from which
+#: they are replayed to Elasticsearch at the spool replay rate.
+OVER_LIMIT_ACTION_SPOOL = "spool"
+#: Action which indexes a sample of the events over the rate limit and drops
+#: the rest.
+OVER_LIMIT_ACTION_SAMPLE = "sample"
+
+#: Outcome for an event within the rate limit.
+OUTCOME_ALLOWED = "allowed"
+#: Outcome for an event over the rate limit which was selected by sampling.
+OUTCOME_SAMPLED = "sampled"
+#: Outcome for an event over the rate limit which should be spooled.
+OUTCOME_SPOOLED = "spooled"
+#: Outcome for an event over the rate limit which should be dropped.
+OUTCOME_DROPPED = "dropped"
+
+
+class Sampler(object):
+    """
+    Selects a fraction of events.
+    """
+
+    def __init__(self, rate, method=SAMPLE_METHOD_RANDOM):
+        """
+        Constructor parameters:
+
+        :param float rate: Fraction, between 0 and 1, of events to select.
+        :param str method: The sampling method, "random" or "hash".
+        :raises ValueError: If the sampling method is not known.
+        """
+        if method not in (SAMPLE_METHOD_RANDOM, SAMPLE_METHOD_HASH):
+            raise ValueError("Unknown sampling method: {}".format(method))
+        self._rate = rate
+        self._hash_threshold = int(rate * 0x100000000)
+        self._use_hash = method == SAMPLE_METHOD_HASH
+
+    def select(self, payload):
+        """
+        Determine whether or not to select an event.
+
+        :param bytes payload: The event payload.
+        :return: True if the event is selected, False otherwise.
+        :rtype: bool
+        """
+        if self._use_hash:
+            return (zlib.crc32(payload or b"") & 0xffffffff) < \
+                self._hash_threshold
+        return random.random() < self._rate
+
+
+class RateLimiter(object):
+    """
+    Limits the rate of events with a token bucket.
+
+    Tokens are added lazily, from the time elapsed since the previous event,
+    so no timer thread is needed and the lock is only held for a few
+    arithmetic operations.
+    """
+
+    def __init__(self, rate, burst, over_limit_action=OVER_LIMIT_ACTION_DROP,
+                 over_limit_sampler=None):
+        """
+        Constructor parameters:
+
+        :param float rate: Maximum sustained number of events per second.
+        :param int burst: Maximum number of events which may be allowed in a
+            burst above the sustained rate.
+        :param str over_limit_action: Action for events over the rate limit:
+            "drop", "spool", or "sample".
+        :param Sampler over_limit_sampler: Sampler which selects the events
+            over the rate limit to index if the action is "sample".
+        :raises ValueError: If the action is not known or the action is
+            "sample" and no sampler is supplied.
+        """
+        if over_limit_action not in (OVER_LIMIT_ACTION_DROP,
+                                     OVER_LIMIT_ACTION_SPOOL,
+                                     OVER_LIMIT_ACTION_SAMPLE):
+            raise ValueError(
+                "Unknown rate limit action: {}".format(over_limit_action))
+        if over_limit_action == OVER_LIMIT_ACTION_SAMPLE and \
+                not over_limit_sampler:
+            raise ValueError("A sampler is required for the sample action")
+        self._rate = float(rate)
+        self._burst = float(burst)
+        self._over_limit_action = over_limit_action
+        self._over_limit_sampler = over_limit_sampler
+        self._lock = threading.Lock()
+        self._tokens = self._burst
+        self._last_refill_time = time.time()
+
+    def check(self, payload):
+        """
+        Take a token for an event and determine what to do with the event.
+
+        :param bytes payload: The event payload, used for sampling.
+        :return: "allowed" if the event is within the rate limit. Otherwise,
+            "sampled" if the event was selected for indexing by sampling,
+            "spooled" if the event should be spooled, or "dropped" if the
+            event should be dropped.
+        :rtype: str
+        """
+        with self._lock:
+            now = time.time()
+            tokens = min(self._burst,
+                         self._tokens +
+                         (now - self._last_refill_time) * self._rate)
+            self._last_refill_time = now
+            allowed = tokens >= 1
+            self._tokens = tokens - 1 if allowed else tokens
+
+        if allowed:
+            return OUTCOME_ALLOWED
+        if self._over_limit_action == OVER_LIMIT_ACTION_SPOOL:
+            return OUTCOME_SPOOLED
+        if self._over_limit_action == OVER_LIMIT_ACTION_SAMPLE and \
+                self._over_limit_sampler.select(payload):
+            return OUTCOME_SAMPLED
+        return OUTCOME_DROPPED
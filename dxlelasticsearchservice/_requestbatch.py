@@ -0,0 +1,269 @@
+from __future__ import absolute_import
+import json
+import logging
+
+from elasticsearch.exceptions import HTTP_EXCEPTIONS, TransportError
+
+from dxlelasticsearchservice._batcher import MicroBatcher
+from dxlelasticsearchservice._bulk import OPERATION_TYPE_CREATE, \
+    OPERATION_TYPE_DELETE, OPERATION_TYPE_INDEX, get_bulk_action, \
+    get_bulk_item_result, get_bulk_update_body_action
+from dxlelasticsearchservice._cache import get_request_key
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+#: Name of the API method for requests which are batched into 'mget'
+#: requests.
+_GET_API_NAME = "get"
+
+#: Required and optional parameters of the requests which may be batched,
+#: by API method name. A request with any other parameter is not batched,
+#: since the parameter cannot be expressed for an individual document in an
+#: 'mget' or '_bulk' request.
+_BATCH_PARAMS = {
+    _GET_API_NAME: (("index", "id"), ("doc_type", "routing")),
+    "index": (("index", "doc_type", "body"),
+              ("id", "routing", "parent", "version", "version_type",
+               "pipeline", "op_type")),
+    "update": (("index", "doc_type", "id", "body"),
+               ("routing", "parent", "version", "version_type")),
+    "delete": (("index", "doc_type", "id"),
+               ("routing", "parent", "version", "version_type"))
+}
+
+#: HTTP status code for a document which is not found.
+_NOT_FOUND_STATUS_CODE = 404
+
+#: Type used by the 'get' API for a document of any type.
+_ALL_TYPES = "_all"
+
+#: Number of batches which may be waiting to be sent before callers adding
+#: requests wait.
+_MAX_PENDING_BATCHES = 10
+
+
+def _get_item_error(status, result):
+    """
+    Get the error which Elasticsearch would have raised for an individual
+    request which failed in the same way as an item in an 'mget' or '_bulk'
+    response.
+
+    :param int status: The HTTP status code for the item.
+    :param dict result: The result for the item.
+    :return: The error.
+    :rtype: elasticsearch.exceptions.TransportError
+    """
+    info = dict(result)
+    info.pop("status", None)
+    error = info.get("error")
+    if error is None:
+        # The body of the response for an individual request, for example,
+        # for a document which is not found
+        message = json.dumps(info, separators=(",", ":"))
+    else:
+        info = {"error": error, "status": status}
+        message = error.get("type", error) if isinstance(error, dict) \
+            else error
+    return HTTP_EXCEPTIONS.get(status, TransportError)(status, message, info)
+
+
+class RequestBatcher(object):
+    """
+    Combines concurrent 'get' requests into 'mget' requests, and concurrent
+    'index', 'update', and 'delete' requests into '_bulk' requests.
+
+    Requests are collected for a short window and the result for each item in
+    the combined response is passed back for the request it came from. A
+    request whose item fails receives the same error, with the same class,
+    status code, and error type, as if it had been sent on its own, and all
+    of the requests in a batch receive the error for a combined request
+    which fails.
+    """
+
+    def __init__(self, es_client, max_items, max_wait_ms, max_in_flight=1, # pylint: disable=too-many-arguments
+                 response_cache=None):
+        """
+        Constructor parameters:
+
+        :param Elasticsearch es_client: The Elasticsearch client.
+        :param int max_items: Maximum number of requests to combine into a
+            single 'mget' or '_bulk' request.
+        :param int max_wait_ms: Maximum amount of time, in milliseconds, that
+            a request waits to be combined with other requests.
+        :param int max_in_flight: Maximum number of 'mget' requests, and of
+            '_bulk' requests, which may be sent at once.
+        :param dxlelasticsearchservice._cache.ResponseCache response_cache:
+            Cache of responses for requests which only read data, in which
+            the responses for requests against the indexes written to by a
+            '_bulk' request are invalidated before the responses for the
+            batched requests are passed back. If None, no responses are
+            invalidated.
+        """
+        self._es_client = es_client
+        self._response_cache = response_cache
+        self._serializer = es_client.transport.serializer
+        self._get_batcher = MicroBatcher(
+            "RequestBatcher-get", self._send_get_batch, max_items,
+            max_wait_ms, max_items * _MAX_PENDING_BATCHES, max_in_flight)
+        self._write_batcher = MicroBatcher(
+            "RequestBatcher-write", self._send_write_batch, max_items,
+            max_wait_ms, max_items * _MAX_PENDING_BATCHES, max_in_flight)
+
+    @staticmethod
+    def supports(api_name, request_dict):
+        """
+        Determine whether or not a request may be batched.
+
+        :param str api_name: Name of the API method for the request.
+        :param dict request_dict: The request parameters.
+        :return: True if the request may be batched, False otherwise.
+        :rtype: bool
+        """
+        if api_name not in _BATCH_PARAMS:
+            return False
+        required_params, optional_params = _BATCH_PARAMS[api_name]
+        if any(request_dict.get(name) in (None, "", [], ())
+               for name in required_params) or \
+                any(name not in required_params and
+                    name not in optional_params for name in request_dict):
+            return False
+        return api_name != "index" or request_dict.get("op_type") in (
+            None, OPERATION_TYPE_INDEX, OPERATION_TYPE_CREATE)
+
+    def add(self, api_name, request_dict, callback):
+        """
+        Add a request to the next batch. The caller waits if too many
+        batches are already waiting to be sent.
+
+        :param str api_name: Name of the API method for the request. The
+            request must be supported, per :meth:`supports`.
+        :param dict request_dict: The request parameters.
+        :param callback: Function invoked, on the batch thread, with the
+            response for the request (or None) and the error for the request
+            (or None).
+        :return: True if the request was added, False if the batcher has been
+            closed.
+        :rtype: bool
+        """
+        batcher = self._get_batcher if api_name == _GET_API_NAME \
+            else self._write_batcher
+        return batcher.add((api_name, request_dict, callback), block=True)
+
+    def close(self):
+        """
+        Send any pending requests and stop the batch threads.
+        """
+        self._get_batcher.close()
+        self._write_batcher.close()
+
+    def _send_get_batch(self, batch):
+        """
+        Send a batch of 'get' requests as an 'mget' request.
+
+        :param list(tuple) batch: The API name, parameters, and callback for
+            each request.
+        """
+        # Identical requests in the batch share a single document in the
+        # 'mget' request
+        callbacks = {}
+        docs = []
+        for _, request_dict, callback in batch:
+            key = get_request_key(_GET_API_NAME, request_dict)
+            if key not in callbacks:
+                callbacks[key] = []
+                doc = {"_index": request_dict["index"],
+                       "_id": request_dict["id"]}
+                if request_dict.get("doc_type") not in (None, _ALL_TYPES):
+                    doc["_type"] = request_dict["doc_type"]
+                if request_dict.get("routing") is not None:
+                    doc["_routing"] = request_dict["routing"]
+                docs.append((key, request_dict, doc))
+            callbacks[key].append(callback)
+
+        logger.debug("Sending %d batched 'get' request(s) as an 'mget' "
+                     "request", len(batch))
+        try:
+            response = self._es_client.mget(
+                body={"docs": [doc for _, _, doc in docs]})
+        except Exception as ex:  # pylint: disable=broad-except
+            for key, _, _ in docs:
+                self._complete(callbacks[key], None, ex)
+            return
+
+        for (key, request_dict, _), item in zip(docs,
+                                                response.get("docs", ())):
+            if "error" in item:
+                # The item does not include the status code for the error, so
+                # send the request on its own to raise the same error
+                try:
+                    self._complete(callbacks[key],
+                                   self._es_client.get(**request_dict), None)
+                except Exception as ex:  # pylint: disable=broad-except
+                    self._complete(callbacks[key], None, ex)
+            elif item.get("found"):
+                self._complete(callbacks[key], item, None)
+            else:
+                self._complete(callbacks[key], None,
+                               _get_item_error(_NOT_FOUND_STATUS_CODE, item))
+
+    def _send_write_batch(self, batch):
+        """
+        Send a batch of 'index', 'update', and 'delete' requests as a
+        '_bulk' request.
+
+        :param list(tuple) batch: The API name, parameters, and callback for
+            each request.
+        """
+        lines = []
+        for api_name, request_dict, _ in batch:
+            if api_name == "update":
+                lines.extend(get_bulk_update_body_action(self._serializer,
+                                                         request_dict))
+            elif api_name == "delete":
+                lines.extend(get_bulk_action(
+                    self._serializer,
+                    dict(request_dict, op_type=OPERATION_TYPE_DELETE)))
+            else:
+                lines.extend(get_bulk_action(self._serializer, request_dict))
+
+        logger.debug("Sending %d batched write request(s) as a '_bulk' "
+                     "request", len(batch))
+        response = error = None
+        try:
+            response = self._es_client.bulk(body="".join(lines))
+        except Exception as ex:  # pylint: disable=broad-except
+            error = ex
+        # The writes may have been applied even if an error was raised, for
+        # example, for a timeout
+        if self._response_cache:
+            self._response_cache.invalidate(sorted(set(
+                request_dict["index"] for _, request_dict, _ in batch)))
+        if error:
+            for _, _, callback in batch:
+                self._complete([callback], None, error)
+            return
+
+        for (_, _, callback), item in zip(batch, response.get("items", ())):
+            result = dict(get_bulk_item_result(item))
+            status = result.pop("status", None)
+            if status is not None and status >= 300:
+                self._complete([callback], None,
+                               _get_item_error(status, result))
+            else:
+                self._complete([callback], result, None)
+
+    @staticmethod
+    def _complete(callbacks, response, error):
+        """
+        Pass the response or error for a request to its callbacks.
+
+        :param list callbacks: The callbacks.
+        :param dict response: The response, or None if the request failed.
+        :param Exception error: The error, or None if the request succeeded.
+        """
+        for callback in callbacks:
+            try:
+                callback(response, error)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Error completing batched request")
@@ -1,7 +1,8 @@
-from __future__ import absolute_import
+from __future__ import absolute_import # pylint: disable=too-many-lines
+import collections
+import functools
 import logging
-import sys
-from threading import Lock
+import threading
 
 from elasticsearch.exceptions import ElasticsearchException,\
     ImproperlyConfigured, TransportError
@@ -9,30 +10,21 @@ from elasticsearch.exceptions import ElasticsearchException,\
 from dxlbootstrap.util import MessageUtils
 from dxlclient.callbacks import EventCallback, RequestCallback
 from dxlclient.message import ErrorResponse, Response
-
-# transform scripts are loaded underneath the
-# dxlelasticsearchservice._transform module. Including this import to avoid a
-# warning that would otherwise appear when the transform scripts are loaded.
-
-import dxlelasticsearchservice._transform # pylint: disable=unused-import
-
-# Python's imp module, used by the dxlelasticsearchservice for loading
-# transform scripts, was deprecated in Python 3.4 in favor of importlib
-# (see: https://docs.python.org/3/library/imp.html). For later versions of
-# Python, the approach documented at
-# https://docs.python.org/3/library/importlib.html#importing-a-source-file-directly
-# is used for loading transform scripts. The `module_from_spec` method used
-# by this approach was not supported until Python 3.5. The code below ensures
-# that the imp-based loading approach is used for Python versions before 3.5
-# whereas the importlib-based loading approach is used for Python 3.5 and
-# later.
-
-_PYTHON_VERSION_SUPPORTS_MODULE_FROM_SPEC_LOADING = \
-    sys.version_info.major >= 3 and sys.version_info.minor >= 5
-if _PYTHON_VERSION_SUPPORTS_MODULE_FROM_SPEC_LOADING:
-    import importlib.util  # pylint: disable=import-error, no-name-in-module
-else:
-    import imp
+from dxlelasticsearchservice._batcher import MicroBatcher
+from dxlelasticsearchservice._bulk import OPERATION_TYPE_DELETE, \
+    OPERATION_TYPE_UPDATE, get_bulk_action, get_document, \
+    get_operation_type, supports_operation
+from dxlelasticsearchservice._cache import get_index_patterns, \
+    get_request_key, patterns_overlap
+from dxlelasticsearchservice._codec import JsonCodec
+from dxlelasticsearchservice._executor import LANE_READ, LANE_SEARCH, \
+    LANE_WRITE, get_request_lane
+from dxlelasticsearchservice._ratelimit import OUTCOME_ALLOWED, \
+    OUTCOME_DROPPED, OUTCOME_SPOOLED
+from dxlelasticsearchservice._retry import RequestRejectedError, \
+    is_retryable_error
+from dxlelasticsearchservice._stats import Counters
+from dxlelasticsearchservice._transformpool import TransformProcessPool
 
 # Configure local logger
 logger = logging.getLogger(__name__)
@@ -43,44 +35,149 @@ class ElasticsearchServiceEventCallback(EventCallback): # pylint: disable=too-ma
     Event callback used to store event payloads to Elasticsearch
     """
 
-    #: Package under which transform script modules are loaded
-    _TRANSFORM_PACKAGE_NAME = "dxlelasticsearchservice._transform"
+    #: Maximum number of batches of events which may be waiting to be passed
+    #: to the transform script. Event callback threads wait once this limit
+    #: has been reached.
+    _TRANSFORM_MAX_PENDING_BATCHES = 10
 
-    def __init__(self, es_client, event_group_name, document_index,
-                 document_type, id_field_name,
-                 transform_script, reload_transform_scripts_on_change):
+    def __init__(self, es_client, event_group_name, document_index, # pylint: disable=too-many-locals
+                 document_type, id_field_path, transform_script,
+                 bulk_indexer=None, spool=None, retry_policy=None,
+                 counters=None, dead_letter_queue=None, transform_batch_size=1,
+                 transform_batch_window_ms=0, transform_processes=0,
+                 transform_max_in_flight_batches=0, codec=None,
+                 pass_through_payloads=False, deduplicator=None,
+                 dedup_derive_id=False, sampler=None, rate_limiter=None,
+                 transform_pipeline=None, operation_type=None,
+                 response_cache=None):
         """
         Constructor parameters:
 
         :param Elasticsearch es_client: The Elasticsearch client.
         :param str event_group_name: The event group name.
-        :param str document_index: Elasticsearch index for documents to store.
+        :param dxlelasticsearchservice._indexname.IndexNameTemplate
+            document_index: Template for the Elasticsearch index for
+            documents to store.
         :param str document_type: Elasticsearch type for documents to store.
-        :param str id_field_name: Name of the field in an event payload which
-            contains the value for the corresponding Elasticsearch document ID.
-        :param str transform_script: Name of a transform Python script to load
-            and pass event payloads to for transformation into Elasticsearch
-            document operations.
-        :param bool reload_transform_scripts_on_change: Whether or not to
-            reload transform scripts if they change while the service is
-            running.
+        :param dxlelasticsearchservice._fieldpath.FieldPath id_field_path:
+            Accessor for the field(s) in an event payload which contain the
+            value for the corresponding Elasticsearch document ID, or None if
+            Elasticsearch should generate the ID.
+        :param dxlelasticsearchservice._transformscript.TransformScript
+            transform_script: Transform Python script to pass event payloads
+            to for transformation into Elasticsearch document operations, or
+            None if no transform script is configured.
+        :param dxlelasticsearchservice._bulk.BulkIndexer bulk_indexer: Bulk
+            indexer through which documents should be buffered and submitted
+            to Elasticsearch. If None, each document is indexed with a
+            separate 'index' request.
+        :param dxlelasticsearchservice._spool.Spool spool: Spool to write
+            documents to when Elasticsearch is unavailable. If None, an error
+            is raised for documents which cannot be indexed.
+        :param dxlelasticsearchservice._retry.RetryPolicy retry_policy: Policy
+            for retrying 'index' requests which fail with a retryable error.
+            If None, 'index' requests are not retried.
+        :param dxlelasticsearchservice._stats.Counters counters: Counters to
+            record retries and give-ups for the event group in.
+        :param dxlelasticsearchservice._deadletter.DeadLetterQueue
+            dead_letter_queue: Destination for documents which Elasticsearch
+            permanently rejects. If None, an error is logged and raised for
+            each rejected document.
+        :param int transform_batch_size: Maximum number of events to pass to
+            the transform script in a single batch. If greater than 1, or if
+            transform processes are used, events are collected and passed to
+            the transform script on a separate thread.
+        :param int transform_batch_window_ms: Maximum amount of time, in
+            milliseconds, that an event waits to be passed to the transform
+            script in a batch.
+        :param int transform_processes: Number of worker processes in which
+            to run the transform script. If 0, the transform script is run in
+            this process.
+        :param int transform_max_in_flight_batches: Maximum number of batches
+            of events which may be submitted to the worker processes but not
+            yet indexed.
+        :param dxlelasticsearchservice._codec.JsonCodec codec: Codec used to
+            decode event payloads. If None, the standard library codec is
+            used.
+        :param bool pass_through_payloads: Whether or not to index the
+            original event payload, once it has been validated as JSON, rather
+            than re-encoding the decoded document. Not applicable if a
+            transform script or pipeline is configured.
+        :param dxlelasticsearchservice._dedup.Deduplicator deduplicator:
+            Detector for repeated events, which are dropped before they are
+            indexed. If None, repeated events are not detected.
+        :param bool dedup_derive_id: Whether or not to use the deduplication
+            key as the document ID for an event whose ID is not otherwise
+            determined.
+        :param dxlelasticsearchservice._ratelimit.Sampler sampler: Sampler
+            which selects the events to index, ahead of parsing them. If
+            None, all events are indexed.
+        :param dxlelasticsearchservice._ratelimit.RateLimiter rate_limiter:
+            Limiter for the rate of events to index. If None, the rate of
+            events is not limited.
+        :param dxlelasticsearchservice._pipeline.TransformPipeline
+            transform_pipeline: Declarative operations to apply to each event
+            document, ahead of the transform script if one is also
+            configured. If None, documents are not transformed by a pipeline.
+        :param str operation_type: Type of operation ("index", "create",
+            "update", or "delete") to perform for each event document. If
+            None, documents are indexed.
+        :param dxlelasticsearchservice._cache.ResponseCache response_cache:
+            Cache of responses for DXL requests, in which the responses for
+            the indexes written to are invalidated. If None, no responses are
+            cached.
         """
         super(ElasticsearchServiceEventCallback, self).__init__()
         self._es_client = es_client
         self._event_group_name = event_group_name
         self._document_index = document_index
         self._document_type = document_type
-        self._id_field_name = id_field_name
+        self._id_field_path = id_field_path
         self._transform_script = transform_script
-
-        self._reload_transform_scripts_on_change = \
-            reload_transform_scripts_on_change
-        if self._transform_script and \
-                not self._reload_transform_scripts_on_change:
-            self._transform_function = self._get_transform_function()
+        self._bulk_indexer = bulk_indexer
+        self._spool = spool
+        self._retry_policy = retry_policy
+        self._counters = counters if counters else Counters()
+        self._dead_letter_queue = dead_letter_queue
+        self._codec = codec if codec else JsonCodec()
+        self._pass_through_payloads = pass_through_payloads and \
+            not transform_script and not transform_pipeline
+        self._deduplicator = deduplicator
+        self._dedup_derive_id = dedup_derive_id
+        self._sampler = sampler
+        self._rate_limiter = rate_limiter
+        self._transform_pipeline = transform_pipeline
+        self._operation_type = operation_type
+        self._response_cache = response_cache
+        if transform_script and transform_processes:
+            self._transform_pool = TransformProcessPool(
+                event_group_name,
+                transform_script,
+                transform_processes,
+                transform_max_in_flight_batches,
+                self._index_batch_operations,
+                self._forget_events)
         else:
-            self._transform_function = None
-        self._transform_lock = Lock()
+            self._transform_pool = None
+        if transform_script and \
+                (transform_batch_size > 1 or self._transform_pool):
+            self._transform_batcher = MicroBatcher(
+                "Transform-{}".format(event_group_name),
+                self._on_event_batch,
+                transform_batch_size,
+                transform_batch_window_ms,
+                transform_batch_size * self._TRANSFORM_MAX_PENDING_BATCHES)
+        else:
+            self._transform_batcher = None
+
+    @property
+    def event_group_name(self):
+        """
+        The event group name.
+
+        :rtype: str
+        """
+        return self._event_group_name
 
     def on_event(self, event):
         """
@@ -92,105 +189,351 @@ class ElasticsearchServiceEventCallback(EventCallback): # pylint: disable=too-ma
             logger.debug("Received event for topic %s. Payload: %s",
                          event.destination_topic, event.payload)
 
-        index_parameters = self._get_index_parameters(event)
+        # Sampling and rate limiting are applied before the payload is parsed
+        # so that the cost of events which are not indexed is minimal
+        if self._sampler and not self._sampler.select(event.payload):
+            self._counters.increment("sampled_out")
+            return
+        rate_limit_outcome = self._rate_limiter.check(event.payload) \
+            if self._rate_limiter else OUTCOME_ALLOWED
+        if rate_limit_outcome != OUTCOME_ALLOWED:
+            self._counters.increment("rate_limit_" + rate_limit_outcome)
+            if rate_limit_outcome == OUTCOME_DROPPED:
+                return
+
+        index_parameters, document = self._get_index_parameters(event)
+        dedup_key = None
+        if self._deduplicator:
+            duplicate, dedup_key = self._check_duplicate(event, document,
+                                                         index_parameters)
+            if duplicate:
+                return
+
+        # The deduplication key is only kept once the event has been
+        # accepted (indexed, buffered, or spooled), so that a retry of an
+        # event which failed is not dropped as a duplicate
+        accepted = False
+        try:
+            accepted = self._handle_event(event, index_parameters, document,
+                                          rate_limit_outcome)
+        finally:
+            if dedup_key and not accepted:
+                self._deduplicator.forget(dedup_key)
+
+    def _handle_event(self, event, index_parameters, document,
+                      rate_limit_outcome):
+        """
+        Transform and index, or spool, an event which has passed sampling,
+        rate limiting, and deduplication.
+
+        :param dxlclient.message.Event event: The event
+        :param dict index_parameters: Default set of parameters to use for the
+            Elasticsearch 'index' operation, or None.
+        :param dict document: The decoded event document, or None if the
+            payload could not be decoded.
+        :param str rate_limit_outcome: The outcome of the rate limit check.
+        :return: True if the operations for the event were accepted, False if
+            any of them were dropped.
+        :rtype: bool
+        """
+        if self._transform_pipeline and index_parameters and \
+                isinstance(document, dict):
+            self._transform_pipeline.transform(document)
+
+        if rate_limit_outcome == OUTCOME_SPOOLED:
+            return self._spool_event(event, index_parameters)
+
+        if self._transform_batcher:
+            if not self._transform_batcher.add((event, index_parameters),
+                                               block=True):
+                logger.error("Event callback for event group %s has been "
+                             "closed, skipping indexing for topic: %s",
+                             self._event_group_name, event.destination_topic)
+                return False
+            return True
+
         if self._transform_script:
-            index_operations = self._get_transformed_operations(
-                event, index_parameters)
-            index_operations = index_operations if index_operations else ()
+            index_operations = self._transform_script.transform(
+                [event], [index_parameters])
         else:
-            index_operations = [index_parameters]
+            index_operations = [index_parameters] if index_parameters else ()
 
+        accepted = True
         for index_operation in index_operations:
-            self._log_index_message(logger.debug,
-                                    "Indexing event to elasticsearch",
-                                    event.destination_topic,
-                                    index_operation)
-            logger.debug("Indexing with parameters: %s", index_operation)
-            try:
-                self._es_client.index(**index_operation)
-            except Exception:
-                self._log_index_message(
-                    logger.exception,
-                    "Error indexing event to elasticsearch",
-                    event.destination_topic,
-                    index_operation)
-                raise
+            accepted = self._index_operation(event.destination_topic,
+                                             index_operation,
+                                             event.payload) and accepted
+        return accepted
 
-    def _get_transformed_operations(self, event, index_parameters):
+    def close(self):
+        """
+        Pass any events waiting to be transformed in a batch to the transform
+        script and index the resulting documents.
         """
-        Pass along an event and a default set of parameters for an
-        Elasticsearch document index operation to a Python transform script, if
-        one is defined for the event group.
+        if self._transform_batcher:
+            self._transform_batcher.close()
+        if self._transform_pool:
+            self._transform_pool.close()
 
-        :param dxlclient.message.Event event: The event
-        :param dict index_parameters: Default set of parameters to use for
-            the Elasticsearch 'index' operation.
-        :return: A list of dictionaries containing parameters for an
-            Elasticsearch 'index' operation to perform.
-        :rtype: list(dict)
-        """
-        if self._reload_transform_scripts_on_change:
-            # This implementation reloads the transform script on each event
-            # received, regardless of whether the script has changed or not.
-            # This could be made much more efficient with at least an mtime
-            # check on the script.
-            with self._transform_lock:
-                index_operations = self._get_transform_function()(
-                    event, index_parameters)
-        else:
-            transform_function = self._transform_function
-            index_operations = transform_function(event, index_parameters)
+    def _on_event_batch(self, batch):
+        """
+        Pass a batch of events to the transform script and index the resulting
+        documents. If the transform script is run in worker processes, the
+        documents are indexed once the workers return them.
 
-        if isinstance(index_operations, dict):
-            index_operations = [index_operations]
+        :param list(tuple) batch: Tuples containing each event and its default
+            set of parameters for the Elasticsearch 'index' operation.
+        """
+        events = [event for event, _ in batch]
+        index_parameters = [parameters for _, parameters in batch]
+        if self._transform_pool:
+            self._transform_pool.submit(events, index_parameters)
+            return
+        try:
+            index_operations = self._transform_script.transform_events(
+                events, index_parameters)
+        except Exception:
+            self._forget_events(events)
+            raise
+        self._index_batch_operations(events, index_operations)
 
-        return index_operations
+    def _index_batch_operations(self, events, index_operations):
+        """
+        Perform the Elasticsearch 'index' operations which the transform
+        script returned for a batch of events.
 
-    def _get_transform_function(self):
+        :param list(dxlclient.message.Event) events: The events
+        :param list(tuple) index_operations: Tuples containing the position
+            of the event which each operation was created from (or None if
+            not known) and the parameters for the 'index' operation.
         """
-        Load the transform script and return a reference to the "on_event"
-        function from it.
+        topics = set(event.destination_topic for event in events)
+        batch_topic = topics.pop() if len(topics) == 1 else None
 
-        :return: The loaded function.
-        :raises ValueError: If no "on_event" function can be found within the
-            module loaded from the transform script.
+        accepted = True
+        for position, index_operation in index_operations:
+            if position is None:
+                topic, payload = batch_topic, None
+            else:
+                topic = events[position].destination_topic
+                payload = events[position].payload
+            try:
+                accepted = self._index_operation(
+                    topic, index_operation, payload) and accepted
+            except Exception:  # pylint: disable=broad-except
+                # The error has already been logged. Continue so that the
+                # error does not prevent the remaining documents in the batch
+                # from being indexed.
+                accepted = False
+        if not accepted:
+            # The operations cannot be traced back to the events they were
+            # created from, so a retry of any event in the batch is allowed
+            self._forget_events(events)
+
+    def _forget_events(self, events):
+        """
+        Remove the deduplication keys for events which were not indexed, so
+        that a retry of the events is not dropped as a duplicate.
+
+        :param list(dxlclient.message.Event) events: The events
+        """
+        if not self._deduplicator:
+            return
+        for event in events:
+            try:
+                document = self._codec.loads(event.payload)
+            except ValueError:
+                document = None
+            key = self._deduplicator.get_key(event.payload, document)
+            if key:
+                self._deduplicator.forget(key)
+
+    def _check_duplicate(self, event, document, index_parameters):
+        """
+        Determine whether or not an event repeats an event which was recently
+        received, recording the deduplication key for an event which does
+        not. If deriving document IDs is enabled, the ID for an event which
+        is not a duplicate is set from its deduplication key.
+
+        :param dxlclient.message.Event event: The event.
+        :param dict document: The decoded event document, or None if the
+            payload could not be decoded.
+        :param dict index_parameters: Default set of parameters to use for the
+            Elasticsearch 'index' operation, or None.
+        :return: Tuple containing whether or not the event is a duplicate and
+            the deduplication key which was recorded for the event (or None).
+        :rtype: tuple(bool, str)
+        """
+        key = self._deduplicator.get_key(event.payload, document)
+        if not key:
+            return False, None
+
+        if self._deduplicator.is_duplicate(key):
+            self._counters.increment("dedup_hits")
+            logger.debug("Dropping duplicate event for topic %s, key: %s",
+                         event.destination_topic, key)
+            return True, None
+
+        self._counters.increment("dedup_misses")
+        if self._dedup_derive_id and index_parameters and \
+                not index_parameters.get("id"):
+            index_parameters["id"] = key
+        return False, key
+
+    def _index_operation(self, topic, index_operation, payload=None):
         """
-        full_module_name = "{}.{}".format(self._TRANSFORM_PACKAGE_NAME,
-                                          self._event_group_name)
+        Perform an Elasticsearch 'index' operation for an event.
 
-        logger.debug("Loading %s from %s", full_module_name,
-                     self._transform_script)
+        :param str topic: DXL topic of the event which the operation was
+            created from, or None if not known.
+        :param dict index_operation: Parameters for the 'index' operation.
+        :param payload: Payload of the event which the operation was created
+            from, written to the dead-letter destination if the operation is
+            rejected. If None, the operation body is written instead.
+        :return: True if the operation was accepted (performed, buffered,
+            spooled, or added to the dead-letter queue), False if it was
+            dropped.
+        :rtype: bool
+        """
+        self._log_index_message(logger.debug,
+                                "Indexing event to elasticsearch",
+                                topic,
+                                index_operation)
+        logger.debug("Indexing with parameters: %s", index_operation)
         try:
-            # See the definition of the
-            # _PYTHON_VERSION_SUPPORTS_MODULE_FROM_SPEC_LOADING constant
-            # for more details on why the different loading approaches are
-            # used.
-            if _PYTHON_VERSION_SUPPORTS_MODULE_FROM_SPEC_LOADING:
-                # pylint: disable=no-member, no-name-in-module
-                spec = importlib.util.spec_from_file_location(
-                    full_module_name, self._transform_script)
-                transform_module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(transform_module)
+            if self._bulk_indexer and supports_operation(index_operation):
+                self._bulk_indexer.add(index_operation, topic, payload)
             else:
-                transform_module = imp.load_source(full_module_name,
-                                                   self._transform_script)
+                operation_function, parameters = \
+                    self._get_operation_function(index_operation)
+                try:
+                    if self._retry_policy:
+                        self._retry_policy.call(self._counters,
+                                                operation_function,
+                                                **parameters)
+                    else:
+                        operation_function(**parameters)
+                finally:
+                    if self._response_cache:
+                        self._response_cache.invalidate(
+                            index_operation.get("index"))
+            return True
         except Exception as ex:
-            logger.error(
-                "Failed to load transform script (%s) from section %s: %s",
-                self._transform_script, self._event_group_name, ex)
+            rejected = isinstance(ex, RequestRejectedError)
+            if rejected:
+                self._counters.increment("diverted")
+            if self._spool_operation(ex, index_operation):
+                self._log_index_message(
+                    logger.warning,
+                    "Elasticsearch unavailable, spooled event",
+                    topic,
+                    index_operation)
+                return True
+            if self._dead_letter_queue and \
+                    (rejected or not is_retryable_error(ex)):
+                self._counters.increment("failures")
+                self._log_index_message(
+                    logger.debug,
+                    "Elasticsearch rejected event, added to dead-letter",
+                    topic,
+                    index_operation)
+                self._dead_letter_queue.add(
+                    topic,
+                    index_operation,
+                    index_operation.get("body") if payload is None
+                    else payload,
+                    ex)
+                return True
+            if rejected:
+                self._log_index_message(
+                    logger.error,
+                    "{}, dropped event".format(ex),
+                    topic,
+                    index_operation)
+                return False
+            self._log_index_message(
+                logger.exception,
+                "Error indexing event to elasticsearch",
+                topic,
+                index_operation)
             raise
 
-        transform_function = transform_module.__dict__.get("on_event")
-        if not transform_function:
-            raise ValueError(
-                "{} in transform script {} from section {}".format(
-                    "on_event function not found",
-                    self._transform_script,
-                    self._event_group_name
-                )
-            )
+    def _get_operation_function(self, index_operation):
+        """
+        Get the Elasticsearch client method and parameters with which to
+        perform an operation in a separate request.
+
+        :param dict index_operation: Parameters for the operation.
+        :return: Tuple containing the method and a dictionary with the
+            parameters for the method.
+        :rtype: tuple
+        """
+        operation_type = get_operation_type(index_operation)
+        if operation_type not in (OPERATION_TYPE_UPDATE,
+                                  OPERATION_TYPE_DELETE):
+            # The 'index' API performs both 'index' and 'create' operations,
+            # and rejects any other operation type
+            return self._es_client.index, index_operation
+
+        parameters = dict(index_operation)
+        del parameters["op_type"]
+        body = parameters.pop("body", None)
+        if operation_type == OPERATION_TYPE_DELETE:
+            return self._es_client.delete, parameters
+        parameters["body"] = {
+            "doc": get_document(self._es_client.transport.serializer, body),
+            "doc_as_upsert": True}
+        return self._es_client.update, parameters
 
-        return transform_function
+    def _spool_operation(self, exception, index_operation):
+        """
+        Write an 'index' operation which failed because Elasticsearch is
+        unavailable to the spool.
+
+        :param Exception exception: The exception raised for the operation.
+        :param dict index_operation: Parameters for the 'index' operation.
+        :return: True if the operation was spooled, False otherwise.
+        :rtype: bool
+        """
+        return bool(self._spool) and is_retryable_error(exception) and \
+            supports_operation(index_operation) and \
+            self._spool.append(
+                [get_bulk_action(self._es_client.transport.serializer,
+                                 index_operation)],
+                self._event_group_name)
+
+    def _spool_event(self, event, index_parameters):
+        """
+        Write the 'index' operations for an event which is over the rate
+        limit to the spool, from which they are replayed to Elasticsearch at
+        the spool replay rate.
+
+        :param dxlclient.message.Event event: The event.
+        :param dict index_parameters: Default set of parameters to use for the
+            Elasticsearch 'index' operation for the event.
+        :return: True if all of the operations were spooled, False if any of
+            them were dropped.
+        :rtype: bool
+        """
+        if self._transform_script:
+            index_operations = self._transform_script.transform(
+                [event], [index_parameters])
+        else:
+            index_operations = [index_parameters] if index_parameters else ()
+
+        spooled = True
+        for index_operation in index_operations:
+            if not supports_operation(index_operation) or \
+                    not self._spool.append([get_bulk_action(
+                        self._es_client.transport.serializer,
+                        index_operation)], self._event_group_name):
+                self._log_index_message(
+                    logger.error,
+                    "Event over rate limit could not be spooled, dropped event",
+                    event.destination_topic,
+                    index_operation)
+                spooled = False
+        return spooled
 
     def _get_index_parameters(self, event):
         """
@@ -198,23 +541,32 @@ class ElasticsearchServiceEventCallback(EventCallback): # pylint: disable=too-ma
         storing the payload from the supplied event to Elasticsearch.
 
         :param dxlclient.message.Event event: The event.
-        :return: A dictionary with parameters for the 'index' operation. If
-            the event payload cannot be converted into a JSON document or if
-            the ID cannot be derived from the document, None is returned.
-        :rtype: dict
+        :return: Tuple containing a dictionary with parameters for the
+            'index' operation and the decoded event document. If the event
+            payload cannot be converted into a JSON document, the document is
+            None. If the event payload cannot be converted into a JSON
+            document or if the ID cannot be derived from the document, the
+            dictionary is None.
+        :rtype: tuple(dict, dict)
         """
         body = None
+        document = None
         document_id = None
 
         try:
-            body = MessageUtils.json_payload_to_dict(event)
-            if self._id_field_name:
-                document_id = body.get(self._id_field_name)
+            document = self._codec.loads(event.payload)
+            body = document
+            if self._pass_through_payloads and document:
+                # The payload has been validated as JSON, so it can be sent
+                # to Elasticsearch as is, avoiding encoding the document again
+                body = MessageUtils.decode_payload(event).rstrip("\0")
+            if self._id_field_path:
+                document_id = self._id_field_path.get(document)
                 if not document_id:
                     logger.error(
                         "%s from %s field in event, %s: %s",
                         "Unable to obtain id",
-                        self._id_field_name,
+                        self._id_field_path.path,
                         "skipping indexing for topic",
                         event.destination_topic)
         except ValueError:
@@ -227,14 +579,17 @@ class ElasticsearchServiceEventCallback(EventCallback): # pylint: disable=too-ma
                     event.destination_topic)
 
         if body:
-            index_parameters = {"index": self._document_index,
+            index_parameters = {"index":
+                                    self._document_index.resolve(document),
                                 "doc_type": self._document_type,
                                 "body": body,
                                 "id": document_id}
+            if self._operation_type:
+                index_parameters["op_type"] = self._operation_type
         else:
             index_parameters = None
 
-        return index_parameters
+        return index_parameters, document
 
     @staticmethod
     def _get_index_parameter_text(operation, name, description):
@@ -277,11 +632,167 @@ class ElasticsearchServiceEventCallback(EventCallback): # pylint: disable=too-ma
                                                     "ID"))
 
 
-class ElasticsearchServiceRequestCallback(RequestCallback):
+class ElasticsearchServiceEventRouterCallback(EventCallback):
+    """
+    Event callback which routes each event to the callbacks for the event
+    groups whose topic patterns match the topic the event was sent to.
+    """
+    def __init__(self, topic_index):
+        """
+        Constructor parameters:
+
+        :param dxlelasticsearchservice._topicindex.TopicIndex topic_index:
+            Index from topics to the event group callbacks.
+        """
+        super(ElasticsearchServiceEventRouterCallback, self).__init__()
+        self._topic_index = topic_index
+
+    def on_event(self, event):
+        """
+        Callback invoked when an event is received.
+
+        :param dxlclient.message.Event event: The event
+        """
+        callbacks = self._topic_index.match(event.destination_topic)
+        if not callbacks:
+            logger.debug("No event group for topic %s, skipping indexing",
+                         event.destination_topic)
+        for callback in callbacks:
+            try:
+                callback.on_event(event)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception(
+                    "Error handling event for topic %s in event group %s",
+                    event.destination_topic, callback.event_group_name)
+
+
+def _get_error_details(ex):
+    """
+    Log an error raised while handling a request and get the details to
+    report for it. Must be called while the error is being handled, so that
+    its stack trace is logged.
+
+    :param Exception ex: The error.
+    :return: Tuple containing the error message and a dictionary with the
+        module and class of the error (and, for an Elasticsearch transport
+        error, the error data), or None if the error has no details to report.
+    :rtype: tuple(str, dict)
+    """
+    if isinstance(ex, RequestRejectedError):
+        # The request was not sent, so there is no stack trace or
+        # Elasticsearch error information to report
+        error_str = str(ex)
+        logger.warning("Request rejected: %s", error_str)
+        return error_str, {"module": ex.__module__,
+                           "class": ex.__class__.__name__}
+
+    if isinstance(ex, TransportError):
+        error_str = str(ex)
+        logger.exception("TransportError handling request: %s", error_str)
+
+        error_dict = {
+            "module": ex.__module__,
+            "class": ex.__class__.__name__}
+
+        if isinstance(ex.info, dict):
+            error_info = ex.info
+        else:
+            # If the error info is not already a dict, make a dict with
+            # just the original class name of the error info object and
+            # an associated error message. This is done to ensure that the
+            # error response can be serialized into JSON for the DXL
+            error_info = {"class": ex.info.__class__.__name__,
+                          "error": ex.info.__str__()}
+        error_dict["data"] = {"status_code": ex.status_code,
+                              "error": ex.error,
+                              "info": error_info}
+        return error_str, error_dict
+
+    if isinstance(ex, (ImproperlyConfigured, ElasticsearchException)):
+        error_str = str(ex)
+        logger.exception("Elasticsearch exception handling request: %s",
+                         error_str)
+        return error_str, {"module": ex.__module__,
+                           "class": ex.__class__.__name__}
+
+    error_str = str(ex)
+    logger.exception("Error handling request: %s", error_str)
+    if not error_str:
+        error_str = ex.__class__.__name__
+    return error_str, None
+
+
+class _ExecutorRequestCallback(RequestCallback): # pylint: disable=abstract-method
+    """
+    Base class for request callbacks which handle requests on a lane of a
+    request executor, if one is supplied, rather than on the thread which
+    receives them.
+    """
+    def __init__(self, app, codec=None, executor=None):
+        """
+        Constructor parameters:
+
+        :param dxlelasticsearchservice.app.ElasticsearchService app: The
+            Elasticsearch service application
+        :param dxlelasticsearchservice._codec.JsonCodec codec: Codec used to
+            decode request payloads and encode response payloads. If None,
+            the standard library codec is used.
+        :param dxlelasticsearchservice._executor.RequestExecutor executor:
+            Executor on which to handle requests. If None, requests are
+            handled on the thread which receives them.
+        """
+        super(_ExecutorRequestCallback, self).__init__()
+        self._app = app
+        self._codec = codec if codec else JsonCodec()
+        self._executor = executor
+
+    def _submit(self, request, lane, function, *args):
+        """
+        Run a function which handles a request in an executor lane, or send
+        an error response for the request if the lane cannot accept it.
+
+        :param dxlclient.message.Request request: The request
+        :param str lane: The executor lane.
+        :param function: Function which handles the request and sends the
+            response.
+        """
+        if not self._executor:
+            function(*args)
+        elif not self._executor.submit(lane, function, *args):
+            logger.warning("Request queue for %s lane is full or closed, "
+                           "rejecting request on topic '%s'",
+                           lane, request.destination_topic)
+            self._app.client.send_response(ErrorResponse(
+                request,
+                error_message=MessageUtils.encode(
+                    "Service busy, request queue for {} lane is full or "
+                    "closed".format(lane))))
+
+    def _get_error_response(self, request, ex):
+        """
+        Get the error response for a request which failed. Must be called
+        while the error is being handled, so that its stack trace is logged.
+
+        :param dxlclient.message.Request request: The request
+        :param Exception ex: The error.
+        :return: The error response.
+        :rtype: dxlclient.message.ErrorResponse
+        """
+        error_str, error_dict = _get_error_details(ex)
+        res = ErrorResponse(request,
+                            error_message=MessageUtils.encode(error_str))
+        if error_dict:
+            res.payload = self._codec.dumps_bytes(error_dict)
+        return res
+
+
+class ElasticsearchServiceRequestCallback(_ExecutorRequestCallback):
     """
     Request callback used to invoke the Elasticsearch REST API.
     """
-    def __init__(self, app, api_method):
+    def __init__(self, app, api_method, codec=None, executor=None, lane=None, # pylint: disable=too-many-arguments
+                 response_cache=None, single_flight=None,
+                 request_batcher=None):
         """
         Constructor parameters:
 
@@ -289,15 +800,50 @@ class ElasticsearchServiceRequestCallback(RequestCallback):
             Elasticsearch service application
         :param api_method: Method or function to invoke when a request
             is received.
+        :param dxlelasticsearchservice._codec.JsonCodec codec: Codec used to
+            decode request payloads and encode response payloads. If None,
+            the standard library codec is used.
+        :param dxlelasticsearchservice._executor.RequestExecutor executor:
+            Executor on which to handle requests. If None, requests are
+            handled on the thread which receives them.
+        :param str lane: The executor lane in which to handle requests.
+        :param dxlelasticsearchservice._cache.ResponseCache response_cache:
+            Cache of responses, which responses for the API method are read
+            from (if the method only reads data) or invalidated by (if the
+            method may write data). If None, responses are not cached.
+        :param dxlelasticsearchservice._singleflight.SingleFlight
+            single_flight: Coalescer for identical requests, through which
+            requests for an API method which only reads data are sent, so that
+            a request which arrives while an identical request is in flight
+            shares its response. If None, requests are not coalesced.
+        :param dxlelasticsearchservice._requestbatch.RequestBatcher
+            request_batcher: Batcher which combines concurrent requests into
+            'mget' or '_bulk' requests. If None, each request is sent on its
+            own.
         """
-        super(ElasticsearchServiceRequestCallback, self).__init__()
-        self._app = app
+        super(ElasticsearchServiceRequestCallback, self).__init__(
+            app, codec, executor)
+        self._lane = lane
         self._api_method = api_method
+        self._response_cache = response_cache
+        self._api_name = api_method.__name__
+        self._writes = get_request_lane(self._api_name) == LANE_WRITE
+        self._single_flight = None if self._writes else single_flight
+        self._request_batcher = request_batcher
 
     def on_request(self, request):
         """
         Callback invoked when a request is received.
 
+        :param dxlclient.message.Request request: The request
+        """
+        self._submit(request, self._lane, self._handle_request, request)
+
+    def _handle_request(self, request):
+        """
+        Invoke the Elasticsearch API method for a request and send the
+        response.
+
         :param dxlclient.message.Request request: The request
         """
         logger.info("Request received on topic '%s'",
@@ -305,60 +851,438 @@ class ElasticsearchServiceRequestCallback(RequestCallback):
         logger.debug("Payload for topic %s: %s", request.destination_topic,
                      request.payload)
         try:
+            request_dict = self._codec.loads(request.payload) \
+                if request.payload else {}
+
+            if self._request_batcher and \
+                    self._request_batcher.supports(self._api_name,
+                                                   request_dict) and \
+                    self._add_batched_request(request, request_dict):
+                return
+
             res = Response(request)
+            res.payload = self.get_response_payload(request_dict)
+        except Exception as ex:  # pylint: disable=broad-except
+            res = self._get_error_response(request, ex)
 
-            request_dict = MessageUtils.json_payload_to_dict(request) \
-                if request.payload else {}
+        self._app.client.send_response(res)
 
-            response_data = self._api_method(**request_dict)
-            MessageUtils.dict_to_json_payload(res, response_data)
+    def _add_batched_request(self, request, request_dict):
+        """
+        Add a request to the next batch for the request batcher, unless its
+        response is cached. The response is sent once the batch has been
+        sent to Elasticsearch.
 
-        except TransportError as ex:
-            error_str = str(ex)
-            logger.exception("TransportError handling request: %s",
-                             error_str)
-            res = ErrorResponse(
-                request,
-                error_message=MessageUtils.encode(error_str))
+        :param dxlclient.message.Request request: The request
+        :param dict request_dict: The request parameters.
+        :return: True if the request was handled, False if the request
+            batcher has been closed.
+        :rtype: bool
+        """
+        key = generation = None
+        if self._response_cache and \
+                self._response_cache.is_cacheable(self._api_name):
+            key = get_request_key(self._api_name, request_dict)
+            payload, generation = self._response_cache.get(key)
+            if payload is not None:
+                res = Response(request)
+                res.payload = payload
+                self._app.client.send_response(res)
+                return True
+        return self._request_batcher.add(
+            self._api_name,
+            request_dict,
+            functools.partial(self._on_batched_response, request,
+                              request_dict, key, generation))
+
+    def _on_batched_response(self, request, request_dict, key, generation, # pylint: disable=too-many-arguments
+                             response_data, error):
+        """
+        Send the response for a request which was sent in a batch.
+
+        :param dxlclient.message.Request request: The request
+        :param dict request_dict: The request parameters.
+        :param tuple key: The response cache key for the request, or None if
+            the response is not cached.
+        :param int generation: The response cache generation at the time the
+            request was added to the batch.
+        :param dict response_data: The response for the request, or None if
+            the request failed.
+        :param Exception error: The error for the request, or None if the
+            request succeeded.
+        """
+        try:
+            if error:
+                raise error
+            res = Response(request)
+            res.payload = self._codec.dumps_bytes(response_data)
+            if key:
+                self._response_cache.put(key, request_dict.get("index"),
+                                         res.payload, generation)
+        except Exception as ex:  # pylint: disable=broad-except
+            res = self._get_error_response(request, ex)
+
+        self._app.client.send_response(res)
+
+    def get_response_payload(self, request_dict):
+        """
+        Get the encoded response payload for a request, from the response
+        cache if the response for the request is cached.
+
+        :param dict request_dict: The request parameters.
+        :return: The encoded response payload.
+        :rtype: bytes
+        """
+        cacheable = self._response_cache and \
+            self._response_cache.is_cacheable(self._api_name)
+        if not cacheable and not self._single_flight:
+            try:
+                return self._invoke_api_method(request_dict)
+            finally:
+                # The write may have been applied even if an error was
+                # raised, for example, for a timeout
+                if self._writes and self._response_cache:
+                    self._response_cache.invalidate(request_dict.get("index"))
+
+        key = get_request_key(self._api_name, request_dict)
+        generation = None
+        if cacheable:
+            payload, generation = self._response_cache.get(key)
+            if payload is not None:
+                return payload
+        if self._single_flight:
+            payload, shared = self._single_flight.call(
+                key, self._invoke_api_method, request_dict)
+        else:
+            payload, shared = self._invoke_api_method(request_dict), False
+        # Only the request which sent the query caches the response, since
+        # the cache generation for a shared request is later than the time
+        # at which the query was sent
+        if cacheable and not shared:
+            self._response_cache.put(key, request_dict.get("index"), payload,
+                                     generation)
+        return payload
+
+    def _invoke_api_method(self, request_dict):
+        """
+        Invoke the Elasticsearch API method for a request.
+
+        :param dict request_dict: The request parameters.
+        :return: The encoded response payload.
+        :rtype: bytes
+        """
+        return self._codec.dumps_bytes(self._api_method(**request_dict))
+
+
+class ElasticsearchServiceBatchRequestCallback(_ExecutorRequestCallback):
+    """
+    Request callback used to invoke multiple Elasticsearch APIs in a single
+    request.
+
+    The request payload contains an array of operations, each an object with
+    the name of the API method in "api" and its parameters in "params", and
+    may be wrapped in an object with the array in "operations" and an
+    "ordered" flag. The response payload contains an object with an array in
+    "results", holding, for each operation, an object with either the
+    operation's response in "result" or its error in "error".
+
+    Operations are performed concurrently, except that a write and the
+    operations before and after it which may access the same index are
+    performed in the order they appear. In ordered mode, operations are
+    performed one at a time, in order, and the operations after one which
+    fails are not performed.
+
+    A request is handled in the executor lane for the most expensive kind
+    of operation it contains, and operations which are performed
+    concurrently are run in the executor lanes for their kind.
+    """
+
+    #: Message for an operation which was not performed because an earlier
+    #: operation failed.
+    _NOT_PERFORMED_MESSAGE = \
+        "Operation not performed since an earlier operation failed"
+
+    #: Names of the API methods whose request body may refer to indexes other
+    #: than those in the 'index' parameter.
+    _MULTI_INDEX_API_NAMES = frozenset((
+        "bulk", "mget", "msearch", "msearch_template", "mtermvectors"))
+
+    def __init__(self, app, request_callbacks, max_operations, # pylint: disable=too-many-arguments
+                 max_concurrency, codec=None, executor=None):
+        """
+        Constructor parameters:
+
+        :param dxlelasticsearchservice.app.ElasticsearchService app: The
+            Elasticsearch service application
+        :param dict request_callbacks: Dictionary of the names of the API
+            methods which operations may invoke to the request callback for
+            the method, through which operations are performed.
+        :param int max_operations: Maximum number of operations in a request.
+        :param int max_concurrency: Maximum number of operations in a request
+            which are performed at once.
+        :param dxlelasticsearchservice._codec.JsonCodec codec: Codec used to
+            decode request payloads and encode response payloads. If None,
+            the standard library codec is used.
+        :param dxlelasticsearchservice._executor.RequestExecutor executor:
+            Executor on which to handle requests and perform operations
+            concurrently. If None, requests are handled on the thread which
+            receives them and operations are performed one at a time.
+        """
+        super(ElasticsearchServiceBatchRequestCallback, self).__init__(
+            app, codec, executor)
+        self._request_callbacks = request_callbacks
+        self._max_operations = max_operations
+        self._max_concurrency = max_concurrency
+
+    def on_request(self, request):
+        """
+        Callback invoked when a request is received.
+
+        :param dxlclient.message.Request request: The request
+        """
+        logger.info("Request received on topic '%s'",
+                    request.destination_topic)
+        logger.debug("Payload for topic %s: %s", request.destination_topic,
+                     request.payload)
+        try:
+            operations, ordered = self._get_operations(
+                self._codec.loads(request.payload) if request.payload
+                else None)
+        except Exception as ex:  # pylint: disable=broad-except
+            self._app.client.send_response(
+                self._get_error_response(request, ex))
+            return
+        self._submit(request, self._get_lane(operations),
+                     self._handle_request, request, operations, ordered)
 
-            error_dict = {
-                "module": ex.__module__,
-                "class": ex.__class__.__name__}
+    def _handle_request(self, request, operations, ordered):
+        """
+        Perform the operations for a request and send the response.
 
-            if isinstance(ex.info, dict):
-                error_info = ex.info
+        :param dxlclient.message.Request request: The request
+        :param list(tuple) operations: The API method name and parameters for
+            each operation.
+        :param bool ordered: Whether or not the operations are ordered.
+        """
+        try:
+            results = [None] * len(operations)
+            if ordered:
+                for index, (api_name, params) in enumerate(operations):
+                    results[index], succeeded = self._perform_operation(
+                        api_name, params)
+                    if not succeeded:
+                        for remaining in range(index + 1, len(operations)):
+                            results[remaining] = self._codec.dumps_bytes(
+                                {"error": {
+                                    "message": self._NOT_PERFORMED_MESSAGE}})
+                        break
             else:
-                # If the error info is not already a dict, make a dict with
-                # just the original class name of the error info object and
-                # an associated error message. This is done to ensure that the
-                # error response can be serialized into JSON for the DXL
-                error_info = {"class": ex.info.__class__.__name__,
-                              "error": ex.info.__str__()}
-            error_dict["data"] = {"status_code": ex.status_code,
-                                  "error": ex.error,
-                                  "info": error_info}
-            MessageUtils.dict_to_json_payload(res, error_dict)
-
-        except (ImproperlyConfigured, ElasticsearchException) as ex:
-            error_str = str(ex)
-            logger.exception("Elasticsearch exception handling request: %s",
-                             error_str)
-            res = ErrorResponse(
-                request,
-                error_message=MessageUtils.encode(error_str))
+                self._perform_concurrently(operations, results)
+            res = Response(request)
+            res.payload = b"".join((b'{"results":[', b",".join(results),
+                                    b"]}"))
+        except Exception as ex:  # pylint: disable=broad-except
+            res = self._get_error_response(request, ex)
 
-            error_dict = {
-                "module": ex.__module__,
-                "class": ex.__class__.__name__}
+        self._app.client.send_response(res)
 
-            MessageUtils.dict_to_json_payload(res, error_dict)
+    @staticmethod
+    def _get_lane(operations):
+        """
+        Get the executor lane for the most expensive kind of operation in a
+        list of operations.
 
-        except Exception as ex:
-            error_str = str(ex)
-            logger.exception("Error handling request: %s", error_str)
-            if not error_str:
-                error_str = ex.__class__.__name__
-            res = ErrorResponse(request,
-                                error_message=MessageUtils.encode(error_str))
+        :param list(tuple) operations: The API method name and parameters for
+            each operation.
+        :return: The lane: "write" if any operation is a write, "search" if
+            any operation is a search, and "read" otherwise.
+        :rtype: str
+        """
+        lanes = set(get_request_lane(api_name) for api_name, _ in operations)
+        for lane in (LANE_WRITE, LANE_SEARCH):
+            if lane in lanes:
+                return lane
+        return LANE_READ
+
+    def _get_operations(self, request_dict):
+        """
+        Get the operations for a request.
+
+        :param request_dict: The decoded request payload.
+        :return: Tuple containing a list with the API method name and
+            parameters for each operation, and whether or not the operations
+            are ordered.
+        :rtype: tuple(list(tuple), bool)
+        :raises ValueError: If the payload or an operation is malformed or
+            an operation is for an API method which is not exposed.
+        """
+        ordered = False
+        operations = request_dict
+        if isinstance(request_dict, dict):
+            operations = request_dict.get("operations")
+            ordered = bool(request_dict.get("ordered", False))
+        if not isinstance(operations, list):
+            raise ValueError("Request must contain an array of operations")
+        if len(operations) > self._max_operations:
+            raise ValueError(
+                "Request contains {} operations, the maximum is {}".format(
+                    len(operations), self._max_operations))
+
+        result = []
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict) or \
+                    not isinstance(operation.get("params", {}), dict):
+                raise ValueError("Operation {} is malformed".format(index))
+            api_name = operation.get("api")
+            if api_name not in self._request_callbacks:
+                raise ValueError(
+                    "Elasticsearch API name for operation {} is not "
+                    "allowed: {}".format(index, api_name))
+            result.append((api_name, operation.get("params") or {}))
+        return result, ordered
+
+    def _perform_concurrently(self, operations, results):
+        """
+        Perform operations concurrently, on up to the maximum number of
+        executor threads at once, except that the operations in each chain
+        from :meth:`_get_chains` are performed one at a time, in order.
+
+        :param list(tuple) operations: The API method name and parameters for
+            each operation.
+        :param list results: List in which to store the encoded result for
+            each operation.
+        """
+        chains = self._get_chains(operations)
+        lanes = [self._get_lane([operations[index] for index in chain])
+                 for chain in chains]
+        pending_chains = collections.OrderedDict(
+            (lane, collections.deque()) for lane in lanes)
+        for lane, chain in zip(lanes, chains):
+            pending_chains[lane].append(chain)
+        condition = threading.Condition()
+        running = [0]
+
+        def perform_chains(chain_lanes):
+            while True:
+                with condition:
+                    chain = next((pending_chains[lane].popleft()
+                                  for lane in chain_lanes
+                                  if pending_chains[lane]), None)
+                    if chain is None:
+                        return
+                    running[0] += 1
+                try:
+                    for index in chain:
+                        results[index] = self._perform_operation(
+                            *operations[index])[0]
+                finally:
+                    with condition:
+                        running[0] -= 1
+                        condition.notify_all()
+
+        # Other chains are performed by tasks in the executor lane for their
+        # kind of operations, while this thread performs any chains which
+        # have not been started by a task. A task which only runs once every
+        # chain has been started does nothing, so waiting below only ever
+        # waits for chains which are being performed.
+        if self._executor:
+            for lane in lanes[1:self._max_concurrency]:
+                if not self._executor.submit(lane, perform_chains, (lane,)):
+                    break
+        perform_chains(list(pending_chains))
+        with condition:
+            while running[0]:
+                condition.wait()
+
+    @classmethod
+    def _get_chains(cls, operations):
+        """
+        Group operations into chains which must be performed one at a time,
+        in order. An operation is in the same chain as each earlier operation
+        which may access a common index if either of the two operations is a
+        write, so that a write acts as a barrier for the later operations on
+        its indexes. Operations which do not share an index with a write are
+        each in their own chain.
 
+        :param list(tuple) operations: The API method name and parameters for
+            each operation.
+        :return: The index of each operation in each chain.
+        :rtype: list(list(int))
+        """
+        scopes = []
+        for api_name, params in operations:
+            # The body of a multi-document request may refer to any index
+            patterns = None if api_name in cls._MULTI_INDEX_API_NAMES \
+                else get_index_patterns(params.get("index"))
+            scopes.append((patterns, get_request_lane(api_name) == LANE_WRITE))
+
+        parents = list(range(len(operations)))
+
+        def find_root(index):
+            while parents[index] != index:
+                parents[index] = parents[parents[index]]
+                index = parents[index]
+            return index
+
+        for index, (patterns, writes) in enumerate(scopes):
+            for earlier_index in range(index):
+                earlier_patterns, earlier_writes = scopes[earlier_index]
+                if (writes or earlier_writes) and \
+                        patterns_overlap(patterns, earlier_patterns):
+                    parents[find_root(index)] = find_root(earlier_index)
+
+        chains = collections.OrderedDict()
+        for index in range(len(operations)):
+            chains.setdefault(find_root(index), []).append(index)
+        return list(chains.values())
+
+    def _perform_operation(self, api_name, params):
+        """
+        Perform an operation.
+
+        :param str api_name: Name of the API method for the operation.
+        :param dict params: Parameters for the operation.
+        :return: Tuple containing the encoded result for the operation and
+            whether or not the operation succeeded.
+        :rtype: tuple(bytes, bool)
+        """
+        try:
+            payload = self._request_callbacks[api_name].get_response_payload(
+                params)
+            return b"".join((b'{"result":', payload, b"}")), True
+        except Exception as ex:  # pylint: disable=broad-except
+            error_str, error_dict = _get_error_details(ex)
+            error = dict(error_dict) if error_dict else {}
+            error["message"] = error_str
+            return self._codec.dumps_bytes({"error": error}), False
+
+
+class ElasticsearchServiceStatsRequestCallback(RequestCallback):
+    """
+    Request callback used to return the statistics for the service.
+    """
+    def __init__(self, app, codec=None):
+        """
+        Constructor parameters:
+
+        :param dxlelasticsearchservice.app.ElasticsearchService app: The
+            Elasticsearch service application
+        :param dxlelasticsearchservice._codec.JsonCodec codec: Codec used to
+            encode response payloads. If None, the standard library codec is
+            used.
+        """
+        super(ElasticsearchServiceStatsRequestCallback, self).__init__()
+        self._app = app
+        self._codec = codec if codec else JsonCodec()
+
+    def on_request(self, request):
+        """
+        Callback invoked when a request is received.
+
+        :param dxlclient.message.Request request: The request
+        """
+        logger.info("Request received on topic '%s'",
+                    request.destination_topic)
+        res = Response(request)
+        res.payload = self._codec.dumps_bytes(self._app.stats)
         self._app.client.send_response(res)
@@ -0,0 +1,114 @@
+from __future__ import absolute_import
+import logging
+import random
+import time
+
+from elasticsearch.exceptions import ConnectionError as ESConnectionError, \
+    TransportError
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+#: HTTP status codes returned by Elasticsearch for failures which may succeed
+#: if retried (the cluster is throttling requests or is unavailable).
+RETRYABLE_STATUS_CODES = (429, 503)
+
+
+class RequestRejectedError(ESConnectionError):
+    """
+    Error raised for a request which is rejected locally, without being sent
+    to Elasticsearch, for example, because a circuit breaker is open.
+
+    The error is retryable, so documents for a rejected request are spooled
+    where a spool is configured, but a :class:`RetryPolicy` does not retry
+    the request since retrying it immediately would be rejected as well.
+    """
+
+    def __str__(self):
+        return str(self.error)
+
+
+def is_retryable_error(exception):
+    """
+    Determine whether or not an exception raised by the Elasticsearch client
+    represents a failure which may succeed if retried.
+
+    :param Exception exception: The exception.
+    :return: True if the failure is retryable, False if it is permanent.
+    :rtype: bool
+    """
+    return isinstance(exception, ESConnectionError) or \
+        (isinstance(exception, TransportError) and
+         exception.status_code in RETRYABLE_STATUS_CODES)
+
+
+class RetryPolicy(object):
+    """
+    Policy for retrying Elasticsearch operations which fail with a retryable
+    error, using exponential backoff with full jitter between attempts.
+    """
+
+    def __init__(self, max_retries, initial_backoff_ms, max_backoff_ms):
+        """
+        Constructor parameters:
+
+        :param int max_retries: Maximum number of times to retry an operation.
+        :param int initial_backoff_ms: Upper bound, in milliseconds, for the
+            delay before the first retry. The bound doubles for each
+            subsequent retry.
+        :param int max_backoff_ms: Maximum upper bound, in milliseconds, for
+            the delay before a retry.
+        """
+        self._max_retries = max_retries
+        self._initial_backoff = initial_backoff_ms / 1000.0
+        self._max_backoff = max_backoff_ms / 1000.0
+
+    @property
+    def max_retries(self):
+        """
+        The maximum number of times to retry an operation.
+
+        :rtype: int
+        """
+        return self._max_retries
+
+    def get_backoff(self, attempt):
+        """
+        Get the delay before retrying an operation.
+
+        :param int attempt: Number of retries already performed for the
+            operation.
+        :return: The delay, in seconds.
+        :rtype: float
+        """
+        return random.uniform(
+            0, min(self._max_backoff, self._initial_backoff * (2 ** attempt)))
+
+    def call(self, counters, function, *args, **kwargs):
+        """
+        Invoke a function, retrying it if it raises a retryable error.
+
+        :param dxlelasticsearchservice._stats.Counters counters: Counters to
+            record retries and give-ups in.
+        :param function: The function to invoke.
+        :return: The value returned by the function.
+        :raises Exception: The last exception raised by the function if it
+            raised a permanent error or the retries were exhausted.
+        """
+        attempt = 0
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except Exception as ex:
+                if not is_retryable_error(ex) or \
+                        isinstance(ex, RequestRejectedError):
+                    raise
+                if attempt >= self._max_retries:
+                    counters.increment("give_ups")
+                    raise
+                counters.increment("retries")
+                backoff = self.get_backoff(attempt)
+                logger.debug("Retrying in %.3f seconds after error: %s",
+                             backoff, ex)
+                time.sleep(backoff)
+                attempt += 1
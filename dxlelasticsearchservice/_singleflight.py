@@ -0,0 +1,78 @@
+from __future__ import absolute_import
+import threading
+
+
+class _Call(object): # pylint: disable=too-few-public-methods
+    """
+    Call which is in flight for a key.
+    """
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Coalesces concurrent calls with the same key, so that a call which
+    arrives while another call for the same key is in flight waits for that
+    call and shares its result (or error) rather than invoking the function
+    again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._coalesced = 0
+
+    @property
+    def coalesced(self):
+        """
+        The number of calls which have shared the result of a call which was
+        already in flight.
+
+        :rtype: int
+        """
+        return self._coalesced
+
+    def call(self, key, function, *args, **kwargs):
+        """
+        Invoke a function, unless a call for the same key is already in
+        flight, in which case wait for that call to complete.
+
+        :param key: The key for the call. Must be hashable.
+        :param function: The function to invoke.
+        :return: Tuple containing the value returned by the function and
+            whether or not the value was shared from a call which was already
+            in flight.
+        :rtype: tuple
+        :raises Exception: Any exception raised by the function, including
+            for a call which was already in flight.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            shared = call is not None
+            if shared:
+                self._coalesced += 1
+            else:
+                call = _Call()
+                self._calls[key] = call
+
+        if shared:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function(*args, **kwargs)
+        except Exception as ex:
+            call.error = ex
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
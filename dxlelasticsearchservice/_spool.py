@@ -0,0 +1,429 @@
+from __future__ import absolute_import
+import glob
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+from dxlelasticsearchservice._bulk import get_bulk_item_result
+from dxlelasticsearchservice._retry import RETRYABLE_STATUS_CODES, \
+    is_retryable_error
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+
+class Spool(object): # pylint: disable=too-many-instance-attributes
+    """
+    Segmented, append-only disk spool for '_bulk' API actions which could not
+    be submitted to Elasticsearch.
+
+    Each record in a segment file consists of a 4-byte, big-endian length
+    followed by the UTF-8 encoded name of the event group which the document
+    belongs to, a newline, and the action and source lines for a single
+    document. Records are only appended to the newest (active) segment.
+    Sealed segments are memory-mapped for replay and deleted once all of their
+    records have been replayed.
+    """
+
+    #: File name suffix for spool segment files.
+    _SEGMENT_SUFFIX = ".spool"
+    #: File name suffix for files which store the replay offset of a segment.
+    _OFFSET_SUFFIX = ".offset"
+    #: Header which precedes each record in a segment file.
+    _RECORD_HEADER = struct.Struct(">I")
+
+    def __init__(self, directory, max_bytes, segment_bytes):
+        """
+        Constructor parameters:
+
+        :param str directory: Directory in which segment files are stored.
+        :param int max_bytes: Maximum total size, in bytes, of all segment
+            files. Records which would cause this size to be exceeded are
+            dropped.
+        :param int segment_bytes: Size, in bytes, at which the active segment
+            is sealed and a new segment is started.
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._segment_bytes = segment_bytes
+
+        self._lock = threading.Lock()
+        self._sealed_segments = sorted(
+            int(os.path.basename(path)[:-len(self._SEGMENT_SUFFIX)])
+            for path in glob.glob(
+                os.path.join(directory, "*" + self._SEGMENT_SUFFIX)))
+        self._total_bytes = sum(
+            os.path.getsize(self._get_segment_path(segment))
+            for segment in self._sealed_segments)
+        self._next_segment = self._sealed_segments[-1] + 1 \
+            if self._sealed_segments else 0
+        self._active_segment = None
+        self._active_file = None
+        self._active_bytes = 0
+
+        if self._sealed_segments:
+            logger.info("Found %d byte(s) of spooled documents in %s",
+                        self._total_bytes, directory)
+
+    @property
+    def pending_bytes(self):
+        """
+        The total size, in bytes, of all segment files.
+
+        :rtype: int
+        """
+        return self._total_bytes
+
+    def append(self, actions, event_group_name=None):
+        """
+        Append '_bulk' API actions to the spool.
+
+        :param list(tuple) actions: Tuples containing the action line and
+            source line for each document.
+        :param str event_group_name: Name of the event group which the
+            documents belong to, or None if not known.
+        :return: True if the actions were spooled, False if the actions were
+            dropped because the spool size limit would have been exceeded.
+        :rtype: bool
+        """
+        prefix = (event_group_name or "") + "\n"
+        data = b"".join(
+            self._RECORD_HEADER.pack(len(record)) + record
+            for record in ((prefix + "".join(action)).encode("utf-8")
+                           for action in actions))
+
+        with self._lock:
+            if self._total_bytes + len(data) > self._max_bytes:
+                return False
+            if not self._active_file:
+                self._active_segment = self._next_segment
+                self._next_segment += 1
+                self._active_file = open(
+                    self._get_segment_path(self._active_segment), "ab")
+                self._active_bytes = 0
+            self._active_file.write(data)
+            self._active_file.flush()
+            self._active_bytes += len(data)
+            self._total_bytes += len(data)
+            if self._active_bytes >= self._segment_bytes:
+                self._seal_active_segment()
+        return True
+
+    def read_records(self, max_records):
+        """
+        Read records from the oldest segment, starting at its replay offset.
+        The records are not removed from the spool until :meth:`commit` is
+        called.
+
+        :param int max_records: Maximum number of records to read.
+        :return: Tuple containing the segment number, the offset just past
+            the last record read, and a list of the records read, each as a
+            tuple containing the event group name (or None if not known) and
+            the action and source lines. If the spool is empty, the segment
+            number is None and the list is empty.
+        :rtype: tuple(int, int, list(tuple))
+        """
+        while True:
+            with self._lock:
+                if not self._sealed_segments and self._active_bytes:
+                    self._seal_active_segment()
+                if not self._sealed_segments:
+                    return None, 0, []
+                segment = self._sealed_segments[0]
+
+            offset = self._read_offset(segment)
+            end_offset, records = self._read_segment(segment, offset,
+                                                     max_records)
+            if records:
+                return segment, end_offset, records
+            self.commit(segment, end_offset, True)
+
+    def commit(self, segment, offset, finished=False):
+        """
+        Record that the records in a segment up to the supplied offset have
+        been replayed. The segment is deleted once all of its records have
+        been replayed.
+
+        :param int segment: The segment number.
+        :param int offset: Offset just past the last replayed record.
+        :param bool finished: Whether or not the segment should be deleted
+            regardless of the offset.
+        """
+        segment_path = self._get_segment_path(segment)
+        segment_size = os.path.getsize(segment_path)
+        if finished or offset >= segment_size:
+            with self._lock:
+                self._sealed_segments.remove(segment)
+                self._total_bytes -= segment_size
+            os.remove(segment_path)
+            if os.path.exists(segment_path + self._OFFSET_SUFFIX):
+                os.remove(segment_path + self._OFFSET_SUFFIX)
+        else:
+            with open(segment_path + self._OFFSET_SUFFIX, "w") as offset_file:
+                offset_file.write(str(offset))
+
+    def close(self):
+        """
+        Close the active segment file.
+        """
+        with self._lock:
+            if self._active_file:
+                self._seal_active_segment()
+
+    def _get_segment_path(self, segment):
+        """
+        Get the path to a segment file.
+
+        :param int segment: The segment number.
+        :return: The path to the segment file.
+        :rtype: str
+        """
+        return os.path.join(self._directory,
+                            "{:020d}{}".format(segment, self._SEGMENT_SUFFIX))
+
+    def _seal_active_segment(self):
+        """
+        Close the active segment file and make it available for replay. The
+        caller must hold the spool lock.
+        """
+        self._active_file.close()
+        self._sealed_segments.append(self._active_segment)
+        self._active_segment = None
+        self._active_file = None
+        self._active_bytes = 0
+
+    def _read_offset(self, segment):
+        """
+        Read the replay offset for a segment.
+
+        :param int segment: The segment number.
+        :return: The replay offset.
+        :rtype: int
+        """
+        offset_path = self._get_segment_path(segment) + self._OFFSET_SUFFIX
+        if not os.path.exists(offset_path):
+            return 0
+        with open(offset_path) as offset_file:
+            return int(offset_file.read().strip() or 0)
+
+    def _read_segment(self, segment, offset, max_records):
+        """
+        Read records from a memory-mapped segment file.
+
+        :param int segment: The segment number.
+        :param int offset: Offset of the first record to read.
+        :param int max_records: Maximum number of records to read.
+        :return: Tuple containing the offset just past the last record read
+            and a list of the records read, each as a tuple containing the
+            event group name (or None if not known) and the action and source
+            lines.
+        :rtype: tuple(int, list(tuple))
+        """
+        records = []
+        with open(self._get_segment_path(segment), "rb") as segment_file:
+            segment_size = os.fstat(segment_file.fileno()).st_size
+            if offset >= segment_size:
+                return offset, records
+            segment_map = mmap.mmap(segment_file.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+            try:
+                header_size = self._RECORD_HEADER.size
+                while len(records) < max_records and \
+                        offset + header_size <= segment_size:
+                    record_size = self._RECORD_HEADER.unpack_from(
+                        segment_map, offset)[0]
+                    record_end = offset + header_size + record_size
+                    if record_end > segment_size:
+                        logger.warning(
+                            "Discarding truncated record at offset %d in %s",
+                            offset, self._get_segment_path(segment))
+                        offset = segment_size
+                        break
+                    event_group_name, _, record = segment_map[
+                        offset + header_size:record_end].decode(
+                            "utf-8").partition("\n")
+                    records.append((event_group_name or None, record))
+                    offset = record_end
+            finally:
+                segment_map.close()
+        return offset, records
+
+
+class SpoolReplayer(object): # pylint: disable=too-many-instance-attributes
+    """
+    Replays spooled documents to Elasticsearch through the '_bulk' API once
+    the cluster is available, at a limited rate.
+    """
+
+    #: Maximum number of documents to include in a single '_bulk' request.
+    _MAX_BATCH_SIZE = 500
+    #: Number of seconds to wait between checks for spooled documents or for
+    #: the availability of the cluster.
+    _RETRY_INTERVAL = 5
+
+    def __init__(self, spool, es_client, replay_rate, response_cache=None, # pylint: disable=too-many-arguments
+                 dead_letter_queues=None):
+        """
+        Constructor parameters:
+
+        :param Spool spool: The spool to replay documents from.
+        :param Elasticsearch es_client: The Elasticsearch client.
+        :param int replay_rate: Maximum number of documents to replay per
+            second.
+        :param dxlelasticsearchservice._cache.ResponseCache response_cache:
+            Cache of responses for DXL requests, in which the responses for
+            the indexes written to are invalidated. If None, no responses are
+            cached.
+        :param dict dead_letter_queues: Dead-letter destinations for
+            documents which Elasticsearch rejects, keyed by event group name.
+            Rejected documents for an event group without a destination are
+            only logged.
+        """
+        self._spool = spool
+        self._es_client = es_client
+        self._replay_rate = replay_rate
+        self._response_cache = response_cache
+        self._dead_letter_queues = {} if dead_letter_queues is None \
+            else dead_letter_queues
+        self._batch_size = max(1, min(self._MAX_BATCH_SIZE, replay_rate))
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run,
+                                        name="SpoolReplayer")
+        self._thread.daemon = True
+
+    def start(self):
+        """
+        Start replaying spooled documents.
+        """
+        self._thread.start()
+
+    def close(self):
+        """
+        Stop replaying spooled documents.
+        """
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        """
+        Replay spooled documents until the replayer is closed.
+        """
+        while not self._stop_event.is_set():
+            try:
+                self._replay_next_batch()
+            except Exception:  # pylint: disable=broad-except
+                # Keep the thread alive so that the spool is drained once
+                # the error (for example, a full disk) has cleared
+                logger.exception("Error replaying spooled documents")
+                self._stop_event.wait(self._RETRY_INTERVAL)
+
+    def _replay_next_batch(self):
+        """
+        Replay the next batch of spooled documents, or wait if there are no
+        spooled documents or the cluster is unavailable.
+        """
+        if not self._spool.pending_bytes or not self._es_client.ping():
+            self._stop_event.wait(self._RETRY_INTERVAL)
+            return
+
+        segment, offset, records = self._spool.read_records(self._batch_size)
+        if not records:
+            return
+
+        start_time = time.time()
+        if self._replay_batch(records):
+            self._spool.commit(segment, offset)
+            self._stop_event.wait(len(records) / float(self._replay_rate) -
+                                  (time.time() - start_time))
+        else:
+            self._stop_event.wait(self._RETRY_INTERVAL)
+
+    def _replay_batch(self, records):
+        """
+        Submit a batch of spooled records to Elasticsearch.
+
+        :param list(tuple) records: The spooled records, each as a tuple
+            containing the event group name and the action and source lines.
+        :return: True if the batch was processed (and can be removed from the
+            spool), False if it should be replayed again later.
+        :rtype: bool
+        """
+        logger.debug("Replaying %d spooled document(s)", len(records))
+        try:
+            response = self._es_client.bulk(
+                body="".join(record for _, record in records))
+        except Exception as ex:  # pylint: disable=broad-except
+            if is_retryable_error(ex):
+                logger.warning("Elasticsearch unavailable for replay: %s", ex)
+                return False
+            logger.debug("Error replaying %d spooled document(s): %s",
+                         len(records), ex)
+            for event_group_name, record in records:
+                metadata = get_bulk_item_result(
+                    self._es_client.transport.serializer.loads(
+                        record.partition("\n")[0]))
+                self._reject_record(event_group_name, record, metadata,
+                                    str(ex))
+            return True
+
+        if self._response_cache:
+            self._response_cache.invalidate_bulk_response(response)
+
+        if response.get("errors"):
+            unavailable_records = []
+            for item, (event_group_name, record) in \
+                    zip(response.get("items", ()), records):
+                result = get_bulk_item_result(item)
+                if result.get("status") in RETRYABLE_STATUS_CODES:
+                    unavailable_records.append((event_group_name, record))
+                elif "error" in result:
+                    self._reject_record(event_group_name, record, result,
+                                        result.get("error"))
+            dropped = sum(
+                1 for event_group_name, record in unavailable_records
+                if not self._spool.append([(record,)], event_group_name))
+            if dropped:
+                logger.error("Spool is full, dropped %d document(s)", dropped)
+        return True
+
+    def _reject_record(self, event_group_name, record, result, error):
+        """
+        Write a spooled record which Elasticsearch rejected to the
+        dead-letter destination for its event group or, if there is no
+        destination, log the error.
+
+        :param str event_group_name: Name of the event group which the
+            document belongs to, or None if not known.
+        :param str record: The action and source lines for the document.
+        :param dict result: The '_bulk' API result or action metadata for
+            the document.
+        :param error: The reason that Elasticsearch rejected the document.
+        """
+        dead_letter_queue = self._dead_letter_queues.get(event_group_name)
+        if not dead_letter_queue:
+            logger.error(
+                "Error replaying spooled document. Event: %s, Index: %s, "
+                "Type: %s, ID: %s, Status: %s, Error: %s.",
+                event_group_name, result.get("_index"), result.get("_type"),
+                result.get("_id"), result.get("status"), error)
+            return
+
+        action_line, _, source = record.partition("\n")
+        source = source.rstrip("\n") or None
+        if source and "update" in \
+                self._es_client.transport.serializer.loads(action_line):
+            # Write the partial document rather than the update wrapper
+            source = self._es_client.transport.serializer.loads(
+                source).get("doc", source)
+        dead_letter_queue.add(None,
+                              {"index": result.get("_index"),
+                               "doc_type": result.get("_type"),
+                               "id": result.get("_id")},
+                              source,
+                              error)
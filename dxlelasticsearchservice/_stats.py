@@ -0,0 +1,32 @@
+from __future__ import absolute_import
+import threading
+
+
+class Counters(object):
+    """
+    Thread-safe set of named counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def increment(self, name, count=1):
+        """
+        Increment a counter.
+
+        :param str name: Name of the counter.
+        :param int count: Amount to add to the counter.
+        """
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + count
+
+    def snapshot(self):
+        """
+        Get the current value of each counter.
+
+        :return: Dictionary of counter names to values.
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._counts)
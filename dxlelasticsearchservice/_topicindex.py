@@ -0,0 +1,195 @@
+from __future__ import absolute_import
+import threading
+
+#: Topic pattern segment which matches any single topic segment.
+SINGLE_LEVEL_WILDCARD = "+"
+#: Topic pattern segment which matches one or more remaining topic segments.
+MULTI_LEVEL_WILDCARD = "#"
+
+#: Maximum number of topics to cache the matching values for.
+_MAX_CACHED_TOPICS = 4096
+
+
+def _split_pattern(pattern):
+    """
+    Split a topic pattern into segments.
+
+    :param str pattern: The topic pattern, for example, "/tenant/+/threat".
+    :return: The segments.
+    :rtype: list(str)
+    :raises ValueError: If the pattern is malformed.
+    """
+    segments = pattern.split("/")
+    for position, segment in enumerate(segments):
+        if segment in (SINGLE_LEVEL_WILDCARD, MULTI_LEVEL_WILDCARD):
+            if segment == MULTI_LEVEL_WILDCARD and \
+                    position != len(segments) - 1:
+                raise ValueError(
+                    "Invalid topic pattern '{}': '{}' must be the last "
+                    "segment".format(pattern, MULTI_LEVEL_WILDCARD))
+        elif SINGLE_LEVEL_WILDCARD in segment or \
+                MULTI_LEVEL_WILDCARD in segment:
+            raise ValueError(
+                "Invalid topic pattern '{}': wildcards must occupy an entire "
+                "segment".format(pattern))
+    return segments
+
+
+def get_subscription_topic(pattern):
+    """
+    Get the DXL topic to subscribe to in order to receive events for a topic
+    pattern. DXL only supports a multi-level wildcard at the end of a topic,
+    so a pattern with a single-level wildcard is subscribed to from the
+    segment before the first wildcard onwards.
+
+    :param str pattern: The topic pattern.
+    :return: The topic to subscribe to.
+    :rtype: str
+    :raises ValueError: If the pattern is malformed.
+    """
+    segments = _split_pattern(pattern)
+    for position, segment in enumerate(segments):
+        if segment in (SINGLE_LEVEL_WILDCARD, MULTI_LEVEL_WILDCARD):
+            return "/".join(segments[:position] + [MULTI_LEVEL_WILDCARD])
+    return pattern
+
+
+def get_subscription_topics(patterns):
+    """
+    Get the minimal set of DXL topics to subscribe to in order to receive
+    events for a set of topic patterns. A topic which is covered by a
+    wildcard subscription is not subscribed to separately, so that each
+    event is only delivered once.
+
+    :param patterns: The topic patterns.
+    :return: The topics to subscribe to, sorted.
+    :rtype: list(str)
+    :raises ValueError: If a pattern is malformed.
+    """
+    topics = set(get_subscription_topic(pattern) for pattern in patterns)
+    wildcard_prefixes = [topic[:-len(MULTI_LEVEL_WILDCARD)]
+                         for topic in topics
+                         if topic.endswith(MULTI_LEVEL_WILDCARD)]
+    return sorted(
+        topic for topic in topics
+        if not any(topic.startswith(prefix) and len(topic) > len(prefix) and
+                   topic != prefix + MULTI_LEVEL_WILDCARD
+                   for prefix in wildcard_prefixes))
+
+
+class _Node(object): # pylint: disable=too-few-public-methods
+    """
+    Node for a topic segment in a :class:`TopicIndex`.
+    """
+
+    def __init__(self):
+        #: Child nodes, by literal segment
+        self.children = {}
+        #: Child node for a single-level wildcard segment
+        self.single_level_child = None
+        #: Registrations, as tuples containing the registration sequence
+        #: number and the value, for patterns which end in a multi-level
+        #: wildcard here
+        self.multi_level_values = []
+        #: Registrations for patterns which end here
+        self.values = []
+
+
+class TopicIndex(object):
+    """
+    Index from concrete DXL topics to the values registered for the topic
+    patterns which match them.
+
+    Patterns are held in a trie of topic segments, so that matching a topic
+    takes time proportional to the number of segments in the topic rather
+    than the number of patterns. The values which match each topic are also
+    cached, so that routing an event for a topic which has been seen before
+    is a single dictionary lookup.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._registration_count = 0
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def add(self, pattern, value):
+        """
+        Register a value for a topic pattern.
+
+        :param str pattern: The topic pattern. A "+" segment matches any
+            single topic segment and a trailing "#" segment matches one or
+            more remaining topic segments.
+        :param value: The value.
+        :raises ValueError: If the pattern is malformed.
+        """
+        segments = _split_pattern(pattern)
+        with self._lock:
+            registration = (self._registration_count, value)
+            self._registration_count += 1
+            node = self._root
+            for segment in segments:
+                if segment == MULTI_LEVEL_WILDCARD:
+                    node.multi_level_values.append(registration)
+                    break
+                if segment == SINGLE_LEVEL_WILDCARD:
+                    if not node.single_level_child:
+                        node.single_level_child = _Node()
+                    node = node.single_level_child
+                else:
+                    node = node.children.setdefault(segment, _Node())
+            else:
+                node.values.append(registration)
+            self._cache = {}
+
+    def match(self, topic):
+        """
+        Get the values registered for the patterns which match a topic.
+
+        :param str topic: The topic.
+        :return: The matching values, each included once, in the order in
+            which they were first registered.
+        :rtype: tuple
+        """
+        values = self._cache.get(topic)
+        if values is None:
+            values = self._match(topic)
+            cache = self._cache
+            if len(cache) >= _MAX_CACHED_TOPICS:
+                cache = {}
+                self._cache = cache
+            cache[topic] = values
+        return values
+
+    def _match(self, topic):
+        """
+        Get the values registered for the patterns which match a topic by
+        walking the trie.
+
+        :param str topic: The topic.
+        :return: The matching values.
+        :rtype: tuple
+        """
+        segments = topic.split("/")
+        matches = []
+        nodes = [self._root]
+        for segment in segments:
+            next_nodes = []
+            for node in nodes:
+                matches.extend(node.multi_level_values)
+                child = node.children.get(segment)
+                if child:
+                    next_nodes.append(child)
+                if node.single_level_child:
+                    next_nodes.append(node.single_level_child)
+            nodes = next_nodes
+            if not nodes:
+                break
+        for node in nodes:
+            matches.extend(node.values)
+
+        values = []
+        for _, value in sorted(matches, key=lambda match: match[0]):
+            if value not in values:
+                values.append(value)
+        return tuple(values)
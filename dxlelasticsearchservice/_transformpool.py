@@ -0,0 +1,151 @@
+from __future__ import absolute_import
+import logging
+import multiprocessing
+import threading
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+#: Transform script loaded in a worker process
+_worker_transform_script = None # pylint: disable=invalid-name
+
+
+def _init_worker(transform_script):
+    """
+    Initialize a worker process.
+
+    :param dxlelasticsearchservice._transformscript.TransformScript
+        transform_script: The transform script, loaded again in the worker
+        process when it is unpickled.
+    """
+    global _worker_transform_script # pylint: disable=global-statement
+    _worker_transform_script = transform_script
+
+
+def _get_context():
+    """
+    Get the multiprocessing context in which to start worker processes.
+
+    The pool is created once the DXL client and the service's own threads
+    are running, so the workers are not forked directly from this process,
+    where a lock held by another thread at the time of the fork (for
+    example, a logging handler lock) would never be released in the worker.
+    Python 2 only supports forking.
+
+    :return: The "forkserver" context if supported, otherwise the "spawn"
+        context, or the multiprocessing module itself on Python 2.
+    """
+    if not hasattr(multiprocessing, "get_context"):
+        return multiprocessing
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _transform_batch(events, index_parameters):
+    """
+    Pass a batch of events to the transform script in a worker process.
+
+    :param list(dxlclient.message.Event) events: The events
+    :param list(dict) index_parameters: Default set of parameters to use for
+        the Elasticsearch 'index' operation for each event.
+    :return: A list of tuples containing the position of the event which
+        each operation was created from (or None if not known) and a
+        dictionary containing parameters for an Elasticsearch 'index'
+        operation to perform.
+    :rtype: list(tuple)
+    """
+    return _worker_transform_script.transform_events(events, index_parameters)
+
+
+class TransformProcessPool(object):
+    """
+    Runs an event group transform script in a pool of worker processes so
+    that CPU-bound transforms are not limited by the global interpreter lock
+    and do not hold up the DXL message callback threads.
+
+    Batches of events are sent to the workers and the resulting operations
+    are passed to a handler, in the order in which the batches were
+    submitted, on a dedicated thread.
+    """
+
+    def __init__(self, event_group_name, transform_script, processes, # pylint: disable=too-many-arguments
+                 max_in_flight_batches, handler, error_handler=None):
+        """
+        Constructor parameters:
+
+        :param str event_group_name: The event group name.
+        :param dxlelasticsearchservice._transformscript.TransformScript
+            transform_script: The transform script to run in the workers.
+        :param int processes: Number of worker processes.
+        :param int max_in_flight_batches: Maximum number of batches which may
+            be submitted to the workers but not yet passed to the handler.
+            Once this limit is reached, :meth:`submit` waits.
+        :param handler: Function invoked with the list of events and the list
+            of resulting operations, each paired with the position of the
+            event it was created from, for each batch.
+        :param error_handler: Function invoked with the list of events for
+            each batch which could not be transformed or passed to the
+            handler. If None, the error is only logged.
+        """
+        self._event_group_name = event_group_name
+        self._handler = handler
+        self._error_handler = error_handler
+        self._pool = _get_context().Pool(processes, _init_worker,
+                                         (transform_script,))
+        self._in_flight = Queue()
+        self._in_flight_semaphore = threading.BoundedSemaphore(
+            max_in_flight_batches)
+        self._thread = threading.Thread(
+            target=self._run,
+            name="TransformProcessPool-{}".format(event_group_name))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, events, index_parameters):
+        """
+        Submit a batch of events to the worker processes.
+
+        :param list(dxlclient.message.Event) events: The events
+        :param list(dict) index_parameters: Default set of parameters to use
+            for the Elasticsearch 'index' operation for each event.
+        """
+        self._in_flight_semaphore.acquire()
+        self._in_flight.put((events, self._pool.apply_async(
+            _transform_batch, (events, index_parameters))))
+
+    def close(self):
+        """
+        Wait for the in-flight batches to be passed to the handler and stop
+        the worker processes.
+        """
+        self._in_flight.put(None)
+        self._thread.join()
+        self._pool.close()
+        self._pool.join()
+
+    def _run(self):
+        """
+        Pass the results for each batch to the handler until the pool is
+        closed.
+        """
+        while True:
+            batch = self._in_flight.get()
+            if batch is None:
+                return
+            events, result = batch
+            try:
+                self._handler(events, result.get())
+            except Exception:  # pylint: disable=broad-except
+                logger.exception(
+                    "Error transforming batch of %d event(s) for event group "
+                    "%s", len(events), self._event_group_name)
+                if self._error_handler:
+                    self._error_handler(events)
+            finally:
+                self._in_flight_semaphore.release()
@@ -0,0 +1,280 @@
+from __future__ import absolute_import
+import hashlib
+import logging
+import os
+import threading
+import time
+import types
+
+# transform scripts are loaded underneath the
+# dxlelasticsearchservice._transform module. Including this import to avoid a
+# warning that would otherwise appear when the transform scripts are loaded.
+
+import dxlelasticsearchservice._transform # pylint: disable=unused-import
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+
+class TransformScript(object): # pylint: disable=too-many-instance-attributes
+    """
+    Loads the "on_event" and "on_events" functions from an event group
+    transform script.
+
+    If reloading on change is enabled, the script's modification time and size
+    are checked at most once per check interval. The script is only
+    recompiled when its content hash changes, and the function references are
+    swapped atomically, so threads which obtain the functions never wait on a
+    lock while the script is unchanged.
+    """
+
+    #: Package under which transform script modules are loaded
+    _TRANSFORM_PACKAGE_NAME = "dxlelasticsearchservice._transform"
+
+    def __init__(self, event_group_name, script_path, reload_on_change,
+                 check_interval_ms):
+        """
+        Constructor parameters:
+
+        :param str event_group_name: The event group name.
+        :param str script_path: Path to the transform Python script.
+        :param bool reload_on_change: Whether or not to reload the script if
+            it changes while the service is running.
+        :param int check_interval_ms: Minimum time, in milliseconds, between
+            checks for changes to the script.
+        :raises ValueError: If the script cannot be loaded and reloading on
+            change is not enabled.
+        """
+        self._event_group_name = event_group_name
+        self._script_path = script_path
+        self._reload_on_change = reload_on_change
+        self._check_interval_ms = check_interval_ms
+        self._check_interval = check_interval_ms / 1000.0
+
+        self._lock = threading.Lock()
+        self._next_check_time = 0
+        self._file_signature = None
+        self._content_digest = None
+        self._functions = None
+
+        if reload_on_change:
+            try:
+                self._check_for_change()
+            except Exception:  # pylint: disable=broad-except
+                # Allow the service to start so that the script can be fixed
+                # while the service is running.
+                pass
+        else:
+            self._functions = self._load(self._read_script())
+
+    def __reduce__(self):
+        # Pickle the settings rather than the loaded functions so that the
+        # script is loaded again in the process which unpickles the object
+        return (TransformScript, (self._event_group_name, self._script_path,
+                                  self._reload_on_change,
+                                  self._check_interval_ms))
+
+    @property
+    def script_path(self):
+        """
+        The path to the transform Python script.
+
+        :rtype: str
+        """
+        return self._script_path
+
+    def transform(self, events, index_parameters):
+        """
+        Pass along events and a default set of parameters for an Elasticsearch
+        document index operation for each event to the transform script.
+
+        If the transform script defines an "on_events" function, all of the
+        events are passed to it in a single call. Otherwise, the "on_event"
+        function is called for each event.
+
+        :param list(dxlclient.message.Event) events: The events
+        :param list(dict) index_parameters: Default set of parameters to use
+            for the Elasticsearch 'index' operation for each event.
+        :return: A list of dictionaries containing parameters for an
+            Elasticsearch 'index' operation to perform.
+        :rtype: list(dict)
+        """
+        return [index_operation for _, index_operation
+                in self.transform_events(events, index_parameters)]
+
+    def transform_events(self, events, index_parameters):
+        """
+        Pass along events to the transform script, as for :meth:`transform`,
+        keeping track of the event which each operation was created from.
+
+        Operations returned by an "on_events" function cannot be traced back
+        to an event unless the batch contains a single event.
+
+        :param list(dxlclient.message.Event) events: The events
+        :param list(dict) index_parameters: Default set of parameters to use
+            for the Elasticsearch 'index' operation for each event.
+        :return: A list of tuples containing the position in ``events`` of
+            the event which the operation was created from (or None if not
+            known) and a dictionary containing parameters for an
+            Elasticsearch 'index' operation to perform.
+        :rtype: list(tuple)
+        """
+        transform_function, batch_transform_function = self.get_functions()
+
+        if batch_transform_function:
+            position = 0 if len(events) == 1 else None
+            return [(position, index_operation) for index_operation
+                    in self._normalize_operations(
+                        batch_transform_function(events, index_parameters))]
+
+        index_operations = []
+        for position, (event, event_index_parameters) in \
+                enumerate(zip(events, index_parameters)):
+            index_operations.extend(
+                (position, index_operation) for index_operation
+                in self._normalize_operations(
+                    transform_function(event, event_index_parameters)))
+        return index_operations
+
+    def get_functions(self):
+        """
+        Get the functions from the transform script, reloading the script
+        first if it has changed and the check interval has elapsed.
+
+        :return: Tuple containing the "on_event" function and the "on_events"
+            function. Either function (but not both) may be None if the script
+            does not define it.
+        :rtype: tuple
+        :raises Exception: If the script has never been loaded successfully
+            and cannot be loaded now.
+        """
+        if self._reload_on_change and \
+                (self._functions is None or
+                 time.time() >= self._next_check_time):
+            return self._check_for_change()
+        return self._functions
+
+    @staticmethod
+    def _normalize_operations(index_operations):
+        """
+        Normalize the value returned by a transform script function into a
+        list of operations.
+
+        :param index_operations: A dictionary containing parameters for a
+            single 'index' operation, a list of dictionaries, or None. The
+            type of an operation may be set with either an "op_type" or an
+            "_op" element.
+        :return: A list of dictionaries containing parameters for an
+            Elasticsearch 'index' operation to perform.
+        :rtype: list(dict)
+        """
+        if isinstance(index_operations, dict):
+            index_operations = [index_operations]
+        else:
+            index_operations = list(index_operations or ())
+        for index_operation in index_operations:
+            if "_op" in index_operation:
+                index_operation["op_type"] = index_operation.pop("_op")
+        return index_operations
+
+    def _check_for_change(self):
+        """
+        Reload the transform script if its content has changed.
+
+        :return: The current functions.
+        """
+        # Only one thread checks the script. Other threads continue to use the
+        # current functions rather than waiting, unless no functions have been
+        # loaded yet.
+        if not self._lock.acquire(self._functions is None):
+            return self._functions
+        try:
+            now = time.time()
+            if self._functions and now < self._next_check_time:
+                return self._functions
+            self._next_check_time = now + self._check_interval
+
+            try:
+                script_stat = os.stat(self._script_path)
+                file_signature = (script_stat.st_mtime, script_stat.st_size)
+                source = self._read_script() \
+                    if file_signature != self._file_signature else None
+            except Exception as ex:
+                if not self._functions:
+                    raise
+                # Check the script again once the check interval has elapsed
+                logger.error(
+                    "Failed to read transform script (%s) from section %s, "
+                    "continuing with previously loaded script: %s",
+                    self._script_path, self._event_group_name, ex)
+                return self._functions
+            if source is not None:
+                content_digest = hashlib.sha1(source).hexdigest()
+                if content_digest != self._content_digest:
+                    try:
+                        self._functions = self._load(source)
+                    except Exception:
+                        if not self._functions:
+                            raise
+                        logger.error(
+                            "Continuing with previously loaded transform "
+                            "script (%s) from section %s",
+                            self._script_path, self._event_group_name)
+                    self._content_digest = content_digest
+                self._file_signature = file_signature
+        finally:
+            self._lock.release()
+
+        return self._functions
+
+    def _read_script(self):
+        """
+        Read the content of the transform script.
+
+        :return: The script content.
+        :rtype: bytes
+        """
+        with open(self._script_path, "rb") as script_file:
+            return script_file.read()
+
+    def _load(self, source):
+        """
+        Compile and execute the transform script and return references to the
+        "on_event" and "on_events" functions from it.
+
+        :param bytes source: The script content.
+        :return: Tuple containing the loaded "on_event" and "on_events"
+            functions.
+        :rtype: tuple
+        :raises ValueError: If neither an "on_event" nor an "on_events"
+            function can be found within the module loaded from the transform
+            script.
+        """
+        full_module_name = "{}.{}".format(self._TRANSFORM_PACKAGE_NAME,
+                                          self._event_group_name)
+
+        logger.debug("Loading %s from %s", full_module_name,
+                     self._script_path)
+        try:
+            code = compile(source, self._script_path, "exec")
+            transform_module = types.ModuleType(full_module_name)
+            transform_module.__file__ = self._script_path
+            exec(code, transform_module.__dict__) # pylint: disable=exec-used
+        except Exception as ex:
+            logger.error(
+                "Failed to load transform script (%s) from section %s: %s",
+                self._script_path, self._event_group_name, ex)
+            raise
+
+        transform_function = transform_module.__dict__.get("on_event")
+        batch_transform_function = transform_module.__dict__.get("on_events")
+        if not transform_function and not batch_transform_function:
+            raise ValueError(
+                "{} in transform script {} from section {}".format(
+                    "on_event or on_events function not found",
+                    self._script_path,
+                    self._event_group_name
+                )
+            )
+
+        return transform_function, batch_transform_function
@@ -1,4 +1,4 @@
-from __future__ import absolute_import
+from __future__ import absolute_import # pylint: disable=too-many-lines
 import logging
 import os
 
@@ -6,15 +6,47 @@ from elasticsearch import Elasticsearch
 
 from dxlbootstrap.app import Application
 from dxlclient import ServiceRegistrationInfo
+from dxlelasticsearchservice._adaptive import AdaptiveBatchController
+from dxlelasticsearchservice._bulk import BulkIndexer, COALESCE_MODE_LAST, \
+    COALESCE_MODE_MERGE, OPERATION_TYPE_DELETE, OPERATION_TYPE_INDEX, \
+    OPERATION_TYPE_UPDATE, OPERATION_TYPES
+from dxlelasticsearchservice._cache import ResponseCache
+from dxlelasticsearchservice._circuitbreaker import CircuitBreaker, \
+    CircuitBreakerTransport
+from dxlelasticsearchservice._codec import AUTO_CODEC_NAME, \
+    CodecSerializer, get_codec
+from dxlelasticsearchservice._connection import HttpConnection
+from dxlelasticsearchservice._dedup import Deduplicator
+from dxlelasticsearchservice._deadletter import FileDeadLetterQueue, \
+    IndexDeadLetterQueue, TopicDeadLetterQueue
+from dxlelasticsearchservice._executor import LANE_READ, LANE_SEARCH, \
+    LANE_WRITE, RequestExecutor, get_request_lane
+from dxlelasticsearchservice._fieldpath import FieldPath
+from dxlelasticsearchservice._indexname import IndexNameTemplate
+from dxlelasticsearchservice._pipeline import TransformPipeline
+from dxlelasticsearchservice._ratelimit import OVER_LIMIT_ACTION_DROP, \
+    OVER_LIMIT_ACTION_SAMPLE, OVER_LIMIT_ACTION_SPOOL, SAMPLE_METHOD_HASH, \
+    SAMPLE_METHOD_RANDOM, RateLimiter, Sampler
+from dxlelasticsearchservice._singleflight import SingleFlight
+from dxlelasticsearchservice._spool import Spool, SpoolReplayer
+from dxlelasticsearchservice._requestbatch import RequestBatcher
 from dxlelasticsearchservice._requesthandlers import \
+    ElasticsearchServiceBatchRequestCallback, \
     ElasticsearchServiceEventCallback, \
-    ElasticsearchServiceRequestCallback
+    ElasticsearchServiceEventRouterCallback, \
+    ElasticsearchServiceRequestCallback, \
+    ElasticsearchServiceStatsRequestCallback
+from dxlelasticsearchservice._retry import RetryPolicy
+from dxlelasticsearchservice._stats import Counters
+from dxlelasticsearchservice._topicindex import TopicIndex, \
+    get_subscription_topic, get_subscription_topics
+from dxlelasticsearchservice._transformscript import TransformScript
 
 # Configure local logger
 logger = logging.getLogger(__name__)
 
 
-class ElasticsearchService(Application):
+class ElasticsearchService(Application): # pylint: disable=too-many-instance-attributes
     """
     The "Elasticsearch DXL Python Service" application class.
     """
@@ -44,6 +76,139 @@ class ElasticsearchService(Application):
     #: while the service is running.
     _GENERAL_RELOAD_TRANSFORM_SCRIPTS_ON_CHANGE = \
         "reloadTransformScriptsOnChange"
+    #: The property used to specify in the application configuration file the
+    #: minimum time, in milliseconds, between checks for changes to transform
+    #: scripts.
+    _GENERAL_RELOAD_TRANSFORM_SCRIPTS_CHECK_INTERVAL_MS_PROP = \
+        "reloadTransformScriptsCheckIntervalMs"
+    #: The property used to specify in the application configuration file a
+    #: directory in which event documents should be spooled while
+    #: Elasticsearch is unavailable.
+    _GENERAL_SPOOL_DIRECTORY_PROP = "spoolDirectory"
+    #: The property used to specify in the application configuration file the
+    #: maximum total size, in bytes, of the spool.
+    _GENERAL_SPOOL_MAX_BYTES_PROP = "spoolMaxBytes"
+    #: The property used to specify in the application configuration file the
+    #: size, in bytes, at which a spool segment file is sealed and a new
+    #: segment file is started.
+    _GENERAL_SPOOL_SEGMENT_BYTES_PROP = "spoolSegmentBytes"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of spooled documents to replay to Elasticsearch per
+    #: second.
+    _GENERAL_SPOOL_REPLAY_RATE_PROP = "spoolReplayRate"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of times to retry an Elasticsearch indexing operation
+    #: which fails with a retryable error.
+    _GENERAL_MAX_RETRIES_PROP = "maxRetries"
+    #: The property used to specify in the application configuration file the
+    #: upper bound, in milliseconds, for the delay before the first retry of
+    #: an Elasticsearch indexing operation.
+    _GENERAL_RETRY_INITIAL_BACKOFF_MS_PROP = "retryInitialBackoffMs"
+    #: The property used to specify in the application configuration file the
+    #: maximum upper bound, in milliseconds, for the delay before a retry of
+    #: an Elasticsearch indexing operation.
+    _GENERAL_RETRY_MAX_BACKOFF_MS_PROP = "retryMaxBackoffMs"
+    #: The property used to specify in the application configuration file
+    #: whether or not a request topic which returns the service statistics
+    #: should be registered with the DXL fabric.
+    _GENERAL_EXPOSE_SERVICE_STATS_PROP = "exposeServiceStats"
+    #: The property used to specify in the application configuration file
+    #: whether or not a request topic which performs multiple Elasticsearch
+    #: API operations in a single request should be registered with the DXL
+    #: fabric.
+    _GENERAL_EXPOSE_BATCH_API_PROP = "exposeBatchApi"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of operations in a request on the batch request topic.
+    _GENERAL_BATCH_API_MAX_OPERATIONS_PROP = "batchApiMaxOperations"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of operations in a request on the batch request topic
+    #: which are performed at once.
+    _GENERAL_BATCH_API_MAX_CONCURRENCY_PROP = "batchApiMaxConcurrency"
+    #: The property used to specify in the application configuration file the
+    #: codec used to encode and decode JSON event payloads, request and
+    #: response payloads, and Elasticsearch documents.
+    _GENERAL_JSON_CODEC_PROP = "jsonCodec"
+    #: The property used to specify in the application configuration file
+    #: whether a request to Elasticsearch which times out should be retried on
+    #: another server.
+    _GENERAL_RETRY_ON_TIMEOUT_PROP = "retryOnTimeout"
+    #: The property used to specify in the application configuration file
+    #: whether or not requests to Elasticsearch should be sent through a
+    #: circuit breaker.
+    _GENERAL_USE_CIRCUIT_BREAKER_PROP = "useCircuitBreaker"
+    #: The property used to specify in the application configuration file the
+    #: number of threads which handle DXL requests for Elasticsearch APIs
+    #: which read individual documents.
+    _GENERAL_READ_REQUEST_THREADS_PROP = "readRequestThreads"
+    #: The property used to specify in the application configuration file the
+    #: number of threads which handle DXL requests for Elasticsearch search
+    #: APIs.
+    _GENERAL_SEARCH_REQUEST_THREADS_PROP = "searchRequestThreads"
+    #: The property used to specify in the application configuration file the
+    #: number of threads which handle DXL requests for Elasticsearch APIs
+    #: which write documents.
+    _GENERAL_WRITE_REQUEST_THREADS_PROP = "writeRequestThreads"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of DXL requests which may wait to be handled in each
+    #: lane.
+    _GENERAL_REQUEST_QUEUE_SIZE_PROP = "requestQueueSize"
+    #: The property used to specify in the application configuration file the
+    #: number of consecutive failed or slow Elasticsearch requests after which
+    #: the circuit breaker opens.
+    _GENERAL_CIRCUIT_BREAKER_FAILURE_THRESHOLD_PROP = \
+        "circuitBreakerFailureThreshold"
+    #: The property used to specify in the application configuration file the
+    #: latency, in milliseconds, above which an Elasticsearch request is
+    #: counted as a failure by the circuit breaker.
+    _GENERAL_CIRCUIT_BREAKER_LATENCY_THRESHOLD_MS_PROP = \
+        "circuitBreakerLatencyThresholdMs"
+    #: The property used to specify in the application configuration file the
+    #: time, in milliseconds, that the circuit breaker stays open before
+    #: admitting probe requests.
+    _GENERAL_CIRCUIT_BREAKER_OPEN_MS_PROP = "circuitBreakerOpenMs"
+    #: The property used to specify in the application configuration file the
+    #: number of successful probe requests after which the circuit breaker
+    #: closes.
+    _GENERAL_CIRCUIT_BREAKER_HALF_OPEN_SUCCESSES_PROP = \
+        "circuitBreakerHalfOpenSuccesses"
+    #: The property used to specify in the application configuration file the
+    #: list of Elasticsearch APIs whose responses are cached, each optionally
+    #: followed by a colon and the time-to-live for its responses.
+    _GENERAL_RESPONSE_CACHE_API_NAMES_PROP = "responseCacheApiNames"
+    #: The property used to specify in the application configuration file the
+    #: default time, in milliseconds, that responses are cached for.
+    _GENERAL_RESPONSE_CACHE_TTL_MS_PROP = "responseCacheTtlMs"
+    #: The property used to specify in the application configuration file the
+    #: maximum total size, in bytes, of the cached responses.
+    _GENERAL_RESPONSE_CACHE_MAX_BYTES_PROP = "responseCacheMaxBytes"
+    #: The property used to specify in the application configuration file
+    #: whether or not identical DXL requests for Elasticsearch APIs which
+    #: only read data share a single query while one is in flight.
+    _GENERAL_COALESCE_READ_REQUESTS_PROP = "coalesceReadRequests"
+    #: The property used to specify in the application configuration file
+    #: whether or not concurrent DXL requests for the 'get' API are combined
+    #: into 'mget' requests and concurrent DXL requests for the 'index',
+    #: 'update', and 'delete' APIs are combined into '_bulk' requests.
+    _GENERAL_USE_REQUEST_BATCHING_PROP = "useRequestBatching"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of DXL requests to combine into a single Elasticsearch
+    #: request.
+    _GENERAL_REQUEST_BATCH_MAX_ITEMS_PROP = "requestBatchMaxItems"
+    #: The property used to specify in the application configuration file the
+    #: maximum time, in milliseconds, that a DXL request waits to be combined
+    #: with other requests.
+    _GENERAL_REQUEST_BATCH_WINDOW_MS_PROP = "requestBatchWindowMs"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of combined 'mget' requests, and of combined '_bulk'
+    #: requests, which may be sent at once.
+    _GENERAL_REQUEST_BATCH_MAX_IN_FLIGHT_PROP = "requestBatchMaxInFlight"
+
+    #: The name of the request topic suffix used to retrieve the service
+    #: statistics.
+    _SERVICE_STATS_TOPIC_NAME = "service-stats"
+    #: The name of the request topic suffix used to perform multiple
+    #: Elasticsearch API operations in a single request.
+    _SERVICE_BATCH_TOPIC_NAME = "batch"
 
     #: The property used to specify the hostname or IP address of an
     #: Elasticsearch server in the application configuration file.
@@ -90,6 +255,21 @@ class ElasticsearchService(Application):
     #: private key to use when making TLS/SSL connnections to an Elasticsearch
     #: server.
     _SERVER_CLIENT_KEY = "clientKey"
+    #: The property used to specify in the application configuration file
+    #: whether request bodies sent to an Elasticsearch server should be
+    #: compressed.
+    _SERVER_HTTP_COMPRESS_CONFIG_PROP = "httpCompress"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of persistent connections to keep open to an
+    #: Elasticsearch server.
+    _SERVER_MAX_CONNECTIONS_CONFIG_PROP = "maxConnections"
+    #: The property used to specify in the application configuration file the
+    #: timeout, in milliseconds, for requests to an Elasticsearch server.
+    _SERVER_REQUEST_TIMEOUT_MS_CONFIG_PROP = "requestTimeoutMs"
+    #: The property used to specify in the application configuration file the
+    #: timeout, in milliseconds, for establishing a connection to an
+    #: Elasticsearch server.
+    _SERVER_CONNECT_TIMEOUT_MS_CONFIG_PROP = "connectTimeoutMs"
 
     #: The property used to specify in the application configuration file a
     #: list of DXL topic names to associate with the event group.
@@ -106,11 +286,257 @@ class ElasticsearchService(Application):
     #: name of a field in the event payload whose correpsonding value should
     #: be used as the ID of the event group document stored to Elasticsearch.
     _EVENT_GROUP_ID_FIELD_NAME_PROP = "idFieldName"
+    #: The property used to specify in the application configuration file the
+    #: separator used to join the values of multiple ID fields into a
+    #: composite document ID.
+    _EVENT_GROUP_ID_FIELD_SEPARATOR_PROP = "idFieldSeparator"
+    #: The property used to specify in the application configuration file the
+    #: type of operation ('index', 'create', 'update', or 'delete') to
+    #: perform in Elasticsearch for each event group document.
+    _EVENT_GROUP_OPERATION_TYPE_PROP = "operationType"
     #: The property used to specify in the application configuration file a
     #: path to a Python script which will receive the event payload and
     #: optionally transform it into zero, one, or more documents for
     #: storage into Elasticsearch.
     _EVENT_GROUP_TRANSFORM_SCRIPT_PROP = "transformScript"
+    #: The property used to specify in the application configuration file
+    #: declarative operations, one per line, with which to transform event
+    #: documents for storage into Elasticsearch.
+    _EVENT_GROUP_TRANSFORM_OPERATIONS_PROP = "transformOperations"
+    #: The property used to specify in the application configuration file
+    #: whether the original event payload should be indexed, once validated
+    #: as JSON, rather than re-encoding the decoded document.
+    _EVENT_GROUP_PASS_THROUGH_PAYLOADS_PROP = "passThroughPayloads"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of events to pass to the transform script in a single
+    #: batch.
+    _EVENT_GROUP_TRANSFORM_BATCH_SIZE_PROP = "transformBatchSize"
+    #: The property used to specify in the application configuration file the
+    #: maximum time, in milliseconds, that an event waits to be passed to the
+    #: transform script in a batch.
+    _EVENT_GROUP_TRANSFORM_BATCH_WINDOW_MS_PROP = "transformBatchWindowMs"
+    #: The property used to specify in the application configuration file the
+    #: number of worker processes in which to run the transform script.
+    _EVENT_GROUP_TRANSFORM_PROCESSES_PROP = "transformProcesses"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of batches of events which may be submitted to the
+    #: transform worker processes but not yet indexed.
+    _EVENT_GROUP_TRANSFORM_MAX_IN_FLIGHT_BATCHES_PROP = \
+        "transformMaxInFlightBatches"
+    #: The property used to specify in the application configuration file
+    #: whether repeated events for the event group should be dropped.
+    _EVENT_GROUP_USE_DEDUPLICATION_PROP = "useDeduplication"
+    #: The property used to specify in the application configuration file the
+    #: time, in milliseconds, during which a repeat of an event is considered
+    #: a duplicate.
+    _EVENT_GROUP_DEDUP_WINDOW_MS_PROP = "dedupWindowMs"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of event keys to hold for deduplication.
+    _EVENT_GROUP_DEDUP_MAX_ENTRIES_PROP = "dedupMaxEntries"
+    #: The property used to specify in the application configuration file the
+    #: field path(s) from which the deduplication key for an event is built.
+    _EVENT_GROUP_DEDUP_FIELDS_PROP = "dedupFields"
+    #: The property used to specify in the application configuration file
+    #: whether the deduplication key should be used as the document ID for an
+    #: event whose ID is not otherwise determined.
+    _EVENT_GROUP_DEDUP_DERIVE_ID_PROP = "dedupDeriveId"
+    #: The property used to specify in the application configuration file the
+    #: fraction of events for the event group to index.
+    _EVENT_GROUP_SAMPLE_RATE_PROP = "sampleRate"
+    #: The property used to specify in the application configuration file the
+    #: method ('random' or 'hash') by which events for the event group are
+    #: sampled.
+    _EVENT_GROUP_SAMPLE_METHOD_PROP = "sampleMethod"
+    #: The property used to specify in the application configuration file the
+    #: maximum sustained number of events per second to index for the event
+    #: group.
+    _EVENT_GROUP_RATE_LIMIT_PROP = "rateLimit"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of events for the event group which may be indexed in a
+    #: burst above the rate limit.
+    _EVENT_GROUP_RATE_LIMIT_BURST_PROP = "rateLimitBurst"
+    #: The property used to specify in the application configuration file the
+    #: action ('drop', 'spool', or 'sample') for events over the rate limit.
+    _EVENT_GROUP_RATE_LIMIT_ACTION_PROP = "rateLimitAction"
+    #: The property used to specify in the application configuration file the
+    #: fraction of events over the rate limit to index when the rate limit
+    #: action is 'sample'.
+    _EVENT_GROUP_RATE_LIMIT_SAMPLE_RATE_PROP = "rateLimitSampleRate"
+    #: The property used to specify in the application configuration file
+    #: whether documents for the event group should be buffered and submitted
+    #: to Elasticsearch through the '_bulk' API.
+    _EVENT_GROUP_USE_BULK_INDEXING_PROP = "useBulkIndexing"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of documents to buffer for the event group before
+    #: submitting them to Elasticsearch.
+    _EVENT_GROUP_BULK_MAX_DOCS_PROP = "bulkMaxDocs"
+    #: The property used to specify in the application configuration file the
+    #: maximum size, in bytes, of the buffered '_bulk' request body for the
+    #: event group before submitting it to Elasticsearch.
+    _EVENT_GROUP_BULK_MAX_BYTES_PROP = "bulkMaxBytes"
+    #: The property used to specify in the application configuration file the
+    #: maximum time, in milliseconds, that a document for the event group may
+    #: be buffered before it is submitted to Elasticsearch.
+    _EVENT_GROUP_BULK_FLUSH_INTERVAL_MS_PROP = "bulkFlushIntervalMs"
+    #: The property used to specify in the application configuration file how
+    #: buffered bulk operations for the same document ID are coalesced
+    #: ('none', 'last', or 'merge') for the event group.
+    _EVENT_GROUP_BULK_COALESCE_MODE_PROP = "bulkCoalesceMode"
+    #: The property used to specify in the application configuration file
+    #: whether or not the batch size and the number of in-flight '_bulk'
+    #: requests for the event group should be tuned from the observed
+    #: Elasticsearch latency and throttling.
+    _EVENT_GROUP_USE_ADAPTIVE_BATCHING_PROP = "useAdaptiveBatching"
+    #: The property used to specify in the application configuration file the
+    #: minimum number of documents per batch when adaptive batching is used
+    #: for the event group.
+    _EVENT_GROUP_ADAPTIVE_MIN_DOCS_PROP = "adaptiveMinDocs"
+    #: The property used to specify in the application configuration file the
+    #: maximum number of '_bulk' requests which may be in flight at once when
+    #: adaptive batching is used for the event group.
+    _EVENT_GROUP_ADAPTIVE_MAX_IN_FLIGHT_PROP = "adaptiveMaxInFlight"
+    #: The property used to specify in the application configuration file the
+    #: latency, in milliseconds, which '_bulk' requests for the event group
+    #: should complete within when adaptive batching is used.
+    _EVENT_GROUP_ADAPTIVE_TARGET_LATENCY_MS_PROP = "adaptiveTargetLatencyMs"
+    #: The property used to specify in the application configuration file the
+    #: type of destination ('index', 'file', or 'topic') for event group
+    #: documents which Elasticsearch permanently rejects.
+    _EVENT_GROUP_DEAD_LETTER_TYPE_PROP = "deadLetterType"
+    #: The property used to specify in the application configuration file the
+    #: index name, file path, or DXL topic to which records for event group
+    #: documents which Elasticsearch permanently rejects are written.
+    _EVENT_GROUP_DEAD_LETTER_DESTINATION_PROP = "deadLetterDestination"
+    #: The property used to specify in the application configuration file the
+    #: size, in bytes, at which a dead-letter file is rotated.
+    _EVENT_GROUP_DEAD_LETTER_FILE_MAX_BYTES_PROP = "deadLetterFileMaxBytes"
+    #: The property used to specify in the application configuration file the
+    #: number of rotated dead-letter files to keep.
+    _EVENT_GROUP_DEAD_LETTER_FILE_BACKUP_COUNT_PROP = \
+        "deadLetterFileBackupCount"
+
+    #: Bulk coalescing mode in which operations are not coalesced.
+    _BULK_COALESCE_MODE_NONE = "none"
+
+    #: Dead-letter destination type which stores records in an Elasticsearch
+    #: index.
+    _DEAD_LETTER_TYPE_INDEX = "index"
+    #: Dead-letter destination type which appends records to a file.
+    _DEAD_LETTER_TYPE_FILE = "file"
+    #: Dead-letter destination type which sends records to a DXL topic.
+    _DEAD_LETTER_TYPE_TOPIC = "topic"
+
+    #: Default minimum time, in milliseconds, between checks for changes to
+    #: transform scripts.
+    _DEFAULT_RELOAD_TRANSFORM_SCRIPTS_CHECK_INTERVAL_MS = 1000
+
+    #: Default maximum total size, in bytes, of the spool.
+    _DEFAULT_SPOOL_MAX_BYTES = 1073741824
+    #: Default size, in bytes, at which a spool segment file is sealed.
+    _DEFAULT_SPOOL_SEGMENT_BYTES = 67108864
+    #: Default maximum number of spooled documents to replay per second.
+    _DEFAULT_SPOOL_REPLAY_RATE = 1000
+
+    #: Default size, in bytes, at which a dead-letter file is rotated.
+    _DEFAULT_DEAD_LETTER_FILE_MAX_BYTES = 10485760
+    #: Default number of rotated dead-letter files to keep.
+    _DEFAULT_DEAD_LETTER_FILE_BACKUP_COUNT = 5
+
+    #: Default maximum number of times to retry an indexing operation.
+    _DEFAULT_MAX_RETRIES = 3
+    #: Default upper bound, in milliseconds, for the delay before the first
+    #: retry of an indexing operation.
+    _DEFAULT_RETRY_INITIAL_BACKOFF_MS = 100
+    #: Default maximum upper bound, in milliseconds, for the delay before a
+    #: retry of an indexing operation.
+    _DEFAULT_RETRY_MAX_BACKOFF_MS = 10000
+
+    #: Default number of threads which handle DXL requests in the read lane.
+    _DEFAULT_READ_REQUEST_THREADS = 4
+    #: Default number of threads which handle DXL requests in the search lane.
+    _DEFAULT_SEARCH_REQUEST_THREADS = 2
+    #: Default number of threads which handle DXL requests in the write lane.
+    _DEFAULT_WRITE_REQUEST_THREADS = 4
+    #: Default maximum number of DXL requests which may wait to be handled in
+    #: each lane.
+    _DEFAULT_REQUEST_QUEUE_SIZE = 1000
+
+    #: Default number of consecutive failed requests after which the circuit
+    #: breaker opens.
+    _DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+    #: Default latency threshold, in milliseconds, for the circuit breaker
+    #: (0 for no latency threshold).
+    _DEFAULT_CIRCUIT_BREAKER_LATENCY_THRESHOLD_MS = 0
+    #: Default time, in milliseconds, that the circuit breaker stays open.
+    _DEFAULT_CIRCUIT_BREAKER_OPEN_MS = 30000
+    #: Default number of successful probe requests after which the circuit
+    #: breaker closes.
+    _DEFAULT_CIRCUIT_BREAKER_HALF_OPEN_SUCCESSES = 5
+
+    #: Default time, in milliseconds, that responses are cached for.
+    _DEFAULT_RESPONSE_CACHE_TTL_MS = 5000
+    #: Default maximum total size, in bytes, of the cached responses.
+    _DEFAULT_RESPONSE_CACHE_MAX_BYTES = 10485760
+
+    #: Default maximum number of DXL requests to combine into a single
+    #: Elasticsearch request.
+    _DEFAULT_REQUEST_BATCH_MAX_ITEMS = 100
+    #: Default maximum time, in milliseconds, that a DXL request waits to be
+    #: combined with other requests.
+    _DEFAULT_REQUEST_BATCH_WINDOW_MS = 5
+    #: Default maximum number of combined 'mget' requests, and of combined
+    #: '_bulk' requests, which may be sent at once.
+    _DEFAULT_REQUEST_BATCH_MAX_IN_FLIGHT = 4
+
+    #: Default maximum number of operations in a request on the batch request
+    #: topic.
+    _DEFAULT_BATCH_API_MAX_OPERATIONS = 100
+    #: Default maximum number of operations in a request on the batch request
+    #: topic which are performed at once.
+    _DEFAULT_BATCH_API_MAX_CONCURRENCY = 4
+
+    #: Separator used to join the values of multiple deduplication fields
+    #: before they are hashed.
+    _DEDUP_FIELD_SEPARATOR = "\x1f"
+    #: Default separator used to join the values of multiple ID fields.
+    _DEFAULT_ID_FIELD_SEPARATOR = "_"
+
+    #: Default maximum number of events to pass to a transform script in a
+    #: single batch.
+    _DEFAULT_TRANSFORM_BATCH_SIZE = 1
+    #: Default maximum time, in milliseconds, that an event waits to be passed
+    #: to a transform script in a batch.
+    _DEFAULT_TRANSFORM_BATCH_WINDOW_MS = 50
+    #: Default number of worker processes in which to run a transform script
+    #: (0 runs the transform script in the service process).
+    _DEFAULT_TRANSFORM_PROCESSES = 0
+
+    #: Default time, in milliseconds, during which a repeat of an event is
+    #: considered a duplicate.
+    _DEFAULT_DEDUP_WINDOW_MS = 60000
+    #: Default maximum number of event keys to hold for deduplication.
+    _DEFAULT_DEDUP_MAX_ENTRIES = 100000
+
+    #: Default fraction of events over the rate limit to index when the rate
+    #: limit action is 'sample'.
+    _DEFAULT_RATE_LIMIT_SAMPLE_RATE = 0.1
+
+    #: Default maximum number of documents to buffer for bulk indexing.
+    _DEFAULT_BULK_MAX_DOCS = 500
+    #: Default maximum size, in bytes, of a buffered '_bulk' request body.
+    _DEFAULT_BULK_MAX_BYTES = 5242880
+    #: Default maximum time, in milliseconds, to buffer a document for bulk
+    #: indexing.
+    _DEFAULT_BULK_FLUSH_INTERVAL_MS = 1000
+
+    #: Default minimum number of documents per batch for adaptive batching.
+    _DEFAULT_ADAPTIVE_MIN_DOCS = 50
+    #: Default maximum number of in-flight '_bulk' requests for adaptive
+    #: batching.
+    _DEFAULT_ADAPTIVE_MAX_IN_FLIGHT = 4
+    #: Default target latency, in milliseconds, for '_bulk' requests for
+    #: adaptive batching.
+    _DEFAULT_ADAPTIVE_TARGET_LATENCY_MS = 1000
 
     def __init__(self, config_dir):
         """
@@ -124,8 +550,26 @@ class ElasticsearchService(Application):
         self._api_names = ()
         self._es_client = None
         self._event_groups = {}
+        self._event_callbacks = []
+        self._bulk_indexers = []
+        self._dead_letter_queues = {}
+        self._spool = None
+        self._spool_replayer = None
+        self._retry_policy = None
+        self._circuit_breaker = None
+        self._request_executor = None
+        self._response_cache = None
+        self._single_flight = None
+        self._request_batcher = None
+        self._event_group_counters = {}
+        self._batch_controllers = {}
+        self._expose_service_stats = False
+        self._batch_api_settings = None
+        self._json_codec = None
         self._service_unique_id = None
         self._reload_transform_scripts_on_change = False
+        self._reload_transform_scripts_check_interval_ms = \
+            self._DEFAULT_RELOAD_TRANSFORM_SCRIPTS_CHECK_INTERVAL_MS
 
     @property
     def client(self):
@@ -149,12 +593,81 @@ class ElasticsearchService(Application):
         """
         return self._config
 
+    @property
+    def stats(self):
+        """
+        Statistics for the service, for example, the number of indexing
+        retries performed for each event group.
+
+        :return: Dictionary of statistics
+        :rtype: dict
+        """
+        event_groups = {}
+        for event_group_name, counters in self._event_group_counters.items():
+            event_group_stats = counters.snapshot()
+            if event_group_stats.get("coalesce_operations"):
+                # Fraction of the operations for coalesced document IDs which
+                # were collapsed into an operation already in the buffer
+                event_group_stats["coalesce_ratio"] = \
+                    float(event_group_stats.get("coalesced", 0)) / \
+                    event_group_stats["coalesce_operations"]
+            batch_controller = self._batch_controllers.get(event_group_name)
+            if batch_controller:
+                event_group_stats["batch_docs_target"] = \
+                    batch_controller.batch_docs
+                event_group_stats["in_flight_target"] = \
+                    batch_controller.in_flight_limit
+            event_groups[event_group_name] = event_group_stats
+        stats = {"eventGroups": event_groups}
+        if self._circuit_breaker:
+            stats["circuitBreaker"] = {
+                "state": self._circuit_breaker.state,
+                "rejections": self._circuit_breaker.rejections}
+        if self._response_cache:
+            stats["responseCache"] = self._response_cache.stats
+        if self._single_flight:
+            stats["coalescedRequests"] = self._single_flight.coalesced
+        return stats
+
     def on_run(self):
         """
         Invoked when the application has started running.
         """
         logger.info("On 'run' callback.")
 
+    def destroy(self):
+        """
+        Destroys the application (disconnects from fabric, flushes any
+        buffered documents to Elasticsearch, etc.)
+        """
+        # Run the requests which have already been queued, and send their
+        # responses, while the DXL client is still connected. Requests which
+        # arrive in the meantime receive a "busy" error response.
+        if self._request_executor:
+            self._request_executor.close()
+            self._request_executor = None
+        if self._request_batcher:
+            self._request_batcher.close()
+            self._request_batcher = None
+        # Flush buffered documents, and the dead letters for any documents
+        # which Elasticsearch rejects while flushing, before disconnecting so
+        # that dead letters for a DXL topic can still be sent
+        for event_callback in self._event_callbacks:
+            event_callback.close()
+        self._event_callbacks = []
+        for bulk_indexer in self._bulk_indexers:
+            bulk_indexer.close()
+        self._bulk_indexers = []
+        if self._spool_replayer:
+            self._spool_replayer.close()
+            self._spool_replayer = None
+        for dead_letter_queue in self._dead_letter_queues.values():
+            dead_letter_queue.close()
+        self._dead_letter_queues.clear()
+        super(ElasticsearchService, self).destroy()
+        if self._spool:
+            self._spool.close()
+
     def _get_path(self, in_path):
         """
         Returns an absolute path for a file specified in the configuration file
@@ -249,6 +762,8 @@ class ElasticsearchService(Application):
             configuration file.
         :return: Dictionary of server settings.
         :rtype: dict
+        :raises ValueError: If a connection limit or timeout is not a positive
+            value.
         """
         server = {
             "host": self._get_setting_from_config(
@@ -274,7 +789,34 @@ class ElasticsearchService(Application):
                 is_file_path=True),
             "client_key": self._get_setting_from_config(
                 server_name, self._SERVER_CLIENT_KEY,
-                is_file_path=True)}
+                is_file_path=True),
+            "http_compress": self._get_setting_from_config(
+                server_name, self._SERVER_HTTP_COMPRESS_CONFIG_PROP,
+                return_type=bool),
+            "maxsize": self._get_setting_from_config(
+                server_name, self._SERVER_MAX_CONNECTIONS_CONFIG_PROP,
+                return_type=int),
+            "timeout": self._get_setting_from_config(
+                server_name, self._SERVER_REQUEST_TIMEOUT_MS_CONFIG_PROP,
+                return_type=int),
+            "connect_timeout": self._get_setting_from_config(
+                server_name, self._SERVER_CONNECT_TIMEOUT_MS_CONFIG_PROP,
+                return_type=int)}
+
+        for setting, prop in (
+                ("maxsize", self._SERVER_MAX_CONNECTIONS_CONFIG_PROP),
+                ("timeout", self._SERVER_REQUEST_TIMEOUT_MS_CONFIG_PROP),
+                ("connect_timeout",
+                 self._SERVER_CONNECT_TIMEOUT_MS_CONFIG_PROP)):
+            if optional_settings[setting] is not None and \
+                    optional_settings[setting] <= 0:
+                raise ValueError(
+                    "Setting {} in section {} must be greater than 0".format(
+                        prop, server_name))
+        # The client expects timeouts in seconds
+        for setting in ("timeout", "connect_timeout"):
+            if optional_settings[setting]:
+                optional_settings[setting] /= 1000.0
 
         for key, value in optional_settings.items():
             if value is not None:
@@ -330,28 +872,749 @@ class ElasticsearchService(Application):
             application configuration file.
         :return: Dictionary of event group settings.
         :rtype: dict
+        :raises ValueError: If a bulk indexing limit is not a positive value.
         """
-        return {
-            "topics": self._get_setting_from_config(
-                event_group,
-                self._EVENT_GROUP_TOPICS_CONFIG_PROP,
-                return_type=list,
-                raise_exception_if_missing=True),
-            "document_index": self._get_setting_from_config(
-                event_group,
-                self._EVENT_GROUP_DOCUMENT_INDEX_PROP,
-                raise_exception_if_missing=True),
+        settings = {
+            "topics": self._get_topics(event_group),
+            "document_index": self._get_document_index(event_group),
             "document_type": self._get_setting_from_config(
                 event_group,
                 self._EVENT_GROUP_DOCUMENT_TYPE_PROP,
                 raise_exception_if_missing=True),
-            "id_field_name": self._get_setting_from_config(
+            "id_field_path": self._get_field_path(
+                event_group, self._EVENT_GROUP_ID_FIELD_NAME_PROP,
+                self._get_setting_from_config(
+                    event_group,
+                    self._EVENT_GROUP_ID_FIELD_SEPARATOR_PROP,
+                    default_value=self._DEFAULT_ID_FIELD_SEPARATOR)),
+            "operation_type": self._get_setting_from_config(
                 event_group,
-                self._EVENT_GROUP_ID_FIELD_NAME_PROP),
+                self._EVENT_GROUP_OPERATION_TYPE_PROP,
+                default_value=OPERATION_TYPE_INDEX),
             "transform_script": self._get_setting_from_config(
                 event_group,
                 self._EVENT_GROUP_TRANSFORM_SCRIPT_PROP,
-                is_file_path=True)}
+                is_file_path=True),
+            "transform_pipeline": self._get_transform_pipeline(event_group),
+            "pass_through_payloads": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_PASS_THROUGH_PAYLOADS_PROP,
+                return_type=bool,
+                default_value=False),
+            "transform_batch_size": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_TRANSFORM_BATCH_SIZE_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_TRANSFORM_BATCH_SIZE),
+            "transform_batch_window_ms": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_TRANSFORM_BATCH_WINDOW_MS_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_TRANSFORM_BATCH_WINDOW_MS),
+            "transform_processes": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_TRANSFORM_PROCESSES_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_TRANSFORM_PROCESSES),
+            "transform_max_in_flight_batches": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_TRANSFORM_MAX_IN_FLIGHT_BATCHES_PROP,
+                return_type=int),
+            "use_deduplication": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_USE_DEDUPLICATION_PROP,
+                return_type=bool,
+                default_value=False),
+            "dedup_window_ms": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_DEDUP_WINDOW_MS_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_DEDUP_WINDOW_MS),
+            "dedup_max_entries": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_DEDUP_MAX_ENTRIES_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_DEDUP_MAX_ENTRIES),
+            "dedup_field_path": self._get_field_path(
+                event_group, self._EVENT_GROUP_DEDUP_FIELDS_PROP,
+                self._DEDUP_FIELD_SEPARATOR),
+            "dedup_derive_id": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_DEDUP_DERIVE_ID_PROP,
+                return_type=bool,
+                default_value=False),
+            "sample_rate": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_SAMPLE_RATE_PROP,
+                return_type=float,
+                default_value=1.0),
+            "sample_method": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_SAMPLE_METHOD_PROP,
+                default_value=SAMPLE_METHOD_RANDOM),
+            "rate_limit": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_RATE_LIMIT_PROP,
+                return_type=float,
+                default_value=0.0),
+            "rate_limit_burst": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_RATE_LIMIT_BURST_PROP,
+                return_type=int),
+            "rate_limit_action": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_RATE_LIMIT_ACTION_PROP,
+                default_value=OVER_LIMIT_ACTION_DROP),
+            "rate_limit_sample_rate": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_RATE_LIMIT_SAMPLE_RATE_PROP,
+                return_type=float,
+                default_value=self._DEFAULT_RATE_LIMIT_SAMPLE_RATE),
+            "use_bulk_indexing": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_USE_BULK_INDEXING_PROP,
+                return_type=bool,
+                default_value=False),
+            "bulk_max_docs": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_BULK_MAX_DOCS_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_BULK_MAX_DOCS),
+            "bulk_max_bytes": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_BULK_MAX_BYTES_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_BULK_MAX_BYTES),
+            "bulk_flush_interval_ms": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_BULK_FLUSH_INTERVAL_MS_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_BULK_FLUSH_INTERVAL_MS),
+            "bulk_coalesce_mode": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_BULK_COALESCE_MODE_PROP,
+                default_value=self._BULK_COALESCE_MODE_NONE),
+            "use_adaptive_batching": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_USE_ADAPTIVE_BATCHING_PROP,
+                return_type=bool,
+                default_value=False),
+            "adaptive_min_docs": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_ADAPTIVE_MIN_DOCS_PROP,
+                return_type=int),
+            "adaptive_max_in_flight": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_ADAPTIVE_MAX_IN_FLIGHT_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_ADAPTIVE_MAX_IN_FLIGHT),
+            "adaptive_target_latency_ms": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_ADAPTIVE_TARGET_LATENCY_MS_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_ADAPTIVE_TARGET_LATENCY_MS),
+            "dead_letter_type": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_DEAD_LETTER_TYPE_PROP),
+            "dead_letter_destination": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_DEAD_LETTER_DESTINATION_PROP),
+            "dead_letter_file_max_bytes": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_DEAD_LETTER_FILE_MAX_BYTES_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_DEAD_LETTER_FILE_MAX_BYTES),
+            "dead_letter_file_backup_count": self._get_setting_from_config(
+                event_group,
+                self._EVENT_GROUP_DEAD_LETTER_FILE_BACKUP_COUNT_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_DEAD_LETTER_FILE_BACKUP_COUNT)}
+
+        for setting, prop in (
+                ("transform_batch_size",
+                 self._EVENT_GROUP_TRANSFORM_BATCH_SIZE_PROP),
+                ("transform_batch_window_ms",
+                 self._EVENT_GROUP_TRANSFORM_BATCH_WINDOW_MS_PROP),
+                ("dedup_window_ms", self._EVENT_GROUP_DEDUP_WINDOW_MS_PROP),
+                ("dedup_max_entries",
+                 self._EVENT_GROUP_DEDUP_MAX_ENTRIES_PROP),
+                ("bulk_max_docs", self._EVENT_GROUP_BULK_MAX_DOCS_PROP),
+                ("bulk_max_bytes", self._EVENT_GROUP_BULK_MAX_BYTES_PROP),
+                ("bulk_flush_interval_ms",
+                 self._EVENT_GROUP_BULK_FLUSH_INTERVAL_MS_PROP),
+                ("adaptive_max_in_flight",
+                 self._EVENT_GROUP_ADAPTIVE_MAX_IN_FLIGHT_PROP),
+                ("adaptive_target_latency_ms",
+                 self._EVENT_GROUP_ADAPTIVE_TARGET_LATENCY_MS_PROP),
+                ("dead_letter_file_max_bytes",
+                 self._EVENT_GROUP_DEAD_LETTER_FILE_MAX_BYTES_PROP)):
+            if settings[setting] <= 0:
+                raise ValueError(
+                    "Setting {} in section {} must be greater than 0".format(
+                        prop, event_group))
+        if settings["transform_processes"] < 0:
+            raise ValueError(
+                "Setting {} in section {} must not be negative".format(
+                    self._EVENT_GROUP_TRANSFORM_PROCESSES_PROP, event_group))
+        if settings["transform_max_in_flight_batches"] is None:
+            # Allow a batch to be queued for each worker while another batch
+            # is being processed
+            settings["transform_max_in_flight_batches"] = \
+                settings["transform_processes"] * 2
+        elif settings["transform_max_in_flight_batches"] <= 0:
+            raise ValueError(
+                "Setting {} in section {} must be greater than 0".format(
+                    self._EVENT_GROUP_TRANSFORM_MAX_IN_FLIGHT_BATCHES_PROP,
+                    event_group))
+        self._check_rate_limit_settings(event_group, settings)
+        self._check_operation_type_setting(event_group, settings)
+        self._check_bulk_settings(event_group, settings)
+        if settings["dead_letter_file_backup_count"] < 0:
+            raise ValueError(
+                "Setting {} in section {} must not be negative".format(
+                    self._EVENT_GROUP_DEAD_LETTER_FILE_BACKUP_COUNT_PROP,
+                    event_group))
+
+        dead_letter_type = settings["dead_letter_type"]
+        if dead_letter_type:
+            if dead_letter_type not in (self._DEAD_LETTER_TYPE_INDEX,
+                                        self._DEAD_LETTER_TYPE_FILE,
+                                        self._DEAD_LETTER_TYPE_TOPIC):
+                raise ValueError(
+                    "Unexpected value for setting {} in section {}: {}".format(
+                        self._EVENT_GROUP_DEAD_LETTER_TYPE_PROP, event_group,
+                        dead_letter_type))
+            if not settings["dead_letter_destination"]:
+                raise ValueError(
+                    "{} must be specified in section {} since {} is "
+                    "specified".format(
+                        self._EVENT_GROUP_DEAD_LETTER_DESTINATION_PROP,
+                        event_group,
+                        self._EVENT_GROUP_DEAD_LETTER_TYPE_PROP))
+            if dead_letter_type == self._DEAD_LETTER_TYPE_FILE and \
+                    not os.path.isabs(settings["dead_letter_destination"]):
+                settings["dead_letter_destination"] = os.path.join(
+                    self._config_dir, settings["dead_letter_destination"])
+
+        return settings
+
+    def _check_bulk_settings(self, event_group, settings):
+        """
+        Validate the coalescing and adaptive batching settings for an event
+        group.
+
+        :param str event_group: Name of the event group section.
+        :param dict settings: The event group settings. A coalescing mode of
+            'none' is set to None, and if no minimum adaptive batch size is
+            configured, the minimum is set from the default and the maximum
+            number of documents per batch.
+        :raises ValueError: If a coalescing or adaptive batching setting is
+            invalid.
+        """
+        if settings["bulk_coalesce_mode"] not in (
+                self._BULK_COALESCE_MODE_NONE, COALESCE_MODE_LAST,
+                COALESCE_MODE_MERGE):
+            raise ValueError(
+                "Unexpected value for setting {} in section {}: {}".format(
+                    self._EVENT_GROUP_BULK_COALESCE_MODE_PROP, event_group,
+                    settings["bulk_coalesce_mode"]))
+        if settings["bulk_coalesce_mode"] == self._BULK_COALESCE_MODE_NONE:
+            settings["bulk_coalesce_mode"] = None
+        if settings["adaptive_min_docs"] is None:
+            settings["adaptive_min_docs"] = min(
+                self._DEFAULT_ADAPTIVE_MIN_DOCS, settings["bulk_max_docs"])
+        elif not 0 < settings["adaptive_min_docs"] <= \
+                settings["bulk_max_docs"]:
+            raise ValueError(
+                "Setting {} in section {} must be greater than 0 and not "
+                "greater than {}".format(
+                    self._EVENT_GROUP_ADAPTIVE_MIN_DOCS_PROP, event_group,
+                    self._EVENT_GROUP_BULK_MAX_DOCS_PROP))
+
+    def _check_operation_type_setting(self, event_group, settings):
+        """
+        Validate the operation type setting for an event group.
+
+        :param str event_group: Name of the event group section.
+        :param dict settings: The event group settings. If the operation type
+            is 'index', the operation type is set to None so that the
+            default operation type is used.
+        :raises ValueError: If the operation type is invalid or requires a
+            document ID which cannot be determined.
+        """
+        operation_type = settings["operation_type"]
+        if operation_type not in OPERATION_TYPES:
+            raise ValueError(
+                "Unexpected value for setting {} in section {}: {}".format(
+                    self._EVENT_GROUP_OPERATION_TYPE_PROP, event_group,
+                    operation_type))
+        if operation_type in (OPERATION_TYPE_UPDATE, OPERATION_TYPE_DELETE) \
+                and not settings["id_field_path"] \
+                and not settings["transform_script"] \
+                and not (settings["use_deduplication"] and
+                         settings["dedup_derive_id"]):
+            raise ValueError(
+                "{} must be specified in section {} since {} is {}".format(
+                    self._EVENT_GROUP_ID_FIELD_NAME_PROP, event_group,
+                    self._EVENT_GROUP_OPERATION_TYPE_PROP, operation_type))
+        if operation_type == OPERATION_TYPE_INDEX:
+            settings["operation_type"] = None
+
+    def _check_rate_limit_settings(self, event_group, settings):
+        """
+        Validate the sampling and rate limit settings for an event group.
+
+        :param str event_group: Name of the event group section.
+        :param dict settings: The event group settings. If no burst size is
+            configured, the burst size is set to the number of events allowed
+            in one second.
+        :raises ValueError: If a sampling or rate limit setting is invalid.
+        """
+        for setting, prop in (
+                ("sample_rate", self._EVENT_GROUP_SAMPLE_RATE_PROP),
+                ("rate_limit_sample_rate",
+                 self._EVENT_GROUP_RATE_LIMIT_SAMPLE_RATE_PROP)):
+            if not 0 <= settings[setting] <= 1:
+                raise ValueError(
+                    "Setting {} in section {} must be between 0 and 1".format(
+                        prop, event_group))
+        for setting, prop, values in (
+                ("sample_method", self._EVENT_GROUP_SAMPLE_METHOD_PROP,
+                 (SAMPLE_METHOD_RANDOM, SAMPLE_METHOD_HASH)),
+                ("rate_limit_action", self._EVENT_GROUP_RATE_LIMIT_ACTION_PROP,
+                 (OVER_LIMIT_ACTION_DROP, OVER_LIMIT_ACTION_SPOOL,
+                  OVER_LIMIT_ACTION_SAMPLE))):
+            if settings[setting] not in values:
+                raise ValueError(
+                    "Unexpected value for setting {} in section {}: {}".format(
+                        prop, event_group, settings[setting]))
+        if settings["rate_limit"] < 0:
+            raise ValueError(
+                "Setting {} in section {} must not be negative".format(
+                    self._EVENT_GROUP_RATE_LIMIT_PROP, event_group))
+        if settings["rate_limit_burst"] is None:
+            settings["rate_limit_burst"] = max(1, int(settings["rate_limit"]))
+        elif settings["rate_limit_burst"] <= 0:
+            raise ValueError(
+                "Setting {} in section {} must be greater than 0".format(
+                    self._EVENT_GROUP_RATE_LIMIT_BURST_PROP, event_group))
+        if settings["rate_limit"] and \
+                settings["rate_limit_action"] == OVER_LIMIT_ACTION_SPOOL and \
+                not self._get_setting_from_config(
+                        self._GENERAL_CONFIG_SECTION,
+                        self._GENERAL_SPOOL_DIRECTORY_PROP):
+            raise ValueError(
+                "{} must be specified in section {} since {} in section {} "
+                "is {}".format(
+                    self._GENERAL_SPOOL_DIRECTORY_PROP,
+                    self._GENERAL_CONFIG_SECTION,
+                    self._EVENT_GROUP_RATE_LIMIT_ACTION_PROP,
+                    event_group,
+                    OVER_LIMIT_ACTION_SPOOL))
+
+    def _get_topics(self, event_group):
+        """
+        Retrieve the topic patterns for an event group from the application
+        configuration.
+
+        :param str event_group: Name of the event group section.
+        :return: The topic patterns.
+        :rtype: list(str)
+        :raises ValueError: If a topic pattern is malformed.
+        """
+        topics = self._get_setting_from_config(
+            event_group,
+            self._EVENT_GROUP_TOPICS_CONFIG_PROP,
+            return_type=list,
+            raise_exception_if_missing=True)
+        try:
+            for topic in topics:
+                get_subscription_topic(topic)
+        except ValueError as ex:
+            raise ValueError(
+                "Unexpected value for setting {} in section {}: {}".format(
+                    self._EVENT_GROUP_TOPICS_CONFIG_PROP, event_group, ex))
+        return topics
+
+    def _get_document_index(self, event_group):
+        """
+        Retrieve the document index for an event group from the application
+        configuration and compile it into a template.
+
+        :param str event_group: Name of the event group section.
+        :return: The index name template.
+        :rtype: dxlelasticsearchservice._indexname.IndexNameTemplate
+        :raises ValueError: If the document index is malformed.
+        """
+        document_index = self._get_setting_from_config(
+            event_group,
+            self._EVENT_GROUP_DOCUMENT_INDEX_PROP,
+            raise_exception_if_missing=True)
+        try:
+            return IndexNameTemplate(document_index)
+        except ValueError as ex:
+            raise ValueError(
+                "Unexpected value for setting {} in section {}: {}".format(
+                    self._EVENT_GROUP_DOCUMENT_INDEX_PROP, event_group, ex))
+
+    def _get_transform_pipeline(self, event_group):
+        """
+        Retrieve the transform operations for an event group from the
+        application configuration and compile them into a pipeline.
+
+        :param str event_group: Name of the event group section.
+        :return: The pipeline, or None if no transform operations are
+            configured.
+        :rtype: dxlelasticsearchservice._pipeline.TransformPipeline
+        :raises ValueError: If a transform operation is malformed.
+        """
+        operations = self._get_setting_from_config(
+            event_group,
+            self._EVENT_GROUP_TRANSFORM_OPERATIONS_PROP)
+        if not operations:
+            return None
+
+        try:
+            return TransformPipeline(operations)
+        except ValueError as ex:
+            raise ValueError(
+                "Unexpected value for setting {} in section {}: {}".format(
+                    self._EVENT_GROUP_TRANSFORM_OPERATIONS_PROP, event_group,
+                    ex))
+
+    def _get_field_path(self, event_group, setting, separator):
+        """
+        Retrieve field path(s) for an event group from the application
+        configuration and compile them into an accessor.
+
+        :param str event_group: Name of the event group section.
+        :param str setting: Name of the setting.
+        :param str separator: Separator to join the values for multiple
+            paths with.
+        :return: The accessor, or None if the setting is not configured.
+        :rtype: dxlelasticsearchservice._fieldpath.FieldPath
+        :raises ValueError: If a field path is malformed.
+        """
+        path = self._get_setting_from_config(event_group, setting)
+        if not path:
+            return None
+
+        try:
+            return FieldPath(path, separator)
+        except ValueError as ex:
+            raise ValueError(
+                "Unexpected value for setting {} in section {}: {}".format(
+                    setting, event_group, ex))
+
+    def _get_spool_settings(self):
+        """
+        Retrieve settings for the event document spool from the application
+        configuration.
+
+        :return: Dictionary of spool settings, or None if no spool directory
+            is configured.
+        :rtype: dict
+        :raises ValueError: If a spool size or rate limit is not a positive
+            value.
+        """
+        directory = self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_SPOOL_DIRECTORY_PROP)
+        if not directory:
+            return None
+
+        settings = {
+            "directory": directory if os.path.isabs(directory) else
+                         os.path.join(self._config_dir, directory),
+            "max_bytes": self._get_setting_from_config(
+                self._GENERAL_CONFIG_SECTION,
+                self._GENERAL_SPOOL_MAX_BYTES_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_SPOOL_MAX_BYTES),
+            "segment_bytes": self._get_setting_from_config(
+                self._GENERAL_CONFIG_SECTION,
+                self._GENERAL_SPOOL_SEGMENT_BYTES_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_SPOOL_SEGMENT_BYTES),
+            "replay_rate": self._get_setting_from_config(
+                self._GENERAL_CONFIG_SECTION,
+                self._GENERAL_SPOOL_REPLAY_RATE_PROP,
+                return_type=int,
+                default_value=self._DEFAULT_SPOOL_REPLAY_RATE)}
+
+        for setting, prop in (
+                ("max_bytes", self._GENERAL_SPOOL_MAX_BYTES_PROP),
+                ("segment_bytes", self._GENERAL_SPOOL_SEGMENT_BYTES_PROP),
+                ("replay_rate", self._GENERAL_SPOOL_REPLAY_RATE_PROP)):
+            if settings[setting] <= 0:
+                raise ValueError(
+                    "Setting {} in section {} must be greater than 0".format(
+                        prop, self._GENERAL_CONFIG_SECTION))
+
+        return settings
+
+    def _get_retry_policy(self):
+        """
+        Retrieve the policy for retrying Elasticsearch indexing operations from
+        the application configuration.
+
+        :return: The retry policy.
+        :rtype: dxlelasticsearchservice._retry.RetryPolicy
+        :raises ValueError: If a retry setting is negative or the maximum
+            backoff is less than the initial backoff.
+        """
+        max_retries = self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_MAX_RETRIES_PROP,
+            return_type=int,
+            default_value=self._DEFAULT_MAX_RETRIES)
+        initial_backoff_ms = self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_RETRY_INITIAL_BACKOFF_MS_PROP,
+            return_type=int,
+            default_value=self._DEFAULT_RETRY_INITIAL_BACKOFF_MS)
+        max_backoff_ms = self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_RETRY_MAX_BACKOFF_MS_PROP,
+            return_type=int,
+            default_value=self._DEFAULT_RETRY_MAX_BACKOFF_MS)
+
+        for value, prop in (
+                (max_retries, self._GENERAL_MAX_RETRIES_PROP),
+                (initial_backoff_ms,
+                 self._GENERAL_RETRY_INITIAL_BACKOFF_MS_PROP)):
+            if value < 0:
+                raise ValueError(
+                    "Setting {} in section {} must not be negative".format(
+                        prop, self._GENERAL_CONFIG_SECTION))
+        if max_backoff_ms < initial_backoff_ms:
+            raise ValueError(
+                "Setting {} in section {} must not be less than {}".format(
+                    self._GENERAL_RETRY_MAX_BACKOFF_MS_PROP,
+                    self._GENERAL_CONFIG_SECTION,
+                    self._GENERAL_RETRY_INITIAL_BACKOFF_MS_PROP))
+
+        return RetryPolicy(max_retries, initial_backoff_ms, max_backoff_ms)
+
+    def _get_circuit_breaker(self):
+        """
+        Retrieve the circuit breaker for Elasticsearch requests from the
+        application configuration.
+
+        :return: The circuit breaker, or None if no circuit breaker is
+            configured.
+        :rtype: dxlelasticsearchservice._circuitbreaker.CircuitBreaker
+        :raises ValueError: If a circuit breaker setting is not a positive
+            value or the latency threshold is negative.
+        """
+        if not self._get_setting_from_config(
+                self._GENERAL_CONFIG_SECTION,
+                self._GENERAL_USE_CIRCUIT_BREAKER_PROP,
+                return_type=bool,
+                default_value=False):
+            return None
+
+        settings = {}
+        for prop, default_value in (
+                (self._GENERAL_CIRCUIT_BREAKER_FAILURE_THRESHOLD_PROP,
+                 self._DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD),
+                (self._GENERAL_CIRCUIT_BREAKER_LATENCY_THRESHOLD_MS_PROP,
+                 self._DEFAULT_CIRCUIT_BREAKER_LATENCY_THRESHOLD_MS),
+                (self._GENERAL_CIRCUIT_BREAKER_OPEN_MS_PROP,
+                 self._DEFAULT_CIRCUIT_BREAKER_OPEN_MS),
+                (self._GENERAL_CIRCUIT_BREAKER_HALF_OPEN_SUCCESSES_PROP,
+                 self._DEFAULT_CIRCUIT_BREAKER_HALF_OPEN_SUCCESSES)):
+            settings[prop] = self._get_setting_from_config(
+                self._GENERAL_CONFIG_SECTION,
+                prop,
+                return_type=int,
+                default_value=default_value)
+            if prop == self._GENERAL_CIRCUIT_BREAKER_LATENCY_THRESHOLD_MS_PROP:
+                if settings[prop] < 0:
+                    raise ValueError(
+                        "Setting {} in section {} must not be negative".format(
+                            prop, self._GENERAL_CONFIG_SECTION))
+            elif settings[prop] <= 0:
+                raise ValueError(
+                    "Setting {} in section {} must be greater than 0".format(
+                        prop, self._GENERAL_CONFIG_SECTION))
+
+        return CircuitBreaker(
+            settings[self._GENERAL_CIRCUIT_BREAKER_FAILURE_THRESHOLD_PROP],
+            settings[
+                self._GENERAL_CIRCUIT_BREAKER_LATENCY_THRESHOLD_MS_PROP],
+            settings[self._GENERAL_CIRCUIT_BREAKER_OPEN_MS_PROP],
+            settings[
+                self._GENERAL_CIRCUIT_BREAKER_HALF_OPEN_SUCCESSES_PROP])
+
+    def _get_response_cache(self):
+        """
+        Retrieve the cache for responses to DXL requests from the application
+        configuration.
+
+        :return: The response cache, or None if no responses are cached.
+        :rtype: dxlelasticsearchservice._cache.ResponseCache
+        :raises ValueError: If an API name or time-to-live is invalid or the
+            maximum size is not a positive value.
+        """
+        api_names = self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_RESPONSE_CACHE_API_NAMES_PROP,
+            return_type=list,
+            default_value=[])
+        if not api_names:
+            return None
+
+        default_ttl_ms = self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_RESPONSE_CACHE_TTL_MS_PROP,
+            return_type=int,
+            default_value=self._DEFAULT_RESPONSE_CACHE_TTL_MS)
+        max_bytes = self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_RESPONSE_CACHE_MAX_BYTES_PROP,
+            return_type=int,
+            default_value=self._DEFAULT_RESPONSE_CACHE_MAX_BYTES)
+        for prop, value in (
+                (self._GENERAL_RESPONSE_CACHE_TTL_MS_PROP, default_ttl_ms),
+                (self._GENERAL_RESPONSE_CACHE_MAX_BYTES_PROP, max_bytes)):
+            if value <= 0:
+                raise ValueError(
+                    "Setting {} in section {} must be greater than 0".format(
+                        prop, self._GENERAL_CONFIG_SECTION))
+
+        ttls_ms = {}
+        for api_name in api_names:
+            name, _, ttl_ms = api_name.partition(":")
+            name = name.strip()
+            try:
+                ttl_ms = int(ttl_ms) if ttl_ms.strip() else default_ttl_ms
+            except ValueError:
+                ttl_ms = 0
+            # Only responses for APIs which do not write data are cached
+            if get_request_lane(name) == LANE_WRITE or ttl_ms <= 0:
+                raise ValueError(
+                    "Unexpected value for setting {} in section {}: {}".format(
+                        self._GENERAL_RESPONSE_CACHE_API_NAMES_PROP,
+                        self._GENERAL_CONFIG_SECTION,
+                        api_name))
+            ttls_ms[name] = ttl_ms
+        return ResponseCache(ttls_ms, max_bytes)
+
+    def _get_batch_api_settings(self):
+        """
+        Retrieve the settings for the batch request topic from the
+        application configuration.
+
+        :return: Dictionary of batch request topic settings, or None if the
+            batch request topic is not exposed.
+        :rtype: dict
+        :raises ValueError: If a batch request topic setting is not a positive
+            value.
+        """
+        if not self._get_setting_from_config(
+                self._GENERAL_CONFIG_SECTION,
+                self._GENERAL_EXPOSE_BATCH_API_PROP,
+                return_type=bool,
+                default_value=False):
+            return None
+
+        settings = {}
+        for name, prop, default_value in (
+                ("max_operations",
+                 self._GENERAL_BATCH_API_MAX_OPERATIONS_PROP,
+                 self._DEFAULT_BATCH_API_MAX_OPERATIONS),
+                ("max_concurrency",
+                 self._GENERAL_BATCH_API_MAX_CONCURRENCY_PROP,
+                 self._DEFAULT_BATCH_API_MAX_CONCURRENCY)):
+            settings[name] = self._get_setting_from_config(
+                self._GENERAL_CONFIG_SECTION,
+                prop,
+                return_type=int,
+                default_value=default_value)
+            if settings[name] <= 0:
+                raise ValueError(
+                    "Setting {} in section {} must be greater than 0".format(
+                        prop, self._GENERAL_CONFIG_SECTION))
+        return settings
+
+    def _get_request_batcher(self):
+        """
+        Retrieve the batcher which combines concurrent DXL requests into
+        'mget' and '_bulk' requests from the application configuration.
+
+        :return: The request batcher, or None if requests are not batched.
+        :rtype: dxlelasticsearchservice._requestbatch.RequestBatcher
+        :raises ValueError: If the maximum number of requests per batch or
+            in flight is not a positive value or the batch window is negative.
+        """
+        if not self._get_setting_from_config(
+                self._GENERAL_CONFIG_SECTION,
+                self._GENERAL_USE_REQUEST_BATCHING_PROP,
+                return_type=bool,
+                default_value=False):
+            return None
+
+        max_items = self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_REQUEST_BATCH_MAX_ITEMS_PROP,
+            return_type=int,
+            default_value=self._DEFAULT_REQUEST_BATCH_MAX_ITEMS)
+        if max_items <= 0:
+            raise ValueError(
+                "Setting {} in section {} must be greater than 0".format(
+                    self._GENERAL_REQUEST_BATCH_MAX_ITEMS_PROP,
+                    self._GENERAL_CONFIG_SECTION))
+        window_ms = self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_REQUEST_BATCH_WINDOW_MS_PROP,
+            return_type=int,
+            default_value=self._DEFAULT_REQUEST_BATCH_WINDOW_MS)
+        if window_ms < 0:
+            raise ValueError(
+                "Setting {} in section {} must not be negative".format(
+                    self._GENERAL_REQUEST_BATCH_WINDOW_MS_PROP,
+                    self._GENERAL_CONFIG_SECTION))
+        max_in_flight = self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_REQUEST_BATCH_MAX_IN_FLIGHT_PROP,
+            return_type=int,
+            default_value=self._DEFAULT_REQUEST_BATCH_MAX_IN_FLIGHT)
+        if max_in_flight <= 0:
+            raise ValueError(
+                "Setting {} in section {} must be greater than 0".format(
+                    self._GENERAL_REQUEST_BATCH_MAX_IN_FLIGHT_PROP,
+                    self._GENERAL_CONFIG_SECTION))
+        return RequestBatcher(self._es_client, max_items, window_ms,
+                              max_in_flight, self._response_cache)
+
+    def _create_dead_letter_queue(self, event_group_name, event_group_info,
+                                  counters):
+        """
+        Create the dead-letter destination for an event group.
+
+        :param str event_group_name: The event group name.
+        :param dict event_group_info: Dictionary of event group settings.
+        :param dxlelasticsearchservice._stats.Counters counters: Counters for
+            the event group.
+        :return: The dead-letter destination, or None if no destination is
+            configured for the event group.
+        :rtype: dxlelasticsearchservice._deadletter.DeadLetterQueue
+        """
+        dead_letter_type = event_group_info["dead_letter_type"]
+        destination = event_group_info["dead_letter_destination"]
+        if dead_letter_type == self._DEAD_LETTER_TYPE_INDEX:
+            return IndexDeadLetterQueue(event_group_name, counters,
+                                        self._es_client, destination)
+        if dead_letter_type == self._DEAD_LETTER_TYPE_FILE:
+            return FileDeadLetterQueue(
+                event_group_name, counters, destination,
+                event_group_info["dead_letter_file_max_bytes"],
+                event_group_info["dead_letter_file_backup_count"])
+        if dead_letter_type == self._DEAD_LETTER_TYPE_TOPIC:
+            return TopicDeadLetterQueue(event_group_name, counters,
+                                        self._dxl_client, destination)
+        return None
 
     def on_load_configuration(self, config):
         """
@@ -397,8 +1660,74 @@ class ElasticsearchService(Application):
                 return_type=bool,
                 default_value=False)
 
+        self._reload_transform_scripts_check_interval_ms = \
+            self._get_setting_from_config(
+                self._GENERAL_CONFIG_SECTION,
+                self._GENERAL_RELOAD_TRANSFORM_SCRIPTS_CHECK_INTERVAL_MS_PROP,
+                return_type=int,
+                default_value=self.
+                _DEFAULT_RELOAD_TRANSFORM_SCRIPTS_CHECK_INTERVAL_MS)
+        if self._reload_transform_scripts_check_interval_ms <= 0:
+            raise ValueError(
+                "Setting {} in section {} must be greater than 0".format(
+                    self._GENERAL_RELOAD_TRANSFORM_SCRIPTS_CHECK_INTERVAL_MS_PROP,
+                    self._GENERAL_CONFIG_SECTION))
+
+        self._retry_policy = self._get_retry_policy()
+
+        self._expose_service_stats = self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_EXPOSE_SERVICE_STATS_PROP,
+            return_type=bool,
+            default_value=False)
+
+        self._batch_api_settings = self._get_batch_api_settings()
+
+        self._json_codec = get_codec(self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_JSON_CODEC_PROP,
+            default_value=AUTO_CODEC_NAME))
+        logger.info("Using JSON codec: %s", self._json_codec.name)
+
         logger.debug("Server host settings: %s", server_hosts)
-        self._es_client = Elasticsearch(server_hosts)
+        retry_on_timeout = self._get_setting_from_config(
+            self._GENERAL_CONFIG_SECTION,
+            self._GENERAL_RETRY_ON_TIMEOUT_PROP,
+            return_type=bool,
+            default_value=False)
+
+        self._circuit_breaker = self._get_circuit_breaker()
+
+        self._es_client = Elasticsearch(
+            server_hosts,
+            transport_class=CircuitBreakerTransport,
+            circuit_breaker=self._circuit_breaker,
+            connection_class=HttpConnection,
+            serializer=CodecSerializer(self._json_codec),
+            retry_on_timeout=retry_on_timeout)
+
+        self._response_cache = self._get_response_cache()
+        if self._get_setting_from_config(
+                self._GENERAL_CONFIG_SECTION,
+                self._GENERAL_COALESCE_READ_REQUESTS_PROP,
+                return_type=bool,
+                default_value=False):
+            self._single_flight = SingleFlight()
+        self._request_batcher = self._get_request_batcher()
+
+        spool_settings = self._get_spool_settings()
+        if spool_settings:
+            logger.debug("Spool settings: %s", spool_settings)
+            self._spool = Spool(spool_settings["directory"],
+                                spool_settings["max_bytes"],
+                                spool_settings["segment_bytes"])
+            # The dead-letter destinations are added as the event groups are
+            # registered, before the replayer is started
+            self._spool_replayer = SpoolReplayer(self._spool,
+                                                 self._es_client,
+                                                 spool_settings["replay_rate"],
+                                                 self._response_cache,
+                                                 self._dead_letter_queues)
 
     def on_dxl_connect(self):
         """
@@ -411,24 +1740,163 @@ class ElasticsearchService(Application):
         """
         Invoked when event handlers should be registered with the application
         """
+        topic_index = TopicIndex()
         for event_group_name, event_group_info in self._event_groups.items():
             logger.debug("Processing event info for group %s: %s",
                          event_group_name, event_group_info)
+            counters = Counters()
+            self._event_group_counters[event_group_name] = counters
+            dead_letter_queue = self._create_dead_letter_queue(
+                event_group_name, event_group_info, counters)
+            if dead_letter_queue:
+                self._dead_letter_queues[event_group_name] = dead_letter_queue
+
+            bulk_indexer = self._create_bulk_indexer(
+                event_group_name, event_group_info, counters,
+                dead_letter_queue)
+
+            if event_group_info["use_deduplication"]:
+                deduplicator = Deduplicator(
+                    event_group_info["dedup_window_ms"],
+                    event_group_info["dedup_max_entries"],
+                    event_group_info["dedup_field_path"])
+            else:
+                deduplicator = None
+
+            sampler, rate_limiter = self._create_rate_limiting(
+                event_group_info)
+
+            if event_group_info["transform_script"]:
+                transform_script = TransformScript(
+                    event_group_name,
+                    event_group_info["transform_script"],
+                    self._reload_transform_scripts_on_change,
+                    self._reload_transform_scripts_check_interval_ms)
+            else:
+                transform_script = None
+
             callback = ElasticsearchServiceEventCallback(
                 self._es_client,
                 event_group_name,
                 event_group_info["document_index"],
                 event_group_info["document_type"],
-                event_group_info["id_field_name"],
-                event_group_info["transform_script"],
-                self._reload_transform_scripts_on_change)
+                event_group_info["id_field_path"],
+                transform_script,
+                bulk_indexer,
+                self._spool,
+                self._retry_policy,
+                counters,
+                dead_letter_queue,
+                event_group_info["transform_batch_size"],
+                event_group_info["transform_batch_window_ms"],
+                event_group_info["transform_processes"],
+                event_group_info["transform_max_in_flight_batches"],
+                self._json_codec,
+                event_group_info["pass_through_payloads"],
+                deduplicator,
+                event_group_info["dedup_derive_id"],
+                sampler,
+                rate_limiter,
+                event_group_info["transform_pipeline"],
+                event_group_info["operation_type"],
+                self._response_cache)
+            self._event_callbacks.append(callback)
 
             for topic in event_group_info["topics"]:
-                logger.info("Registering event callback %s for group %s",
+                logger.info("Routing events for topic %s to group %s",
                             topic, event_group_name)
-                self.add_event_callback(topic,
-                                        callback,
-                                        separate_thread=True)
+                topic_index.add(topic, callback)
+
+        if self._spool_replayer:
+            self._spool_replayer.start()
+
+        # Events are routed to the event groups through a single callback,
+        # with one subscription for each topic or wildcard which is not
+        # already covered by another wildcard
+        router_callback = ElasticsearchServiceEventRouterCallback(topic_index)
+        for topic in get_subscription_topics(
+                topic for event_group_info in self._event_groups.values()
+                for topic in event_group_info["topics"]):
+            logger.info("Registering event callback %s", topic)
+            self.add_event_callback(topic,
+                                    router_callback,
+                                    separate_thread=True)
+
+    def _create_bulk_indexer(self, event_group_name, event_group_info,
+                             counters, dead_letter_queue):
+        """
+        Create the bulk indexer for an event group, along with its adaptive
+        batch controller if adaptive batching is configured.
+
+        :param str event_group_name: The event group name.
+        :param dict event_group_info: The event group settings.
+        :param dxlelasticsearchservice._stats.Counters counters: Counters for
+            the event group.
+        :param dxlelasticsearchservice._deadletter.DeadLetterQueue
+            dead_letter_queue: Dead-letter destination for the event group,
+            or None.
+        :return: The bulk indexer, or None if bulk indexing is not configured
+            for the event group.
+        :rtype: dxlelasticsearchservice._bulk.BulkIndexer
+        """
+        if not event_group_info["use_bulk_indexing"]:
+            return None
+
+        if event_group_info["use_adaptive_batching"]:
+            batch_controller = AdaptiveBatchController(
+                event_group_name,
+                event_group_info["adaptive_min_docs"],
+                event_group_info["bulk_max_docs"],
+                event_group_info["adaptive_max_in_flight"],
+                event_group_info["adaptive_target_latency_ms"])
+            self._batch_controllers[event_group_name] = batch_controller
+        else:
+            batch_controller = None
+
+        bulk_indexer = BulkIndexer(
+            self._es_client,
+            event_group_name,
+            event_group_info["bulk_max_docs"],
+            event_group_info["bulk_max_bytes"],
+            event_group_info["bulk_flush_interval_ms"],
+            self._retry_policy,
+            counters,
+            self._spool,
+            dead_letter_queue,
+            event_group_info["bulk_coalesce_mode"],
+            batch_controller,
+            self._response_cache)
+        self._bulk_indexers.append(bulk_indexer)
+        return bulk_indexer
+
+    @staticmethod
+    def _create_rate_limiting(event_group_info):
+        """
+        Create the sampler and rate limiter for an event group.
+
+        :param dict event_group_info: The event group settings.
+        :return: Tuple containing the sampler and the rate limiter for the
+            event group. Either may be None if sampling or rate limiting is not
+            configured.
+        :rtype: tuple
+        """
+        if event_group_info["sample_rate"] < 1:
+            sampler = Sampler(event_group_info["sample_rate"],
+                              event_group_info["sample_method"])
+        else:
+            sampler = None
+
+        if event_group_info["rate_limit"]:
+            rate_limiter = RateLimiter(
+                event_group_info["rate_limit"],
+                event_group_info["rate_limit_burst"],
+                event_group_info["rate_limit_action"],
+                Sampler(event_group_info["rate_limit_sample_rate"],
+                        event_group_info["sample_method"]))
+        else:
+            rate_limiter = None
+
+        return sampler, rate_limiter
 
     def _get_api_method(self, api_name):
         """
@@ -459,31 +1927,110 @@ class ElasticsearchService(Application):
                 logger.warning("Elasticsearch API name is invalid: %s",
                                api_name)
 
-        if api_methods:
+        if api_methods or self._expose_service_stats:
             logger.info("Registering service: elasticsearch_service")
             service = ServiceRegistrationInfo(
                 self._dxl_client,
                 self._SERVICE_TYPE)
 
+            if api_methods:
+                self._request_executor = self._create_request_executor()
+            request_callbacks = {}
             for api_method in api_methods:
-                api_method_name = api_method.__name__
-                topic = "{}{}/{}".format(
-                    self._SERVICE_TYPE,
-                    "/{}".format(self._service_unique_id)
-                    if self._service_unique_id else "",
-                    api_method_name)
-                logger.info(
-                    "Registering request callback: %s%s_%s_%s. Topic: %s.",
-                    "elasticsearch",
-                    "_{}".format(self._service_unique_id)
-                    if self._service_unique_id else "",
-                    api_method_name,
-                    "requesthandler",
-                    topic)
-                self.add_request_callback(
+                request_callback = ElasticsearchServiceRequestCallback(
+                    self,
+                    api_method,
+                    self._json_codec,
+                    self._request_executor,
+                    get_request_lane(api_method.__name__),
+                    self._response_cache,
+                    self._single_flight,
+                    self._request_batcher)
+                request_callbacks[api_method.__name__] = request_callback
+                self._add_service_request_callback(
+                    service, api_method.__name__, request_callback)
+
+            if api_methods and self._batch_api_settings:
+                self._add_service_request_callback(
                     service,
-                    topic,
-                    ElasticsearchServiceRequestCallback(self, api_method),
-                    False)
+                    self._SERVICE_BATCH_TOPIC_NAME,
+                    ElasticsearchServiceBatchRequestCallback(
+                        self,
+                        request_callbacks,
+                        self._batch_api_settings["max_operations"],
+                        self._batch_api_settings["max_concurrency"],
+                        self._json_codec,
+                        self._request_executor))
+
+            if self._expose_service_stats:
+                self._add_service_request_callback(
+                    service,
+                    self._SERVICE_STATS_TOPIC_NAME,
+                    ElasticsearchServiceStatsRequestCallback(
+                        self, self._json_codec))
 
             self.register_service(service)
+
+    def _create_request_executor(self):
+        """
+        Create the executor which handles DXL requests for the Elasticsearch
+        APIs, with the lane sizes from the application configuration.
+
+        :return: The executor.
+        :rtype: dxlelasticsearchservice._executor.RequestExecutor
+        :raises ValueError: If a thread count or the queue size is not a
+            positive value.
+        """
+        settings = {}
+        for prop, default_value in (
+                (self._GENERAL_READ_REQUEST_THREADS_PROP,
+                 self._DEFAULT_READ_REQUEST_THREADS),
+                (self._GENERAL_SEARCH_REQUEST_THREADS_PROP,
+                 self._DEFAULT_SEARCH_REQUEST_THREADS),
+                (self._GENERAL_WRITE_REQUEST_THREADS_PROP,
+                 self._DEFAULT_WRITE_REQUEST_THREADS),
+                (self._GENERAL_REQUEST_QUEUE_SIZE_PROP,
+                 self._DEFAULT_REQUEST_QUEUE_SIZE)):
+            settings[prop] = self._get_setting_from_config(
+                self._GENERAL_CONFIG_SECTION,
+                prop,
+                return_type=int,
+                default_value=default_value)
+            if settings[prop] <= 0:
+                raise ValueError(
+                    "Setting {} in section {} must be greater than 0".format(
+                        prop, self._GENERAL_CONFIG_SECTION))
+
+        queue_size = settings[self._GENERAL_REQUEST_QUEUE_SIZE_PROP]
+        return RequestExecutor({
+            LANE_READ: (settings[self._GENERAL_READ_REQUEST_THREADS_PROP],
+                        queue_size),
+            LANE_SEARCH: (settings[self._GENERAL_SEARCH_REQUEST_THREADS_PROP],
+                          queue_size),
+            LANE_WRITE: (settings[self._GENERAL_WRITE_REQUEST_THREADS_PROP],
+                         queue_size)})
+
+    def _add_service_request_callback(self, service, name, callback):
+        """
+        Add a request callback for a topic under the service type.
+
+        :param dxlclient.service.ServiceRegistrationInfo service: The service
+            to add the request callback to.
+        :param str name: The name of the final segment of the request topic.
+        :param dxlclient.callbacks.RequestCallback callback: The request
+            callback.
+        """
+        topic = "{}{}/{}".format(
+            self._SERVICE_TYPE,
+            "/{}".format(self._service_unique_id)
+            if self._service_unique_id else "",
+            name)
+        logger.info(
+            "Registering request callback: %s%s_%s_%s. Topic: %s.",
+            "elasticsearch",
+            "_{}".format(self._service_unique_id)
+            if self._service_unique_id else "",
+            name,
+            "requesthandler",
+            topic)
+        self.add_request_callback(service, topic, callback, False)
@@ -18,6 +18,11 @@ def on_event(event, index_operation):
     supplied as the "doc_type" parameter for the Elasticsearch "index"
     operation.
 
+    The "op_type" (or "_op") element, if present, sets the type of operation
+    to perform: "index" (the default), "create", "update" (a partial update
+    of the document with the fields in "body", creating the document if it
+    does not exist), or "delete".
+
     :param dxlclient.message.Event event: The event which was received.
     :param dict index_operation: A dict with a set of parameters configured
         for storing the event payload into Elasticsearch. The dictionary